@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# Policies deciding which PySide bindings release the GIL around the wrapped C++ call.
+#
+# pyside-default-allow-thread.patch releases it for every function the typesystem does not
+# explicitly mark, so even trivial getters pay for a release and reacquire. With a policy
+# other than "all", build.py applies pyside_patches/optional/pyside-allow-thread-policy.patch
+# and passes the policy lists to the shiboken generator through the environment. Entries are
+# prefixes of the qualified function name, "QThread::wait" or "QImageReader::", and explicit
+# allow-thread modifications in the typesystems still win.
+
+import hashlib
+import json
+from pathlib import Path
+
+
+ALLOW_ENV = "SHIBOKEN_ALLOW_THREAD_ALLOW"
+DENY_ENV = "SHIBOKEN_ALLOW_THREAD_DENY"
+PATCH_PATH = Path(__file__).resolve().parent / "pyside_patches" / "optional" / "pyside-allow-thread-policy.patch"
+
+# Calls that block on another thread, the event loop, I/O or the user, and calls that run
+# long enough for other Python threads to make progress meanwhile
+BLOCKING_CALLS = [
+	# Event loops and modal UI
+	"QCoreApplication::exec", "QCoreApplication::processEvents", "QGuiApplication::exec", "QApplication::exec",
+	"QEventLoop::exec", "QEventLoop::processEvents", "QDialog::exec", "QMenu::exec", "QDrag::exec",
+	"QMessageBox::", "QFileDialog::get", "QColorDialog::getColor", "QFontDialog::getFont", "QInputDialog::get",
+	"QDesktopServices::openUrl",
+	# Threads and synchronization
+	"QThread::wait", "QThread::sleep", "QThread::msleep", "QThread::usleep", "QThreadPool::waitForDone",
+	"QMutex::lock", "QMutex::tryLock", "QRecursiveMutex::lock", "QRecursiveMutex::tryLock",
+	"QReadWriteLock::lockFor", "QReadWriteLock::tryLockFor", "QSemaphore::acquire", "QSemaphore::tryAcquire",
+	"QWaitCondition::wait", "QFutureWatcherBase::waitForFinished", "QDeadlineTimer::",
+	# I/O
+	"QIODevice::read", "QIODevice::write", "QIODevice::peek", "QIODevice::getChar", "QIODevice::waitFor",
+	"QFileDevice::flush", "QFile::open", "QFile::copy", "QFile::rename", "QFile::remove", "QFile::moveToTrash",
+	"QFile::resize", "QSaveFile::commit", "QDir::", "QDirIterator::", "QFileInfo::", "QStorageInfo::",
+	"QProcess::waitFor", "QProcess::execute", "QProcess::startDetached", "QLocalSocket::waitFor",
+	"QLocalServer::waitForNewConnection", "QSettings::sync", "QLockFile::lock", "QLockFile::tryLock",
+	"QDBusConnection::call", "QDBusAbstractInterface::call", "QDBusPendingCall::waitForFinished",
+	# Image and document work proportional to the data
+	"QImage::load", "QImage::save", "QImage::loadFromData", "QImage::fromData", "QImage::scaled", "QImage::transformed",
+	"QImage::convertTo", "QImage::convertToFormat", "QImage::mirrored", "QImage::smoothScaled", "QPixmap::load",
+	"QPixmap::save", "QPixmap::loadFromData", "QPixmap::scaled", "QPixmap::transformed", "QPixmap::fromImage",
+	"QImageReader::read", "QImageWriter::write", "QIcon::pixmap", "QSvgRenderer::load", "QSvgRenderer::render",
+	"QPainter::drawImage", "QPainter::drawPixmap", "QPainter::drawTiledPixmap", "QPainter::end", "QWidget::render",
+	"QWidget::grab", "QScreen::grabWindow", "QTextDocument::print", "QTextDocument::drawContents",
+	"QFontDatabase::addApplicationFont", "QPrinter::", "QPdfWriter::",
+]
+
+# Value types and plain accessors that never block, released everywhere else
+VALUE_TYPES = [
+	"QPoint::", "QPointF::", "QSize::", "QSizeF::", "QRect::", "QRectF::", "QLine::", "QLineF::", "QMargins::",
+	"QMarginsF::", "QColor::", "QTransform::", "QMatrix4x4::", "QVector2D::", "QVector3D::", "QVector4D::",
+	"QQuaternion::", "QModelIndex::", "QPersistentModelIndex::", "QItemSelectionRange::", "QPen::", "QBrush::",
+	"QFont::", "QPalette::", "QKeySequence::", "QUrl::", "QUuid::", "QDate::", "QTime::", "QDateTime::",
+	"QTimeZone::", "QLocale::", "QByteArray::", "QBitArray::", "QRegularExpression::", "QSizePolicy::",
+	"QObject::objectName", "QObject::parent", "QObject::property", "QObject::signalsBlocked",
+	"QAbstractItemModel::index", "QAbstractItemModel::parent", "QAbstractItemModel::rowCount",
+	"QAbstractItemModel::columnCount", "QAbstractItemModel::data", "QAbstractItemModel::flags",
+	"QAbstractItemModel::hasChildren", "QStandardItem::", "QTreeWidgetItem::", "QListWidgetItem::",
+	"QTableWidgetItem::",
+]
+
+# name -> (allowlist, denylist). An empty allowlist means every function not denied is allowed.
+POLICIES = {
+	"all": None,
+	"blocking": (BLOCKING_CALLS, []),
+	"no-value-types": ([], VALUE_TYPES),
+}
+DEFAULT_POLICY = "all"
+
+
+def generator_environment(policy):
+	"""Environment for the shiboken generator implementing `policy`, empty for the default."""
+	lists = POLICIES[policy]
+	if lists is None:
+		return {}
+	allow, deny = lists
+	return {ALLOW_ENV: ";".join(allow), DENY_ENV: ";".join(deny)}
+
+
+def describe(policy):
+	"""Policy name and a digest of its lists, for build metadata and cache keys."""
+	lists = POLICIES[policy]
+	if lists is None:
+		return {"policy": policy}
+	allow, deny = lists
+	digest = hashlib.sha256(json.dumps([allow, deny]).encode("utf-8")).hexdigest()
+	return {"policy": policy, "allow": len(allow), "deny": len(deny), "sha256": digest}
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# Measures what releasing the GIL costs and buys in a built PySide6: the per-call overhead of
+# trivial bindings (getters, model accessors) in a tight loop, and the throughput of several
+# Python threads calling cheap, compute heavy and blocking bindings at once. Run it against
+# builds with different --allow-thread-policy settings and compare the results.
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+
+DEFAULT_REGRESSION_THRESHOLD = 10.0
+DEFAULT_THREADS = (1, 2, 4, 8)
+
+# Prints one JSON object mapping each measurement to nanoseconds per call
+_BENCHMARK_SCRIPT = r"""
+import functools, json, sys, threading, time
+from PySide6.QtCore import QObject, QPoint, QRect, QSize, QThread
+from PySide6.QtGui import QColor, QGuiApplication, QImage, QStandardItemModel
+
+config = json.loads(sys.argv[1])
+app = QGuiApplication(sys.argv[:1])
+point, size, rect, color = QPoint(3, 4), QSize(640, 480), QRect(0, 0, 100, 100), QColor(10, 20, 30)
+obj = QObject()
+obj.setObjectName("object")
+model = QStandardItemModel(1000, 4)
+index = model.index(10, 1)
+model.setData(index, "value")
+image = QImage(1024, 1024, QImage.Format.Format_ARGB32_Premultiplied)
+image.fill(0xff336699)
+
+calls = {
+	"baseline (list.__len__)": [].__len__,
+	"QPoint.x": point.x,
+	"QSize.width": size.width,
+	"QColor.red": color.red,
+	"QRect.contains": functools.partial(rect.contains, point),
+	"QObject.objectName": obj.objectName,
+	"QStandardItemModel.rowCount": model.rowCount,
+	"QStandardItemModel.index": functools.partial(model.index, 10, 1),
+	"QModelIndex.data": index.data,
+}
+threaded = {
+	"getters": (index.data, config["calls"] // 10),
+	"image_scale": (functools.partial(image.scaled, 256, 256), 20),
+	"sleep_1ms": (functools.partial(QThread.msleep, 1), 50),
+}
+
+def per_call(fn, count):
+	start = time.perf_counter()
+	for _ in range(count):
+		fn()
+	return (time.perf_counter() - start) * 1e9 / count
+
+def throughput(fn, threads, count):
+	barrier = threading.Barrier(threads + 1)
+	def worker():
+		barrier.wait()
+		for _ in range(count):
+			fn()
+	workers = [threading.Thread(target=worker) for _ in range(threads)]
+	for w in workers:
+		w.start()
+	barrier.wait()
+	start = time.perf_counter()
+	for w in workers:
+		w.join()
+	return (time.perf_counter() - start) * 1e9 / (threads * count)
+
+results = {}
+for name, fn in calls.items():
+	per_call(fn, config["calls"] // 10)
+	results[f"call {name}"] = per_call(fn, config["calls"])
+for name, (fn, count) in threaded.items():
+	for threads in config["threads"]:
+		results[f"{threads} threads {name}"] = throughput(fn, threads, count)
+print(json.dumps(results))
+"""
+
+
+def _environment(site_packages, extra_env=None):
+	env = dict(os.environ)
+	env.update(extra_env or {})
+	env["PYTHONPATH"] = os.pathsep.join([str(site_packages)] + ([env["PYTHONPATH"]] if env.get("PYTHONPATH") else []))
+	env["QT_QPA_PLATFORM"] = "offscreen"
+	env["PYTHONDONTWRITEBYTECODE"] = "1"
+	return env
+
+
+def run_once(python, site_packages, calls, threads, extra_env=None):
+	config = json.dumps({"calls": calls, "threads": list(threads)})
+	proc = subprocess.run([python, "-c", _BENCHMARK_SCRIPT, config], env=_environment(site_packages, extra_env),
+		stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+	if proc.returncode != 0:
+		raise RuntimeError(f"Benchmark failed:\n{proc.stderr[-2000:]}")
+	return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(python, site_packages, label=None, calls=200000, threads=DEFAULT_THREADS, repeat=3, extra_env=None):
+	runs = [run_once(python, site_packages, calls, threads, extra_env) for _ in range(repeat)]
+	results = {}
+	for name in runs[0]:
+		values = [r[name] for r in runs]
+		results[name] = {"median_ns": statistics.median(values), "min_ns": min(values), "runs_ns": values}
+		print(f"{name:40} {results[name]['median_ns']:12.1f} ns")
+	return {
+		"schema_version": 1,
+		"generated_at_utc": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+		"label": label,
+		"python": [sys.implementation.name, sys.version],
+		"host": {"platform": platform.platform(), "machine": platform.machine(), "cpu_count": os.cpu_count()},
+		"site_packages": str(site_packages),
+		"calls": calls,
+		"threads": list(threads),
+		"repeat": repeat,
+		"results": results,
+	}
+
+
+def compare_results(old, new, threshold=DEFAULT_REGRESSION_THRESHOLD):
+	regressions = []
+	print(f"{'Nanoseconds per call':40} {old.get('label') or 'Old':>12} {new.get('label') or 'New':>12} {'%':>8}")
+	for name, value in new["results"].items():
+		old_value = old["results"].get(name, {}).get("median_ns")
+		if old_value is None:
+			continue
+		new_value = value["median_ns"]
+		percent = (new_value - old_value) * 100.0 / old_value if old_value else 0.0
+		marker = ""
+		if percent > threshold:
+			regressions.append(name)
+			marker = "  REGRESSED"
+		print(f"{name:40} {old_value:>12.1f} {new_value:>12.1f} {percent:>+8.1f}{marker}")
+	return regressions
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Measure PySide6 per-call binding overhead and multi-threaded throughput")
+	parser.add_argument("--site-packages", required=True, help="site-packages directory containing PySide6")
+	parser.add_argument("--python", default=sys.executable, help="Python interpreter to run the benchmark with")
+	parser.add_argument("--label", help="name of the build, e.g. its --allow-thread-policy")
+	parser.add_argument("--calls", type=int, default=200000, help="calls per per-call measurement")
+	parser.add_argument("--threads", default=",".join(str(t) for t in DEFAULT_THREADS), help="comma separated thread counts")
+	parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per measurement")
+	parser.add_argument("--output", default="artifacts/allow-thread-benchmark.json", help="where to write the JSON results")
+	parser.add_argument("--compare", help="earlier results to compare against")
+	parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD, help="regression threshold in percent")
+	args = parser.parse_args(argv)
+
+	report = run_benchmark(args.python, Path(args.site_packages), args.label, args.calls,
+		[int(t) for t in args.threads.split(",") if t], args.repeat)
+	output = Path(args.output)
+	output.parent.mkdir(parents=True, exist_ok=True)
+	with output.open("w", encoding="utf-8") as f:
+		json.dump(report, f, indent=2)
+		f.write("\n")
+	print(f"Results written to {output}")
+
+	if args.compare:
+		with open(args.compare, "r", encoding="utf-8") as f:
+			baseline = json.load(f)
+		if compare_results(baseline, report, args.threshold):
+			return 1
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
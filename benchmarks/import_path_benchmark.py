@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# Measures what installing PySide costs every other import in the interpreter. Compares a
+# site directory without PySide, the plain pyside6.pth that appends site-packages to
+# sys.path, and the --index pyside6.pth that registers pyside_index_finder instead. Each
+# run is a fresh `python -S` that processes the .pth through site.addsitedir(), like the
+# user site directory would be at startup.
+
+import argparse
+import datetime
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import pyside_index_finder
+
+MODES = ("none", "path", "index")
+DEFAULT_STDLIB_MODULES = ("json", "decimal", "fractions", "email.message", "http.client", "xml.dom.minidom",
+	"logging.handlers", "argparse", "csv", "sqlite3", "unittest", "asyncio")
+
+# Prints one JSON object with the timings of the lookups in this interpreter
+_CHILD_SCRIPT = r"""
+import json, site, sys, time
+site.addsitedir(sys.argv[1])
+missing, stdlib, pyside = int(sys.argv[2]), sys.argv[3].split(","), sys.argv[4] == "1"
+start = time.perf_counter()
+for i in range(missing):
+	try:
+		__import__(f"_import_path_benchmark_missing_{i}")
+	except ImportError:
+		pass
+missing_done = time.perf_counter()
+for name in stdlib:
+	__import__(name)
+stdlib_done = time.perf_counter()
+if pyside:
+	import PySide6, shiboken6
+pyside_done = time.perf_counter()
+print(json.dumps({
+	"missing_us_per_lookup": (missing_done - start) * 1e6 / max(missing, 1),
+	"stdlib_ms": (stdlib_done - missing_done) * 1000,
+	"pyside_ms": (pyside_done - stdlib_done) * 1000 if pyside else None,
+	"sys_path_entries": len(sys.path),
+	"meta_path_finders": len(sys.meta_path),
+}))
+"""
+
+
+def prepare_site_dir(site_dir, mode, pyside_path):
+	site_dir.mkdir(parents=True, exist_ok=True)
+	if mode == "path":
+		(site_dir / "pyside6.pth").write_text(str(pyside_path / "site-packages") + "\n")
+	elif mode == "index":
+		if not (pyside_path / pyside_index_finder.INDEX_FILE_NAME).is_file():
+			raise RuntimeError(f"No {pyside_index_finder.INDEX_FILE_NAME} in {pyside_path}")
+		shutil.copy(pyside_index_finder.__file__, site_dir / "pyside6_index_finder.py")
+		(site_dir / "pyside6.pth").write_text(
+			"import pyside6_index_finder; pyside6_index_finder.install({!r})\n".format(str(pyside_path)))
+
+
+def run_once(python, site_dir, missing, stdlib_modules, import_pyside):
+	proc = subprocess.run([python, "-S", "-c", _CHILD_SCRIPT, str(site_dir), str(missing), ",".join(stdlib_modules),
+		"1" if import_pyside else "0"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+	if proc.returncode != 0:
+		raise RuntimeError(f"Benchmark interpreter failed:\n{proc.stderr[-2000:]}")
+	return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(pyside_path, repeat=10, missing=200, stdlib_modules=DEFAULT_STDLIB_MODULES, import_pyside=True,
+		python=sys.executable):
+	pyside_path = Path(pyside_path).resolve()
+	results = {}
+	with tempfile.TemporaryDirectory() as tmp:
+		for mode in MODES:
+			site_dir = Path(tmp) / mode
+			prepare_site_dir(site_dir, mode, pyside_path)
+			runs = [run_once(python, site_dir, missing, stdlib_modules, import_pyside and mode != "none") for _ in range(repeat)]
+			results[mode] = {key: statistics.median(r[key] for r in runs) if runs[0][key] is not None else None
+				for key in ("missing_us_per_lookup", "stdlib_ms", "pyside_ms")}
+			results[mode]["sys_path_entries"] = runs[0]["sys_path_entries"]
+			results[mode]["meta_path_finders"] = runs[0]["meta_path_finders"]
+			pyside_ms = results[mode]["pyside_ms"]
+			print(f"{mode:6} missing {results[mode]['missing_us_per_lookup']:7.1f} us/lookup  "
+				f"stdlib {results[mode]['stdlib_ms']:7.1f} ms  PySide6 {'-' if pyside_ms is None else f'{pyside_ms:.1f} ms':>10}")
+
+	return {
+		"schema_version": 1,
+		"generated_at_utc": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+		"python": {"executable": python, "version": platform.python_version()},
+		"host": {"platform": platform.platform(), "machine": platform.machine()},
+		"pyside_path": str(pyside_path),
+		"repeat": repeat,
+		"missing_imports": missing,
+		"stdlib_modules": list(stdlib_modules),
+		"results": results,
+	}
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Benchmark import lookup overhead of the PySide .pth install modes")
+	parser.add_argument("--pyside", required=True, help="the pyside directory of a build (containing site-packages)")
+	parser.add_argument("--repeat", type=int, default=10, help="fresh interpreters per mode")
+	parser.add_argument("--missing", type=int, default=200, help="failing imports per run, like optional dependency probes")
+	parser.add_argument("--stdlib", default=",".join(DEFAULT_STDLIB_MODULES), help="comma separated modules unrelated to PySide")
+	parser.add_argument("--no-pyside-import", action="store_true", help="do not import PySide6, e.g. for cross-architecture builds")
+	parser.add_argument("--python", default=sys.executable, help="interpreter to benchmark with")
+	parser.add_argument("--output", default="artifacts/import-path.json", help="where to write the JSON results")
+	args = parser.parse_args(argv)
+
+	report = run_benchmark(args.pyside, args.repeat, args.missing, [m for m in args.stdlib.split(",") if m],
+		not args.no_pyside_import, args.python)
+	output = Path(args.output)
+	output.parent.mkdir(parents=True, exist_ok=True)
+	with output.open("w", encoding="utf-8") as f:
+		json.dump(report, f, indent=2)
+		f.write("\n")
+	print(f"Results written to {output}")
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
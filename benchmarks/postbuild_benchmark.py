@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# Times each post-build stage of build.py (tree walking, header sniffing, symbol extraction,
+# stripping, bundling, archive creation and the local install) on a synthetic install tree,
+# so changes to build_pipeline.py can be measured without a full Qt build.
+#
+# The tree mimics a Qt install: versioned shared libraries with symlinks, plugins, tools,
+# static archives, thousands of headers and CMake files, a PySide site-packages and a few
+# large blobs. Binaries are real ELF objects with debug info built by the local gcc.
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import build_pipeline
+
+
+STAGES = ("walk", "sniff", "symbols", "strip", "bundle", "archive", "install")
+DEFAULT_REGRESSION_THRESHOLD = 10.0
+QT_MODULES = ("Core", "Gui", "Widgets", "Svg", "DBus", "PrintSupport", "Network", "OpenGL", "Xml", "Concurrent",
+	"Sql", "Test", "Qml", "Quick", "WaylandClient", "XcbQpa", "Help", "Designer", "UiTools", "ShaderTools")
+
+
+def _c_source(functions):
+	# Enough distinct functions and types to give the objects realistic debug info
+	lines = ["#include <stddef.h>"]
+	for i in range(functions):
+		lines.append(f"struct s{i} {{ int a; double b; const char *c; struct s{i} *next; }};")
+		lines.append(f"int f{i}(struct s{i} *p, int x) {{ int r = x; for (; p; p = p->next) r += p->a * {i} + (int)p->b; return r; }}")
+	return "\n".join(lines) + "\n"
+
+
+def build_templates(work_dir, functions):
+	"""Compile the ELF objects that are copied throughout the synthetic tree."""
+	work_dir.mkdir(parents=True, exist_ok=True)
+	source = work_dir / "template.c"
+	source.write_text(_c_source(functions))
+	(work_dir / "main.c").write_text("int f0(void *, int);\nint main(void) { return f0(0, 0); }\n")
+	cc = os.environ.get("CC", "gcc")
+	subprocess.run([cc, "-g", "-O1", "-shared", "-fPIC", "-o", work_dir / "libtemplate.so", source], check=True)
+	subprocess.run([cc, "-g", "-O1", "-c", "-fPIC", "-o", work_dir / "template.o", source], check=True)
+	subprocess.run(["ar", "rcs", work_dir / "libtemplate.a", work_dir / "template.o"], check=True)
+	subprocess.run([cc, "-g", "-O1", "-o", work_dir / "tool", work_dir / "main.c", source], check=True)
+	return {
+		"shared": work_dir / "libtemplate.so",
+		"archive": work_dir / "libtemplate.a",
+		"executable": work_dir / "tool",
+	}
+
+
+def generate_tree(root, templates, scale=1.0, blob_mb=32, qt_version="6.0.0"):
+	"""Generate a synthetic install tree under `root` and return a summary of its contents."""
+	def count(n):
+		return max(1, int(n * scale))
+
+	def copy(template, path, executable=False):
+		path.parent.mkdir(parents=True, exist_ok=True)
+		shutil.copyfile(template, path)
+		os.chmod(path, 0o755 if executable else 0o644)
+
+	major, minor = qt_version.split(".")[:2]
+	lib = root / "lib"
+	for i in range(count(60)):
+		name = QT_MODULES[i % len(QT_MODULES)] + ("" if i < len(QT_MODULES) else str(i))
+		real = lib / f"libQt6{name}.so.{qt_version}"
+		copy(templates["shared"], real, executable=True)
+		os.symlink(real.name, lib / f"libQt6{name}.so.{major}")
+		os.symlink(f"libQt6{name}.so.{major}", lib / f"libQt6{name}.so")
+		cmake_dir = lib / "cmake" / f"Qt6{name}"
+		cmake_dir.mkdir(parents=True, exist_ok=True)
+		for suffix in ("Config", "ConfigVersion", "Targets", "Targets-release", "Dependencies"):
+			(cmake_dir / f"Qt6{name}{suffix}.cmake").write_text(f"# Qt6{name}{suffix}\n" + "set(X 1)\n" * 50)
+	for i in range(count(10)):
+		copy(templates["archive"], lib / f"libQt6Bundled{i}.a")
+	for plugin_type in build_pipeline.LINUX_PLUGIN_TYPES:
+		for i in range(count(5)):
+			copy(templates["shared"], root / "plugins" / plugin_type / f"libq{plugin_type}{i}.so", executable=True)
+	for i in range(count(25)):
+		copy(templates["executable"], root / "bin" / f"tool{i}", executable=True)
+	for i in range(count(4000)):
+		module = QT_MODULES[i % len(QT_MODULES)]
+		header = root / "include" / f"Qt{module}" / f"q{module.lower()}{i}.h"
+		header.parent.mkdir(parents=True, exist_ok=True)
+		header.write_text(f"#pragma once\n// synthetic header {i}\n" + f"class Q{module}{i} {{ int x; }};\n" * 40)
+	for i in range(count(600)):
+		spec = root / "mkspecs" / "modules" / f"qt_lib_{i}.pri"
+		spec.parent.mkdir(parents=True, exist_ok=True)
+		spec.write_text("QT.x.VERSION = 6\n" * 20)
+	# Large blobs: one incompressible, the rest compressible like translations and resources
+	blobs = root / "resources"
+	blobs.mkdir(parents=True, exist_ok=True)
+	(blobs / "random.bin").write_bytes(os.urandom(blob_mb * 1024 * 1024))
+	for i in range(2):
+		(blobs / f"qtbase_{i}.qm").write_bytes((b"translation text " * 64 + bytes([i])) * (blob_mb * 1024))
+
+	site_packages = root / "pyside" / "site-packages"
+	major_minor = f"{major}.{minor}"
+	for module in QT_MODULES[:count(10)]:
+		copy(templates["shared"], site_packages / "PySide6" / f"Qt{module}.abi3.so", executable=True)
+		(site_packages / "PySide6" / f"Qt{module}.pyi").write_text(f"class Q{module}: ...\n" * 500)
+	copy(templates["shared"], site_packages / "PySide6" / f"libpyside6.abi3.so.{major_minor}", executable=True)
+	copy(templates["shared"], site_packages / "shiboken6" / "Shiboken.abi3.so", executable=True)
+	for i in range(count(300)):
+		py = site_packages / "PySide6" / "support" / f"module{i}.py"
+		py.parent.mkdir(parents=True, exist_ok=True)
+		py.write_text(f"def function{i}(x):\n    return x + {i}\n" * 20)
+
+	files = 0
+	total = 0
+	for path in build_pipeline.walk_files([root]):
+		files += 1
+		if not os.path.islink(path):
+			total += os.path.getsize(path)
+	return {"files": files, "bytes": total}
+
+
+@contextlib.contextmanager
+def _quiet():
+	with contextlib.redirect_stdout(io.StringIO()):
+		yield
+
+
+def run_stage(stage, root, scratch, qt_version):
+	"""Run one stage on a fresh copy of the tree in `root`. Returns seconds, or None if skipped."""
+	if stage == "bundle" and shutil.which("patchelf") is None:
+		return None
+	if stage in ("symbols", "strip"):
+		symbol_files, strip_files = build_pipeline.linux_symbol_candidates([root])
+
+	start = time.perf_counter()
+	with _quiet():
+		if stage == "walk":
+			for _ in build_pipeline.walk_files([root]):
+				pass
+		elif stage == "sniff":
+			build_pipeline.linux_symbol_candidates([root])
+		elif stage == "symbols":
+			with zipfile.ZipFile(scratch / "symbols.zip", "w", zipfile.ZIP_DEFLATED) as z:
+				build_pipeline.extract_linux_symbols(symbol_files, z, root)
+		elif stage == "strip":
+			build_pipeline.strip_debug_info(strip_files)
+		elif stage == "bundle":
+			build_pipeline.bundle_qt_plugins(root, root / "bundle")
+			build_pipeline.bundle_pyside(root / "pyside", root / "bundle", qt_version)
+		elif stage == "archive":
+			with zipfile.ZipFile(scratch / "qt.zip", "w", zipfile.ZIP_DEFLATED) as z:
+				build_pipeline.add_tree_to_zip(z, root, os.path.join("Qt", qt_version))
+		elif stage == "install":
+			build_pipeline.install_staged_output(root, scratch / "user" / "Qt" / qt_version)
+	return time.perf_counter() - start
+
+
+def _git_commit():
+	try:
+		return subprocess.run(["git", "rev-parse", "HEAD"], cwd=Path(__file__).resolve().parent,
+			stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True).stdout.strip() or None
+	except OSError:
+		return None
+
+
+def compare_results(old, new, threshold=DEFAULT_REGRESSION_THRESHOLD):
+	regressions = []
+	print(f"{'Stage':10} {'Old':>10} {'New':>10} {'%':>8}")
+	for stage in STAGES:
+		old_median = old["stages"].get(stage, {}).get("median")
+		new_median = new["stages"].get(stage, {}).get("median")
+		if old_median is None or new_median is None:
+			print(f"{stage:10} {'-':>10} {'-':>10} {'-':>8}")
+			continue
+		percent = (new_median - old_median) * 100.0 / old_median if old_median else 0.0
+		marker = ""
+		if percent > threshold:
+			regressions.append(stage)
+			marker = "  REGRESSED"
+		print(f"{stage:10} {old_median:>9.3f}s {new_median:>9.3f}s {percent:>+8.1f}{marker}")
+	return regressions
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Benchmark the post-build stages of build.py on a synthetic install tree")
+	parser.add_argument("--scale", type=float, default=1.0, help="multiply the number of generated files")
+	parser.add_argument("--blob-mb", type=int, default=32, help="size of each large blob in MB")
+	parser.add_argument("--functions", type=int, default=400, help="functions per generated ELF object")
+	parser.add_argument("--repeat", type=int, default=3, help="runs per stage")
+	parser.add_argument("--stages", default=",".join(STAGES), help="comma separated stages to run")
+	parser.add_argument("--work-dir", help="directory for the generated trees (default: a temporary directory)")
+	parser.add_argument("--output", default="artifacts/postbuild-benchmark.json", help="where to write the JSON results")
+	parser.add_argument("--compare", help="earlier results to compare against")
+	parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD, help="regression threshold in percent")
+	args = parser.parse_args(argv)
+
+	if not sys.platform.startswith("linux"):
+		print("The post-build benchmark generates ELF trees and only runs on Linux")
+		return 1
+	stages = [s for s in args.stages.split(",") if s]
+	for stage in stages:
+		if stage not in STAGES:
+			parser.error(f"Unknown stage {stage}, expected one of {', '.join(STAGES)}")
+
+	qt_version = "6.0.0"
+	with tempfile.TemporaryDirectory(dir=args.work_dir) as tmp:
+		tmp = Path(tmp)
+		print("Building ELF templates...")
+		templates = build_templates(tmp / "templates", args.functions)
+		print("Generating synthetic install tree...")
+		template_root = tmp / "template-tree"
+		tree = generate_tree(template_root, templates, args.scale, args.blob_mb, qt_version)
+		print(f"Tree has {tree['files']} files, {tree['bytes'] / (1024 * 1024):.1f} MB")
+
+		results = {}
+		for stage in stages:
+			runs = []
+			for i in range(args.repeat):
+				scratch = tmp / f"{stage}-{i}"
+				root = scratch / "tree"
+				shutil.copytree(template_root, root, symlinks=True)
+				seconds = run_stage(stage, root, scratch, qt_version)
+				shutil.rmtree(scratch)
+				if seconds is None:
+					break
+				runs.append(round(seconds, 4))
+			if not runs:
+				print(f"{stage:10} skipped")
+				results[stage] = {"skipped": True}
+				continue
+			results[stage] = {"runs": runs, "median": statistics.median(runs), "min": min(runs)}
+			print(f"{stage:10} median {results[stage]['median']:.3f}s  min {results[stage]['min']:.3f}s")
+
+	report = {
+		"schema_version": 1,
+		"generated_at_utc": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+		"commit": _git_commit(),
+		"host": {"platform": platform.platform(), "machine": platform.machine(), "cpus": os.cpu_count()},
+		"parameters": {"scale": args.scale, "blob_mb": args.blob_mb, "functions": args.functions, "repeat": args.repeat},
+		"tree": tree,
+		"stages": results,
+	}
+	output = Path(args.output)
+	output.parent.mkdir(parents=True, exist_ok=True)
+	with output.open("w", encoding="utf-8") as f:
+		json.dump(report, f, indent=2)
+		f.write("\n")
+	print(f"Results written to {output}")
+
+	if args.compare:
+		with open(args.compare, "r", encoding="utf-8") as f:
+			baseline = json.load(f)
+		if baseline.get("parameters") != report["parameters"]:
+			print("Warning: the baseline was generated with different parameters")
+		if compare_results(baseline, report, args.threshold):
+			return 1
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
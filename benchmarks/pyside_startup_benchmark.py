@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# Measures how fast a built PySide6 starts: the import time of each module in a fresh
+# interpreter (with -X importtime), QApplication construction, and plugin loading, all
+# under the offscreen platform so it runs on headless CI agents.
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from target_qt6_version import qt_version, pyside_modules
+
+
+DEFAULT_REGRESSION_THRESHOLD = 15.0
+TOP_IMPORTS = 15
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+# Prints one JSON object with the timings of each phase of application startup
+_APPLICATION_SCRIPT = r"""
+import json, sys, time
+start = time.perf_counter()
+from PySide6.QtWidgets import QApplication
+imported = time.perf_counter()
+app = QApplication(sys.argv[:1])
+constructed = time.perf_counter()
+from PySide6.QtGui import QImageReader, QFontDatabase
+formats = [bytes(f).decode() for f in QImageReader.supportedImageFormats()]
+image_plugins = time.perf_counter()
+families = QFontDatabase.families()
+fonts = time.perf_counter()
+from PySide6.QtWidgets import QWidget
+w = QWidget()
+w.resize(640, 480)
+w.show()
+app.processEvents()
+shown = time.perf_counter()
+print(json.dumps({
+	"import_widgets": imported - start,
+	"construct_application": constructed - imported,
+	"load_image_plugins": image_plugins - constructed,
+	"load_fonts": fonts - image_plugins,
+	"first_widget_shown": shown - fonts,
+	"total": shown - start,
+	"platform": app.platformName(),
+	"image_formats": formats,
+	"font_families": len(families),
+}))
+"""
+
+
+def _environment(site_packages, extra_env=None):
+	env = dict(os.environ)
+	env.update(extra_env or {})
+	env["PYTHONPATH"] = os.pathsep.join([str(site_packages)] + ([env["PYTHONPATH"]] if env.get("PYTHONPATH") else []))
+	env["QT_QPA_PLATFORM"] = "offscreen"
+	# Measure like a read-only install, and leave the measured tree unmodified
+	env["PYTHONDONTWRITEBYTECODE"] = "1"
+	return env
+
+
+def parse_importtime(stderr):
+	"""Return {module: (self_us, cumulative_us)} from `python -X importtime` output."""
+	imports = {}
+	for line in stderr.splitlines():
+		match = _IMPORTTIME_RE.match(line)
+		if match:
+			imports[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+	return imports
+
+
+def time_module_import(python, site_packages, module, extra_env=None):
+	"""Import PySide6.Qt<module> in a fresh interpreter and return its timings."""
+	name = f"PySide6.Qt{module}"
+	proc = subprocess.run([python, "-X", "importtime", "-c", f"import {name}"], env=_environment(site_packages, extra_env),
+		stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+	if proc.returncode != 0:
+		raise RuntimeError(f"Importing {name} failed:\n{proc.stderr[-2000:]}")
+	imports = parse_importtime(proc.stderr)
+	if name not in imports:
+		raise RuntimeError(f"No import time reported for {name}")
+	slowest = sorted(imports.items(), key=lambda item: item[1][0], reverse=True)[:TOP_IMPORTS]
+	return {
+		"cumulative_us": imports[name][1],
+		"self_us": imports[name][0],
+		"slowest_self_us": [{"module": m, "self_us": t[0]} for m, t in slowest],
+	}
+
+
+def time_application(python, site_packages):
+	proc = subprocess.run([python, "-c", _APPLICATION_SCRIPT], env=_environment(site_packages),
+		stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+	if proc.returncode != 0:
+		raise RuntimeError(f"Application startup failed:\n{proc.stderr[-2000:]}")
+	return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _median_runs(runs, key):
+	return statistics.median(r[key] for r in runs)
+
+
+def run_benchmark(site_packages, modules=pyside_modules, repeat=5, python=sys.executable):
+	site_packages = Path(site_packages).resolve()
+	results = {"modules": {}, "application": {}}
+	for module in modules:
+		runs = [time_module_import(python, site_packages, module) for _ in range(repeat)]
+		results["modules"][module] = {
+			"median_cumulative_us": _median_runs(runs, "cumulative_us"),
+			"min_cumulative_us": min(r["cumulative_us"] for r in runs),
+			"runs_cumulative_us": [r["cumulative_us"] for r in runs],
+			"slowest_self_us": runs[-1]["slowest_self_us"],
+		}
+		print(f"PySide6.Qt{module:14} {results['modules'][module]['median_cumulative_us'] / 1000:8.1f} ms")
+
+	runs = [time_application(python, site_packages) for _ in range(repeat)]
+	for phase in ("import_widgets", "construct_application", "load_image_plugins", "load_fonts", "first_widget_shown", "total"):
+		results["application"][phase] = _median_runs(runs, phase)
+		print(f"{phase:22} {results['application'][phase] * 1000:8.1f} ms")
+	results["application"]["platform"] = runs[-1]["platform"]
+	results["application"]["image_formats"] = runs[-1]["image_formats"]
+	results["application"]["font_families"] = runs[-1]["font_families"]
+
+	return {
+		"schema_version": 1,
+		"generated_at_utc": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+		"qt_version": qt_version,
+		"python": {"executable": python, "version": platform.python_version()},
+		"host": {"platform": platform.platform(), "machine": platform.machine()},
+		"site_packages": str(site_packages),
+		"repeat": repeat,
+		"results": results,
+	}
+
+
+def compare_results(old, new, threshold=DEFAULT_REGRESSION_THRESHOLD):
+	regressions = []
+
+	def row(name, old_value, new_value):
+		if old_value is None or new_value is None:
+			return
+		percent = (new_value - old_value) * 100.0 / old_value if old_value else 0.0
+		marker = ""
+		if percent > threshold:
+			regressions.append(name)
+			marker = "  REGRESSED"
+		print(f"{name:28} {old_value:>10.1f} {new_value:>10.1f} {percent:>+8.1f}{marker}")
+
+	print(f"{'Measurement (ms)':28} {'Old':>10} {'New':>10} {'%':>8}")
+	old_modules = old["results"]["modules"]
+	for module, value in new["results"]["modules"].items():
+		old_value = old_modules.get(module, {}).get("median_cumulative_us")
+		row(f"import PySide6.Qt{module}", old_value / 1000 if old_value else None, value["median_cumulative_us"] / 1000)
+	for phase, value in new["results"]["application"].items():
+		if isinstance(value, float):
+			old_value = old["results"]["application"].get(phase)
+			row(phase, old_value * 1000 if old_value else None, value * 1000)
+	return regressions
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Benchmark import and startup time of a built PySide6")
+	parser.add_argument("--site-packages", required=True, help="the pyside/site-packages directory of a build")
+	parser.add_argument("--modules", default=",".join(pyside_modules), help="comma separated PySide modules to import")
+	parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per measurement")
+	parser.add_argument("--python", default=sys.executable, help="interpreter to benchmark with")
+	parser.add_argument("--output", default="artifacts/pyside-startup.json", help="where to write the JSON results")
+	parser.add_argument("--compare", help="earlier results to compare against")
+	parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD, help="regression threshold in percent")
+	args = parser.parse_args(argv)
+
+	report = run_benchmark(args.site_packages, [m for m in args.modules.split(",") if m], args.repeat, args.python)
+	output = Path(args.output)
+	output.parent.mkdir(parents=True, exist_ok=True)
+	with output.open("w", encoding="utf-8") as f:
+		json.dump(report, f, indent=2)
+		f.write("\n")
+	print(f"Results written to {output}")
+
+	if args.compare:
+		with open(args.compare, "r", encoding="utf-8") as f:
+			baseline = json.load(f)
+		if compare_results(baseline, report, args.threshold):
+			return 1
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# A/B benchmark of the patches in qt_patches/. Builds qtbase with every patch applied, without
+# each selected patch in turn, and without any patch, then times the offscreen workloads in
+# benchmarks/qt_workloads against each build. The impact of a patch is the difference between
+# the build that leaves it out and the fully patched build, which is what ships.
+#
+# All variants share one qtbase checkout and one build directory. Switching patches only
+# touches the patched files, so after the first build ninja rebuilds a handful of objects.
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from target_qt6_version import qt_version
+from benchmarks import qt_workloads_benchmark
+
+
+QT_PATCHES_PATH = Path(__file__).resolve().parent.parent / "qt_patches"
+DEFAULT_QT_MIRROR = "https://github.com/qt/"
+# Patches that change runtime behavior on hot paths. The others fix bugs or the build.
+PERFORMANCE_PATCHES = ("qt6_disable_parallel_fills.patch", "qt6_avoid_large_table_accessibility.patch")
+SCENARIOS = ("fills", "table_view", "tree_view")
+# Item view accessibility costs nothing until a screen reader shows up, so the views are also
+# timed with accessibility active
+ACCESSIBILITY_SCENARIOS = ("table_view", "tree_view")
+DEFAULT_SPANS = (16, 256, 4096)
+CONFIGURE_OPTIONS = ["-release", "-opensource", "-confirm-license", "-nomake", "examples", "-nomake", "tests",
+	"-no-glib", "-qt-libpng", "-qt-libjpeg", "-qt-pcre"]
+UNPATCHED = "unpatched"
+ALL_PATCHES = "all patches"
+
+
+def all_patches():
+	return sorted(p for p in QT_PATCHES_PATH.iterdir() if p.suffix == ".patch")
+
+
+def without_name(patch):
+	return f"without {patch.name}"
+
+
+def prepare_source(work_dir, qt_source=None, mirror=DEFAULT_QT_MIRROR):
+	"""Return a qtbase git checkout at qt_version, cloning one into `work_dir` if needed."""
+	if qt_source:
+		qtbase = Path(qt_source)
+		qtbase = qtbase / "qtbase" if (qtbase / "qtbase").is_dir() else qtbase
+		if not (qtbase / ".git").exists():
+			raise RuntimeError(f"{qtbase} is not a qtbase git checkout")
+		return qtbase
+	qtbase = Path(work_dir) / "qtbase"
+	if not qtbase.exists():
+		if subprocess.call(["git", "clone", "-b", qt_version, "--depth", "1", f"{mirror}qtbase.git", str(qtbase)]) != 0:
+			raise RuntimeError("Failed to clone qtbase")
+	return qtbase
+
+
+def reset_source(qtbase):
+	# Only files a patch touched change, so ninja only rebuilds what depends on them
+	if subprocess.call(["git", "checkout", "--", "."], cwd=qtbase) != 0:
+		raise RuntimeError(f"Failed to reset {qtbase}")
+	subprocess.call(["git", "clean", "-fdq"], cwd=qtbase)
+
+
+def apply_patches(qtbase, patches):
+	"""Apply `patches` to a clean `qtbase`. Returns the patch that failed to apply, or None."""
+	reset_source(qtbase)
+	for patch in patches:
+		# The patches are made against the qt5 super repository, strip the qtbase/ prefix
+		if subprocess.call(["git", "apply", "-p2", str(patch)], cwd=qtbase) != 0:
+			reset_source(qtbase)
+			return patch
+	return None
+
+
+def build_qtbase(qtbase, build_dir, prefix, jobs=None, configure_options=CONFIGURE_OPTIONS):
+	build_dir = Path(build_dir)
+	if not (build_dir / "CMakeCache.txt").exists():
+		build_dir.mkdir(parents=True, exist_ok=True)
+		configure = "configure.bat" if sys.platform == "win32" else "configure"
+		cmd = [str(Path(qtbase).resolve() / configure), "-prefix", str(prefix)] + configure_options
+		if subprocess.call(cmd, cwd=build_dir) != 0:
+			raise RuntimeError("Failed to configure qtbase")
+	build = ["cmake", "--build", "."] + (["--parallel", str(jobs)] if jobs else [])
+	if subprocess.call(build, cwd=build_dir) != 0:
+		raise RuntimeError("Failed to build qtbase")
+	if Path(prefix).exists():
+		shutil.rmtree(prefix)
+	if subprocess.call(["cmake", "--install", ".", "--prefix", str(prefix)], cwd=build_dir) != 0:
+		raise RuntimeError("Failed to install qtbase")
+
+
+def run_variant(prefix, workloads_dir, iterations, rows, spans, repeat, jobs=None):
+	"""Time the workloads against the Qt in `prefix`, returning median seconds per scenario."""
+	binary = qt_workloads_benchmark.build_workloads(prefix, workloads_dir, jobs)
+	library_paths = [Path(prefix) / ("bin" if sys.platform == "win32" else "lib")]
+	report = qt_workloads_benchmark.run_benchmark(binary, SCENARIOS, iterations, rows, spans, repeat, library_paths)
+	results = {name: value["median_seconds"] for name, value in report["results"].items()}
+	report = qt_workloads_benchmark.run_benchmark(binary, ACCESSIBILITY_SCENARIOS, iterations, rows, spans, repeat,
+		library_paths, accessibility=True)
+	results.update({f"{name}+a11y": value["median_seconds"] for name, value in report["results"].items()})
+	return results
+
+
+def patch_impact(variants, patches):
+	"""Percent of each scenario's time each patch saves, relative to the build without it.
+
+	Positive numbers mean the patch makes the scenario faster."""
+	patched = variants.get(ALL_PATCHES, {}).get("results")
+	if patched is None:
+		return {}
+	impact = {}
+	for name in [without_name(p) for p in patches] + [UNPATCHED]:
+		results = variants.get(name, {}).get("results")
+		if results is None:
+			continue
+		impact[name] = {
+			scenario: round((seconds - patched[scenario]) * 100.0 / seconds, 2) if seconds else 0.0
+			for scenario, seconds in results.items() if scenario in patched
+		}
+	return impact
+
+
+def print_impact(impact):
+	scenarios = sorted({s for values in impact.values() for s in values})
+	print(f"\n{'Time saved by the patches (%)':48}" + "".join(f"{s:>16}" for s in scenarios))
+	for name, values in impact.items():
+		label = "all patches vs unpatched" if name == UNPATCHED else name.replace("without ", "")
+		print(f"{label:48}" + "".join(f"{values[s]:>+16.1f}" if s in values else f"{'':>16}" for s in scenarios))
+
+
+def run_benchmark(work_dir, patches, qt_source=None, mirror=DEFAULT_QT_MIRROR, iterations=3, rows=1000000,
+		spans=DEFAULT_SPANS, repeat=3, jobs=None):
+	work_dir = Path(work_dir).resolve()
+	qtbase = prepare_source(work_dir, qt_source, mirror)
+	every_patch = all_patches()
+	variant_patches = [(ALL_PATCHES, every_patch)]
+	variant_patches += [(without_name(p), [q for q in every_patch if q != p]) for p in patches]
+	variant_patches.append((UNPATCHED, []))
+
+	variants = {}
+	for name, applied in variant_patches:
+		print(f"\n=== {name} ===")
+		failed = apply_patches(qtbase, applied)
+		if failed is not None:
+			# Patches can depend on each other, leaving one out may break the next
+			print(f"Skipping {name}: {failed.name} does not apply")
+			variants[name] = {"skipped": f"{failed.name} does not apply"}
+			continue
+		slug = name.replace(" ", "-").replace(".patch", "")
+		prefix = work_dir / "install" / slug
+		build_qtbase(qtbase, work_dir / "build", prefix, jobs)
+		variants[name] = {
+			"patches": [p.name for p in applied],
+			"results": run_variant(prefix, work_dir / "workloads" / slug, iterations, rows, spans, repeat, jobs),
+		}
+	reset_source(qtbase)
+
+	impact = patch_impact(variants, patches)
+	print_impact(impact)
+	return {
+		"schema_version": 1,
+		"generated_at_utc": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+		"qt_version": qt_version,
+		"host": {"platform": platform.platform(), "machine": platform.machine(), "cpu_count": os.cpu_count()},
+		"iterations": iterations,
+		"rows": rows,
+		"spans": list(spans),
+		"repeat": repeat,
+		"patches": [p.name for p in patches],
+		"variants": variants,
+		"impact_percent": impact,
+	}
+
+
+def compare_results(old, new, threshold=qt_workloads_benchmark.DEFAULT_REGRESSION_THRESHOLD):
+	"""Compare the fully patched build of two runs, e.g. before and after a patch update."""
+	old_results = old["variants"].get(ALL_PATCHES, {}).get("results", {})
+	new_results = new["variants"].get(ALL_PATCHES, {}).get("results", {})
+	regressions = []
+	print(f"{'Scenario (ms)':20} {'Old':>10} {'New':>10} {'%':>8}")
+	for name, new_value in new_results.items():
+		old_value = old_results.get(name)
+		if old_value is None:
+			continue
+		percent = (new_value - old_value) * 100.0 / old_value if old_value else 0.0
+		marker = ""
+		if percent > threshold:
+			regressions.append(name)
+			marker = "  REGRESSED"
+		print(f"{name:20} {old_value * 1000:>10.1f} {new_value * 1000:>10.1f} {percent:>+8.1f}{marker}")
+	return regressions
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Measure the runtime impact of each patch in qt_patches/")
+	parser.add_argument("--qt-source", help="existing qtbase (or qt5 with qtbase) git checkout at the target version")
+	parser.add_argument("--mirror", default=DEFAULT_QT_MIRROR, help="where to clone qtbase from")
+	parser.add_argument("--work-dir", default="build/qt-patch-benchmark", help="where to build the variants")
+	parser.add_argument("--patches", default=",".join(PERFORMANCE_PATCHES),
+		help="comma separated patches to measure, or 'all'")
+	parser.add_argument("--iterations", type=int, default=3, help="iterations of each scenario per run")
+	parser.add_argument("--rows", type=int, default=1000000, help="rows in the table and tree view models")
+	parser.add_argument("--spans", default=",".join(str(s) for s in DEFAULT_SPANS),
+		help="comma separated scanline counts of the fill scenario")
+	parser.add_argument("--repeat", type=int, default=3, help="fresh processes per measurement")
+	parser.add_argument("-j", "--jobs", type=int, help="parallel build jobs")
+	parser.add_argument("--output", default="artifacts/qt-patch-benchmark.json", help="where to write the JSON results")
+	parser.add_argument("--compare", help="earlier results to compare the fully patched build against")
+	parser.add_argument("--threshold", type=float, default=qt_workloads_benchmark.DEFAULT_REGRESSION_THRESHOLD,
+		help="regression threshold in percent")
+	args = parser.parse_args(argv)
+
+	available = {p.name: p for p in all_patches()}
+	if args.patches == "all":
+		patches = list(available.values())
+	else:
+		names = [n.strip() for n in args.patches.split(",") if n.strip()]
+		unknown = [n for n in names if n not in available]
+		if unknown:
+			parser.error(f"unknown patches: {', '.join(unknown)}")
+		patches = [available[n] for n in names]
+
+	report = run_benchmark(args.work_dir, patches, args.qt_source, args.mirror, args.iterations, args.rows,
+		[int(s) for s in args.spans.split(",") if s], args.repeat, args.jobs)
+	output = Path(args.output)
+	output.parent.mkdir(parents=True, exist_ok=True)
+	with output.open("w", encoding="utf-8") as f:
+		json.dump(report, f, indent=2)
+		f.write("\n")
+	print(f"Results written to {output}")
+
+	if args.compare:
+		with open(args.compare, "r", encoding="utf-8") as f:
+			baseline = json.load(f)
+		if compare_results(baseline, report, args.threshold):
+			return 1
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
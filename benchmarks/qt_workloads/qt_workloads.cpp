@@ -0,0 +1,381 @@
+// Offscreen Qt workloads, used to train PGO builds and to benchmark Qt and its patches. Each
+// scenario exercises a hot path of item view heavy desktop applications: large table and
+// tree views, text rendering and painting. Wall times are printed as JSON on stdout.
+
+#include <QAbstractItemModel>
+#include <QAccessible>
+#include <QAbstractTableModel>
+#include <QApplication>
+#include <QCommandLineParser>
+#include <QElapsedTimer>
+#include <QFontDatabase>
+#include <QFontMetrics>
+#include <QHeaderView>
+#include <QImage>
+#include <QItemSelectionModel>
+#include <QJsonDocument>
+#include <QJsonObject>
+#include <QLinearGradient>
+#include <QPainter>
+#include <QPainterPath>
+#include <QRadialGradient>
+#include <QScrollBar>
+#include <QTableView>
+#include <QTextDocument>
+#include <QTextLayout>
+#include <QTreeView>
+
+#include <cstdio>
+#include <functional>
+
+namespace
+{
+	QString addressText(quint64 address)
+	{
+		return QStringLiteral("0x%1").arg(address, 16, 16, QLatin1Char('0'));
+	}
+
+	QString instructionText(int row)
+	{
+		return QStringLiteral("mov     rax, qword [rbp-0x%1]  ; sub_%2")
+			.arg(row % 256, 0, 16)
+			.arg(0x401000 + (row / 64) * 0x40, 0, 16);
+	}
+
+	class LargeTableModel : public QAbstractTableModel
+	{
+		int m_rows;
+
+	public:
+		explicit LargeTableModel(int rows) : m_rows(rows) {}
+
+		int rowCount(const QModelIndex& parent = QModelIndex()) const override { return parent.isValid() ? 0 : m_rows; }
+		int columnCount(const QModelIndex& parent = QModelIndex()) const override { return parent.isValid() ? 0 : 4; }
+
+		QVariant data(const QModelIndex& index, int role) const override
+		{
+			if (!index.isValid())
+				return QVariant();
+			if (role == Qt::ForegroundRole && index.column() == 2)
+				return QVariant::fromValue(QColor(index.row() % 2 ? 0x2080c0 : 0xc04020));
+			if (role != Qt::DisplayRole)
+				return QVariant();
+			switch (index.column())
+			{
+			case 0:
+				return addressText(0x400000ull + quint64(index.row()) * 4);
+			case 1:
+				return QStringLiteral("sub_%1").arg(0x401000 + (index.row() / 64) * 0x40, 0, 16);
+			case 2:
+				return index.row() % 97;
+			default:
+				return instructionText(index.row());
+			}
+		}
+
+		QVariant headerData(int section, Qt::Orientation orientation, int role) const override
+		{
+			if (orientation == Qt::Horizontal && role == Qt::DisplayRole)
+				return QStringList {"Address", "Function", "Refs", "Instruction"}.value(section);
+			return QAbstractTableModel::headerData(section, orientation, role);
+		}
+	};
+
+	// Two levels, the internal id of a child is its parent row plus one
+	class LargeTreeModel : public QAbstractItemModel
+	{
+		int m_parents;
+		int m_children;
+
+	public:
+		LargeTreeModel(int parents, int children) : m_parents(parents), m_children(children) {}
+
+		QModelIndex index(int row, int column, const QModelIndex& parent = QModelIndex()) const override
+		{
+			if (!hasIndex(row, column, parent))
+				return QModelIndex();
+			return createIndex(row, column, parent.isValid() ? quintptr(parent.row() + 1) : quintptr(0));
+		}
+
+		QModelIndex parent(const QModelIndex& child) const override
+		{
+			if (!child.isValid() || child.internalId() == 0)
+				return QModelIndex();
+			return createIndex(int(child.internalId() - 1), 0, quintptr(0));
+		}
+
+		int rowCount(const QModelIndex& parent = QModelIndex()) const override
+		{
+			if (!parent.isValid())
+				return m_parents;
+			if (parent.internalId() == 0 && parent.column() == 0)
+				return m_children;
+			return 0;
+		}
+
+		int columnCount(const QModelIndex& = QModelIndex()) const override { return 2; }
+
+		QVariant data(const QModelIndex& index, int role) const override
+		{
+			if (!index.isValid() || role != Qt::DisplayRole)
+				return QVariant();
+			if (index.internalId() == 0)
+				return index.column() == 0 ? QStringLiteral("sub_%1").arg(0x401000 + index.row() * 0x1000, 0, 16) : QVariant(m_children);
+			int row = int(index.internalId() - 1) * m_children + index.row();
+			return index.column() == 0 ? addressText(0x401000ull + quint64(row) * 4) : QVariant(instructionText(row));
+		}
+	};
+
+	template <typename View>
+	void scrollThrough(View& view, int steps)
+	{
+		QScrollBar* bar = view.verticalScrollBar();
+		for (int i = 0; i <= steps; i++)
+		{
+			bar->setValue(int(qint64(bar->maximum()) * i / steps));
+			view.viewport()->grab();
+		}
+	}
+
+	template <typename View>
+	void selectAndJump(View& view, int jumps)
+	{
+		QAbstractItemModel* model = view.model();
+		int rows = model->rowCount();
+		for (int i = 0; i < jumps; i++)
+		{
+			int row = int((qint64(i) * 7919 * 7907) % rows);
+			QModelIndex index = model->index(row, 0);
+			view.selectionModel()->select(index, QItemSelectionModel::ClearAndSelect | QItemSelectionModel::Rows);
+			view.scrollTo(index, QAbstractItemView::PositionAtCenter);
+			view.viewport()->grab();
+		}
+	}
+
+	void runTableView(int rows, int iterations)
+	{
+		LargeTableModel model(rows);
+		QTableView view;
+		view.setModel(&model);
+		view.verticalHeader()->setDefaultSectionSize(18);
+		view.horizontalHeader()->setStretchLastSection(true);
+		view.resize(1280, 800);
+		view.show();
+		QApplication::processEvents();
+		for (int i = 0; i < iterations; i++)
+		{
+			scrollThrough(view, 200);
+			selectAndJump(view, 100);
+		}
+	}
+
+	void runTreeView(int rows, int iterations)
+	{
+		const int children = 1000;
+		LargeTreeModel model(qMax(1, rows / children), children);
+		QTreeView view;
+		view.setUniformRowHeights(true);
+		view.setModel(&model);
+		view.resize(1280, 800);
+		view.show();
+		QApplication::processEvents();
+		for (int i = 0; i < iterations; i++)
+		{
+			view.expandAll();
+			QApplication::processEvents();
+			scrollThrough(view, 200);
+			view.collapseAll();
+			QApplication::processEvents();
+		}
+	}
+
+	void runText(int iterations)
+	{
+		QImage image(1600, 1200, QImage::Format_ARGB32_Premultiplied);
+		QFont mono = QFontDatabase::systemFont(QFontDatabase::FixedFont);
+		QFont proportional = QApplication::font();
+		QString html;
+		for (int i = 0; i < 200; i++)
+			html += QStringLiteral("<p><b>sub_%1</b> calls <i>%2</i> with <code>%3</code> and %4 more references.</p>")
+				.arg(0x401000 + i * 0x40, 0, 16)
+				.arg(addressText(0x500000ull + quint64(i) * 8))
+				.arg(instructionText(i))
+				.arg(i * 3);
+		QTextDocument document;
+		document.setHtml(html);
+
+		for (int i = 0; i < iterations; i++)
+		{
+			image.fill(Qt::white);
+			QPainter painter(&image);
+			painter.setFont(mono);
+			QFontMetrics metrics(mono);
+			for (int line = 0; line < 60; line++)
+			{
+				int y = metrics.ascent() + line * metrics.height();
+				QString address = addressText(0x401000ull + quint64(i * 60 + line) * 4);
+				painter.setPen(QColor(0x2080c0));
+				painter.drawText(4, y, address);
+				painter.setPen(Qt::black);
+				painter.drawText(8 + metrics.horizontalAdvance(address), y, instructionText(i * 60 + line));
+			}
+
+			QTextLayout layout(QString(instructionText(i) + QLatin1Char(' ')).repeated(40), proportional);
+			layout.beginLayout();
+			qreal height = 0;
+			for (QTextLine line = layout.createLine(); line.isValid(); line = layout.createLine())
+			{
+				line.setLineWidth(700);
+				line.setPosition(QPointF(0, height));
+				height += line.height();
+			}
+			layout.endLayout();
+			layout.draw(&painter, QPointF(850, 0));
+
+			document.setTextWidth(700 + (i % 3) * 40);
+			painter.translate(850, height + 10);
+			document.drawContents(&painter, QRectF(0, 0, 740, 1200));
+		}
+	}
+
+	void runPainting(int iterations)
+	{
+		QImage image(1600, 1200, QImage::Format_ARGB32_Premultiplied);
+		QImage sprite(256, 256, QImage::Format_ARGB32_Premultiplied);
+		sprite.fill(Qt::transparent);
+		{
+			QPainter painter(&sprite);
+			QRadialGradient gradient(128, 128, 128);
+			gradient.setColorAt(0, QColor(255, 200, 0, 255));
+			gradient.setColorAt(1, QColor(0, 80, 200, 0));
+			painter.fillRect(sprite.rect(), gradient);
+		}
+
+		for (int i = 0; i < iterations; i++)
+		{
+			image.fill(QColor(0x202020));
+			QPainter painter(&image);
+
+			// Graph view: blocks, edges as bezier curves and arrow heads
+			painter.setRenderHint(QPainter::Antialiasing);
+			for (int block = 0; block < 200; block++)
+			{
+				QRectF rect(40 + (block % 20) * 76, 40 + (block / 20) * 110, 64, 48);
+				QLinearGradient gradient(rect.topLeft(), rect.bottomLeft());
+				gradient.setColorAt(0, QColor(0x3a3a3a));
+				gradient.setColorAt(1, QColor(0x2a2a2a));
+				painter.setBrush(gradient);
+				painter.setPen(QPen(QColor(0x808080), 1));
+				painter.drawRoundedRect(rect, 4, 4);
+
+				QPainterPath edge(rect.center() + QPointF(0, 24));
+				QPointF target(40 + ((block * 7) % 20) * 76 + 32, 40 + ((block / 20 + 1) % 10) * 110);
+				edge.cubicTo(edge.currentPosition() + QPointF(0, 60), target - QPointF(0, 60), target);
+				painter.setBrush(Qt::NoBrush);
+				painter.setPen(QPen(block % 3 ? QColor(0x40c040) : QColor(0xc04040), 1.5));
+				painter.drawPath(edge);
+			}
+
+			// Minimap style scaled images and dashed lines
+			painter.setRenderHint(QPainter::SmoothPixmapTransform);
+			for (int j = 0; j < 40; j++)
+			{
+				painter.save();
+				painter.translate(800, 600);
+				painter.rotate(j * 9);
+				painter.scale(0.5 + (j % 5) * 0.2, 0.5 + (j % 5) * 0.2);
+				painter.drawImage(QPointF(-128, -128), sprite);
+				painter.restore();
+			}
+			painter.setRenderHint(QPainter::Antialiasing, false);
+			painter.setPen(QPen(QColor(0xa0a0a0), 1, Qt::DashLine));
+			for (int y = 0; y < image.height(); y += 8)
+				painter.drawLine(0, y, image.width(), y + (i % 16));
+		}
+	}
+
+	// Rectangle fills of `spans` scanlines, opaque and blended
+	void runFills(int spans, int iterations)
+	{
+		QImage image(2048, qMax(spans, 1), QImage::Format_ARGB32_Premultiplied);
+		for (int i = 0; i < iterations; i++)
+		{
+			QPainter painter(&image);
+			painter.fillRect(image.rect(), QColor(0x30, 0x60, 0x90));
+			painter.fillRect(image.rect(), QColor(0xff, 0x80, 0x00, 0x80));
+			painter.setCompositionMode(QPainter::CompositionMode_Source);
+			painter.fillRect(image.rect(), Qt::transparent);
+		}
+	}
+}
+
+int main(int argc, char* argv[])
+{
+	QApplication app(argc, argv);
+	QCommandLineParser parser;
+	parser.setApplicationDescription("Offscreen Qt workloads for PGO training and benchmarks");
+	parser.addHelpOption();
+	QCommandLineOption scenarioOption("scenario", "Scenario to run (table_view, tree_view, text, painting, fills), can be repeated.", "name");
+	QCommandLineOption iterationsOption("iterations", "Iterations of each scenario.", "count", "3");
+	QCommandLineOption rowsOption("rows", "Rows in the table and tree view models.", "count", "1000000");
+	QCommandLineOption spansOption("spans", "Comma separated scanline counts of the fill scenario.", "list", "16,256,4096");
+	QCommandLineOption accessibilityOption("accessibility", "Activate accessibility, as if a screen reader was running.");
+	parser.addOptions({scenarioOption, iterationsOption, rowsOption, spansOption, accessibilityOption});
+	parser.process(app);
+
+	// No platform accessibility under offscreen, but Qt then still creates the interfaces and
+	// sends the update events that item views cost with a screen reader active
+	bool accessibility = parser.isSet(accessibilityOption);
+#if QT_CONFIG(accessibility)
+	if (accessibility)
+		QAccessible::setActive(true);
+#else
+	accessibility = false;
+#endif
+
+	QStringList scenarios = parser.values(scenarioOption);
+	if (scenarios.isEmpty())
+		scenarios = QStringList {"table_view", "tree_view", "text", "painting", "fills"};
+	int iterations = parser.value(iterationsOption).toInt();
+	int rows = parser.value(rowsOption).toInt();
+
+	QJsonObject results;
+	auto timed = [&](const QString& name, const std::function<void()>& run) {
+		QElapsedTimer timer;
+		timer.start();
+		run();
+		results[name] = QJsonObject {{"seconds", timer.nsecsElapsed() / 1e9}, {"iterations", iterations}};
+	};
+
+	for (const QString& scenario : scenarios)
+	{
+		if (scenario == "table_view")
+			timed(scenario, [&] { runTableView(rows, iterations); });
+		else if (scenario == "tree_view")
+			timed(scenario, [&] { runTreeView(rows, iterations); });
+		else if (scenario == "text")
+			timed(scenario, [&] { runText(iterations * 20); });
+		else if (scenario == "painting")
+			timed(scenario, [&] { runPainting(iterations * 5); });
+		else if (scenario == "fills")
+		{
+			for (const QString& spans : parser.value(spansOption).split(',', Qt::SkipEmptyParts))
+				timed(QStringLiteral("fills_%1").arg(spans.toInt()), [&] { runFills(spans.toInt(), iterations * 50); });
+		}
+		else
+		{
+			fprintf(stderr, "Unknown scenario %s\n", qPrintable(scenario));
+			return 2;
+		}
+	}
+
+	QJsonObject output {
+		{"qt_version", QString::fromLatin1(qVersion())},
+		{"platform", QApplication::platformName()},
+		{"rows", rows},
+		{"accessibility", accessibility},
+		{"scenarios", results},
+	};
+	printf("%s\n", QJsonDocument(output).toJson(QJsonDocument::Compact).constData());
+	return 0;
+}
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# Builds the offscreen workloads in benchmarks/qt_workloads against a Qt install and times
+# them: large table and tree views, text rendering, painting and raster fills. build.py runs
+# them to train PGO builds and to benchmark the result. Each run is a fresh process under the
+# `offscreen` platform so it works on headless CI agents.
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+
+WORKLOADS_SOURCE_PATH = Path(__file__).resolve().parent / "qt_workloads"
+SCENARIOS = ("table_view", "tree_view", "text", "painting", "fills")
+DEFAULT_REGRESSION_THRESHOLD = 10.0
+
+
+def source_digest():
+	"""Hash of the workload sources, which decide what a PGO profile is trained on."""
+	digest = hashlib.sha256()
+	for path in sorted(WORKLOADS_SOURCE_PATH.iterdir()):
+		if path.is_file():
+			digest.update(path.name.encode("utf-8"))
+			digest.update(path.read_bytes())
+	return digest.hexdigest()
+
+
+def build_workloads(qt_prefix, build_dir, jobs=None):
+	"""Configure and build the workloads against the Qt at `qt_prefix`, returning the executable."""
+	build_dir = Path(build_dir)
+	build_dir.mkdir(parents=True, exist_ok=True)
+	configure = ["cmake", "-G", "Ninja", "-S", str(WORKLOADS_SOURCE_PATH), "-B", str(build_dir),
+		"-DCMAKE_BUILD_TYPE=Release", f"-DCMAKE_PREFIX_PATH={qt_prefix}"]
+	if subprocess.call(configure) != 0:
+		raise RuntimeError("Failed to configure the Qt workloads")
+	build = ["cmake", "--build", str(build_dir)] + (["--parallel", str(jobs)] if jobs else [])
+	if subprocess.call(build) != 0:
+		raise RuntimeError("Failed to build the Qt workloads")
+	return build_dir / ("qt_workloads.exe" if sys.platform == "win32" else "qt_workloads")
+
+
+def _environment(library_paths=(), extra_env=None):
+	env = dict(os.environ)
+	env.update(extra_env or {})
+	env["QT_QPA_PLATFORM"] = "offscreen"
+	if library_paths:
+		name = {"win32": "PATH", "darwin": "DYLD_LIBRARY_PATH"}.get(sys.platform, "LD_LIBRARY_PATH")
+		env[name] = os.pathsep.join([str(p) for p in library_paths] + ([env[name]] if env.get(name) else []))
+	return env
+
+
+def run_once(binary, scenarios=SCENARIOS, iterations=3, rows=1000000, spans=(16, 256, 4096), library_paths=(), extra_env=None,
+		accessibility=False):
+	cmd = [str(binary), "--iterations", str(iterations), "--rows", str(rows), "--spans", ",".join(str(s) for s in spans)]
+	if accessibility:
+		cmd.append("--accessibility")
+	for scenario in scenarios:
+		cmd += ["--scenario", scenario]
+	proc = subprocess.run(cmd, env=_environment(library_paths, extra_env), stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+	if proc.returncode != 0:
+		raise RuntimeError(f"Qt workloads failed:\n{proc.stderr[-2000:]}")
+	return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(binary, scenarios=SCENARIOS, iterations=3, rows=1000000, spans=(16, 256, 4096), repeat=3,
+		library_paths=(), extra_env=None, accessibility=False):
+	runs = [run_once(binary, scenarios, iterations, rows, spans, library_paths, extra_env, accessibility) for _ in range(repeat)]
+	results = {}
+	for name in runs[0]["scenarios"]:
+		seconds = [r["scenarios"][name]["seconds"] for r in runs]
+		results[name] = {"median_seconds": statistics.median(seconds), "min_seconds": min(seconds), "runs_seconds": seconds}
+		print(f"{name:14} {results[name]['median_seconds'] * 1000:10.1f} ms")
+	return {
+		"schema_version": 1,
+		"generated_at_utc": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+		"qt_version": runs[0]["qt_version"],
+		"platform": runs[0]["platform"],
+		"host": {"platform": platform.platform(), "machine": platform.machine()},
+		"binary": str(binary),
+		"iterations": iterations,
+		"rows": rows,
+		"accessibility": accessibility,
+		"repeat": repeat,
+		"results": results,
+	}
+
+
+def compare_results(old, new, threshold=DEFAULT_REGRESSION_THRESHOLD):
+	regressions = []
+	print(f"{'Scenario (ms)':14} {'Old':>10} {'New':>10} {'%':>8}")
+	for name, value in new["results"].items():
+		old_value = old["results"].get(name, {}).get("median_seconds")
+		if old_value is None:
+			continue
+		new_value = value["median_seconds"]
+		percent = (new_value - old_value) * 100.0 / old_value if old_value else 0.0
+		marker = ""
+		if percent > threshold:
+			regressions.append(name)
+			marker = "  REGRESSED"
+		print(f"{name:14} {old_value * 1000:>10.1f} {new_value * 1000:>10.1f} {percent:>+8.1f}{marker}")
+	return regressions
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Build and time offscreen Qt workloads against a Qt install")
+	parser.add_argument("--qt", help="Qt install prefix to build the workloads against")
+	parser.add_argument("--binary", help="use an already built qt_workloads executable")
+	parser.add_argument("--build-dir", default="build/qt-workloads", help="where to build the workloads")
+	parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma separated scenarios to run")
+	parser.add_argument("--iterations", type=int, default=3, help="iterations of each scenario per run")
+	parser.add_argument("--rows", type=int, default=1000000, help="rows in the table and tree view models")
+	parser.add_argument("--spans", default="16,256,4096", help="comma separated scanline counts of the fill scenario")
+	parser.add_argument("--repeat", type=int, default=3, help="fresh processes per measurement")
+	parser.add_argument("--output", default="artifacts/qt-workloads.json", help="where to write the JSON results")
+	parser.add_argument("--compare", help="earlier results to compare against")
+	parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD, help="regression threshold in percent")
+	args = parser.parse_args(argv)
+	if not args.qt and not args.binary:
+		parser.error("either --qt or --binary is required")
+
+	binary = Path(args.binary) if args.binary else build_workloads(args.qt, args.build_dir)
+	library_paths = [Path(args.qt) / ("bin" if sys.platform == "win32" else "lib")] if args.qt else []
+	report = run_benchmark(binary, [s for s in args.scenarios.split(",") if s], args.iterations, args.rows,
+		[int(s) for s in args.spans.split(",") if s], args.repeat, library_paths)
+	output = Path(args.output)
+	output.parent.mkdir(parents=True, exist_ok=True)
+	with output.open("w", encoding="utf-8") as f:
+		json.dump(report, f, indent=2)
+		f.write("\n")
+	print(f"Results written to {output}")
+
+	if args.compare:
+		with open(args.compare, "r", encoding="utf-8") as f:
+			baseline = json.load(f)
+		if compare_results(baseline, report, args.threshold):
+			return 1
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# Measures the signing orchestration in signing.py with the local stand-in signer and fake
+# timestamp servers, so it runs on any host. Each configuration signs the same generated files:
+# one invocation per file (the old jsign and codesign loops), batched, and batched with several
+# invocations at once. The startup delay stands in for JVM startup, the latency for a timestamp
+# round trip, and a failure rate on the first server exercises failover.
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import signing
+
+
+DEFAULT_REGRESSION_THRESHOLD = 10.0
+# name -> (batch size, concurrent invocations)
+CONFIGURATIONS = {
+	"per file": (1, 1),
+	"batched": (50, 1),
+	"batched x4": (50, 4),
+}
+
+
+def make_files(directory, count, size):
+	files = []
+	for i in range(count):
+		path = Path(directory) / f"file{i:05}.dll"
+		path.write_bytes(os.urandom(size))
+		files.append(str(path))
+	return files
+
+
+def run_benchmark(files=200, size=64 * 1024, startup_delay=0.3, latency=0.02, failure_rate=0.0, configurations=CONFIGURATIONS):
+	results = {}
+	with tempfile.TemporaryDirectory() as tmp:
+		paths = make_files(tmp, files, size)
+		for name, (batch_size, jobs) in configurations.items():
+			with signing.FakeTimestampServer(latency, failure_rate, seed=1) as flaky, signing.FakeTimestampServer(latency) as backup:
+				signer = signing.LocalSigner(Path(tmp) / "signatures" / name.replace(" ", "-"), [flaky.url, backup.url],
+					startup_delay=startup_delay, batch_size=batch_size, jobs=jobs)
+				report = signing.sign_files(signer, [paths], retries=0)
+				timestamps = {"requests": flaky.requests + backup.requests, "failures": flaky.failures}
+			if report["failed"]:
+				raise RuntimeError(f"{name}: {len(report['failed'])} files were not signed")
+			results[name] = {key: report[key] for key in ("seconds", "batches", "invocations", "failovers")}
+			results[name]["timestamps"] = timestamps
+			print(f"{name:20} {report['seconds']:8.2f} s  {report['invocations']:5} invocations  {report['failovers']:3} failovers")
+	return {
+		"schema_version": 1,
+		"generated_at_utc": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+		"host": {"platform": platform.platform(), "machine": platform.machine(), "cpu_count": os.cpu_count()},
+		"files": files,
+		"size": size,
+		"startup_delay": startup_delay,
+		"latency": latency,
+		"failure_rate": failure_rate,
+		"results": results,
+	}
+
+
+def compare_results(old, new, threshold=DEFAULT_REGRESSION_THRESHOLD):
+	regressions = []
+	print(f"{'Configuration (s)':20} {'Old':>10} {'New':>10} {'%':>8}")
+	for name, value in new["results"].items():
+		old_value = old["results"].get(name, {}).get("seconds")
+		if old_value is None:
+			continue
+		new_value = value["seconds"]
+		percent = (new_value - old_value) * 100.0 / old_value if old_value else 0.0
+		marker = ""
+		if percent > threshold:
+			regressions.append(name)
+			marker = "  REGRESSED"
+		print(f"{name:20} {old_value:>10.2f} {new_value:>10.2f} {percent:>+8.1f}{marker}")
+	return regressions
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Benchmark batched and concurrent signing with the local stand-in signer")
+	parser.add_argument("--files", type=int, default=200, help="files to sign")
+	parser.add_argument("--size", type=int, default=64 * 1024, help="bytes per file")
+	parser.add_argument("--startup-delay", type=float, default=0.3, help="seconds each signer invocation takes to start")
+	parser.add_argument("--latency", type=float, default=0.02, help="seconds per timestamp request")
+	parser.add_argument("--failure-rate", type=float, default=0.0, help="share of requests the first timestamp server fails")
+	parser.add_argument("--output", default="artifacts/signing-benchmark.json", help="where to write the JSON results")
+	parser.add_argument("--compare", help="earlier results to compare against")
+	parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD, help="regression threshold in percent")
+	args = parser.parse_args(argv)
+
+	report = run_benchmark(args.files, args.size, args.startup_delay, args.latency, args.failure_rate)
+	output = Path(args.output)
+	output.parent.mkdir(parents=True, exist_ok=True)
+	with output.open("w", encoding="utf-8") as f:
+		json.dump(report, f, indent=2)
+		f.write("\n")
+	print(f"Results written to {output}")
+
+	if args.compare:
+		with open(args.compare, "r", encoding="utf-8") as f:
+			baseline = json.load(f)
+		if compare_results(baseline, report, args.threshold):
+			return 1
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -7,14 +7,33 @@ import glob
 import zipfile
 import argparse
 import platform
-import datetime
+import atexit
+import concurrent.futures
+import time
 import tempfile
+import json
 
 from math import ceil
 from pathlib import Path
 
-from build_metadata import emit_build_metadata
-from target_qt6_version import qt_version, llvm_version, msvc_build, msvc_dir_name, vs_version, min_macos, qt_modules, pyside_modules
+from build_metadata import emit_build_metadata, update_build_metadata
+from build_timing import StepTimer
+import ninja_log
+import build_failures
+import build_jobs
+import pyside_index_finder
+import step_cache
+import build_pgo
+import allow_thread_policy
+import qt_profiles
+import elf_deps
+import signing
+import libclang_cache
+import build_log
+from build_pipeline import (run_checked, remove_dir, install_staged_output, bundle_qt_plugins, bundle_pyside, extract_symbols, collect_build_pdbs,
+	sign_tree, add_tree_to_zip, compile_bytecode, RoleArchives, LINUX_PLUGIN_TYPES, DWP_TOOLS, find_dwp, package_split_dwarf)
+from benchmarks import qt_workloads_benchmark
+from target_qt6_version import qt_version, llvm_version, msvc_build, msvc_dir_name, vs_version, min_macos, qt_modules, pyside_modules, artifact_role_rules, qt_feature_profiles
 
 
 MAKE_CMD = "ninja"
@@ -25,18 +44,12 @@ PYSIDE_REPO_URL = "https://codereview.qt-project.org/pyside/pyside-setup"
 ICU_REPO_URL = "https://github.com/unicode-org/icu.git"
 ICU_VERSION = "release-68-2"
 QLITEHTML_REPO_URL = "https://code.qt.io/playground/qlitehtml.git"
-WINDOWS_TIMESTAMP_SERVERS = ("http://timestamp.digicert.com", "http://timestamp.comodoca.com/rfc3161")
 BUILD_RETRY_LIMIT = 5
-ZIP_SYMLINK_ATTR = 0o120755 << 16
-ZIP_EXECUTABLE_ATTR = 0o755 << 16 # -rwxr-xr-x
-ZIP_REGULAR_FILE_ATTR = 0o644 << 16 # -rw-r--r--
+BUILD_OUTPUT_TAIL_LINES = 2000
 MACOS_COMPILER = "clang_64"
 LINUX_COMPILER = "gcc_64"
-MACOS_PLUGIN_TYPES = ("platforms", "imageformats")
-LINUX_PLUGIN_TYPES = (
-	"platforms", "imageformats", "wayland-decoration-client", "wayland-graphics-integration-client",
-	"wayland-shell-integration", "platforminputcontexts"
-)
+# Linkers supported by Qt's -linker configure option, and the executable each one needs
+LINKERS = {"bfd": "ld.bfd", "gold": "ld.gold", "lld": "ld.lld", "mold": "mold"}
 BASE_BUILD_OPTS = [
     "-no-static", "-release", "-opensource", "-confirm-license", "-nomake", "examples",
 	"-nomake", "tests", "-no-feature-tuiotouch", "-qt-libpng", "-qt-libjpeg", "-qt-libb2", "-no-glib",
@@ -45,60 +58,125 @@ BASE_BUILD_OPTS = [
 ]
 
 
+step_timer = StepTimer()
+# Step output and command output go to compressed per-step logs, see build_log.py
+build_output = build_log.BuildLog().install()
+atexit.register(build_output.close)
+
+
 def step(name):
+	step_timer.start(name)
+	build_output.start_step(name)
 	print(f"\n=== Step: {name} ===")
 
 
-def run_checked(cmd, error_message, cwd=None, shell=False):
-	if subprocess.call(cmd, cwd=cwd, shell=shell) != 0:
-		print(error_message)
-		sys.exit(1)
+def ninja_jobs(cmd):
+	if "-j" in cmd:
+		return int(cmd[cmd.index("-j") + 1])
+	# Ninja's own default
+	return os.cpu_count() + 2
+
+
+def with_ninja_jobs(cmd, jobs):
+	cmd = list(cmd)
+	if "-j" in cmd:
+		cmd[cmd.index("-j") + 1] = str(jobs)
+	else:
+		cmd[1:1] = ["-j", str(jobs)]
+	return cmd
+
+
+def run_captured(cmd, cwd=None, tail_lines=BUILD_OUTPUT_TAIL_LINES):
+	# Output goes to the step log, keep the tail to find out why it failed
+	return build_output.run(cmd, cwd=cwd, tail_lines=tail_lines)
+
+
+build_retries = []
 
 
 def run_checked_with_retries(cmd, error_message, cwd=None, retry_limit=BUILD_RETRY_LIMIT):
-    # Build is sometimes unreliable but continues without issue, try up to 5 times
+	# Build is sometimes unreliable, mostly because compilers and linkers get killed when the
+	# machine runs out of memory under full parallelism. Retry those failures with fewer jobs,
+	# building the failed edges on their own first, and fail immediately on real errors.
+	jobs = ninja_jobs(cmd)
 	retry_count = 0
 	while True:
-		if subprocess.call(cmd, cwd=cwd) != 0:
-			retry_count += 1
-			if retry_count > retry_limit:
-				print(error_message)
-				sys.exit(1)
-		else:
+		returncode, tail = run_captured(cmd, cwd=cwd)
+		if returncode == 0:
 			break
+		failure = build_failures.classify_failure(returncode, tail)
+		failed = build_failures.failed_outputs(tail)
+		build_retries.append({"cwd": str(cwd), "attempt": retry_count + 1, "returncode": returncode,
+			"failure": failure, "jobs": jobs, "failed_outputs": failed})
+		print(f"\nBuild failed ({failure}) with -j {jobs}")
+		if failure not in build_failures.TRANSIENT_FAILURES or retry_count >= retry_limit:
+			print(error_message)
+			build_output.show_failure(error_message)
+			sys.exit(1)
+		retry_count += 1
+		if failure == build_failures.OOM:
+			jobs = max(1, jobs // 2)
+			cmd = with_ninja_jobs(cmd, jobs)
+		if failed:
+			print(f"Retrying {len(failed)} failed edge(s) with -j 1...")
+			returncode, tail = run_captured([cmd[0], "-j", "1"] + failed, cwd=cwd)
+			if returncode != 0:
+				failure = build_failures.classify_failure(returncode, tail)
+				build_retries.append({"cwd": str(cwd), "attempt": retry_count + 1, "returncode": returncode,
+					"failure": failure, "jobs": 1, "failed_outputs": build_failures.failed_outputs(tail)})
+				# Failing on their own without memory pressure, another full build will not help
+				if failure not in build_failures.TRANSIENT_FAILURES:
+					print(f"\nFailed edges failed again ({failure}) with -j 1")
+					print(error_message)
+					build_output.show_failure(error_message)
+					sys.exit(1)
+		print(f"Retrying build with -j {jobs} (attempt {retry_count + 1} of {retry_limit + 1})...")
 
 
-build_opts = list(BASE_BUILD_OPTS)
-if sys.platform == 'linux':
-	build_opts += ["-xcb", "-xcb-xlib"]
-
-
-def remove_dir(path):
-	if sys.platform == 'win32':
-		# Windows being Windows. Not doing this as a recursive delete from the shell will yield
-		# "access denied" errors. Even deleting the individual files from the terminal does this.
-		# Somehow, deleting this way works correctly.
-		subprocess.call('rmdir /S /Q "' + str(path) + '"', shell=True)
-	else:
-		shutil.rmtree(path)
-
+link_timings = {}
+compile_modes = {}
+# Time spent on debug info after the builds, and the .dwp packages of --split-dwarf
+symbol_timings = {}
+split_dwarf_packages = {}
 
-def install_staged_output(staged_path, user_qt_path):
-	user_qt_old_path = user_qt_path.parent / (user_qt_path.name + '-old')
 
-	if user_qt_old_path.exists():
-		print(f'Removing backup install at {user_qt_old_path}')
-		remove_dir(user_qt_old_path)
+def timed_symbol_step(name, fn, *args, **kwargs):
+	start = time.monotonic()
+	result = fn(*args, **kwargs)
+	symbol_timings[name] = symbol_timings.get(name, 0) + round((time.monotonic() - start) * 1000)
+	return result
 
-	if user_qt_path.exists():
-		print(f'Overwriting existing Qt at {user_qt_path} with {staged_path}')
-		print(f'Moving {user_qt_path} to {user_qt_old_path} just in case')
-		user_qt_path.rename(user_qt_old_path)
-	else:
-		print(f'Installing new Qt at {user_qt_path} with {staged_path}')
 
-	user_qt_path.parent.mkdir(parents=True, exist_ok=True)
-	shutil.copytree(staged_path, user_qt_path, symlinks=True)
+def report_ninja_build(build_dir, name):
+	# The analysis is diagnostic only, never fail a build because of it
+	try:
+		report = ninja_log.write_reports(build_dir, artifact_path, name)
+		if report is not None:
+			links = report["links"]
+			link_timings[name] = {
+				"count": links["count"],
+				"total_ms": links["total_ms"],
+				"max_ms": links["max_ms"],
+				"links_ms": {edge["output"]: edge["duration_ms"] for edge in links["edges"]},
+			}
+			modes = report["compile_modes"]
+			compile_modes[name] = modes
+			if args.unity is not None and modes["compile_count"] and not modes["unity_count"]:
+				print(f"Warning: --unity was requested but {name} compiled no unity sources")
+			if args.pch and modes["compile_count"] and not modes["pch_count"] and not name.startswith("pyside"):
+				print(f"Warning: --pch was requested but {name} built no precompiled headers")
+	except Exception as e:
+		print(f"Failed to analyze ninja log in {build_dir}: {e}")
+
+
+# Complete before the Qt step cache key is computed from them
+build_opts = list(BASE_BUILD_OPTS)
+if sys.platform == 'linux':
+	build_opts += ["-xcb", "-xcb-xlib", "-bundled-xcb-xinput"]
+elif sys.platform == 'darwin':
+	build_opts += ["-qt-freetype"]
+elif sys.platform == 'win32':
+	build_opts += ["-directwrite"]  # use DirectWrite for font rendering on Windows
 
 
 def normalized_platform():
@@ -111,79 +189,13 @@ def normalized_platform():
 	return sys.platform
 
 
-def should_package_file(file_name):
-	return file_name != '.DS_Store'
-
-
-def keychain_unlocker():
-	keychain_unlocker = os.environ["HOME"] + "/unlock-keychain"
-	if os.path.exists(keychain_unlocker):
-		return subprocess.call([keychain_unlocker]) == 0
-	return True
-
-
-def mac_should_strip(file_path):
-	"""Check if a file is a Mach-O binary that we should strip."""
-	if os.path.islink(file_path) or not os.path.isfile(file_path):
-		return False
-	if file_path.endswith('.o'):
-		return False
-	header = open(file_path, 'rb').read(4)
-	if header not in (b"\xcf\xfa\xed\xfe", b"\xca\xfe\xba\xbe"):
-		return False
-	# Skip binaries that are already signed with a non-ad-hoc signature.
-	# They were built by another project and it is that project's
-	# responsibility to provide debug symbols for them.
-	sig = subprocess.run(["codesign", "-d", "--verbose=2", file_path],
-		capture_output=True, text=True)
-	if sig.returncode == 0 and "Authority=" in sig.stderr:
-		return False
-	return True
-
-
-def mac_sign(path):
-	if not keychain_unlocker():
-		return False
-
-	args = ["codesign", "-f", "--options", "runtime", "--timestamp", "-s", "Developer ID"]
-	if path.endswith(".dmg"):
-		args.append(path)
-	else:
-		for f in glob.glob(path):
-			args.append(f)
-	return subprocess.call(args) == 0
-
-
-def signWindowsFiles(path: str):
-	for timeServer in WINDOWS_TIMESTAMP_SERVERS:
-		proc = subprocess.run([
-			"java", "-jar",
-			"C:\\jenkins\\jsign.jar",
-			"--name", "Binary Ninja",
-			"--url", "https://binary.ninja/",
-			"--storetype", "PIV",
-			"--storepass", os.environ['YUBIKEY_PIN'],
-			"--tsaurl", timeServer,
-			"--tsmode", "RFC3161",
-			"--alias", "AUTHENTICATION",
-			"--certfile", "C:\\jenkins\\yubi-1-user.crt",
-			path
-		], shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-		if proc.returncode == 0:
-			print("Signed {}".format(path))
-			return True
-		else:
-			print("Signing {} with timeserver: {} failed. Trying next server. {}".format(path, timeServer, proc.stdout.decode('charmap')))
-	print("Failed to sign file %s" % path)
-	return False
-
-
 def apply_patch(path, qt_source_path):
 	# On some Windows machines, git apply breaks. On others, patch breaks. Just try both, because
 	# Windows environments are so hard to predict we can't rely on anything to be sane.
-	if subprocess.call(["git", "apply", os.path.abspath(path)], cwd=qt_source_path) != 0:
-		if subprocess.call(["patch", "-p1", "-i", os.path.abspath(path)], cwd=qt_source_path) != 0:
+	if run_captured(["git", "apply", os.path.abspath(path)], cwd=qt_source_path)[0] != 0:
+		if run_captured(["patch", "-p1", "-i", os.path.abspath(path)], cwd=qt_source_path)[0] != 0:
 			print("Failed to patch source")
+			build_output.show_failure("Failed to patch source")
 			sys.exit(1)
 
 
@@ -205,6 +217,7 @@ def apply_env_defaults(args, parser):
 		sign = parse_env_bool("SIGN")
 		no_install = parse_env_bool("NO_INSTALL")
 		no_prompt = parse_env_bool("NO_PROMPT")
+		verbose = parse_env_bool("VERBOSE")
 	except ValueError as e:
 		parser.error(str(e))
 
@@ -216,15 +229,19 @@ def apply_env_defaults(args, parser):
 		args.install = True if no_install is None else not no_install
 	if args.prompt is None:
 		args.prompt = True if no_prompt is None else not no_prompt
+	if args.verbose is None:
+		args.verbose = bool(verbose)
 	if args.mirror is None:
 		args.mirror = os.environ.get("SOURCE_MIRROR")
 	if args.build_dir is None:
 		args.build_dir = os.environ.get("BUILD_DIR")
+	if args.step_cache is None:
+		args.step_cache = os.environ.get("STEP_CACHE")
 	if hasattr(args, "jobs") and args.jobs is None:
 		args.jobs = os.environ.get("JOBS", ceil(os.cpu_count()*1.1))
 
 	build_variant = os.environ.get("BUILD_VARIANT")
-	if build_variant and not (args.debug or args.asan or args.tsan):
+	if build_variant and not (args.debug or args.asan or args.tsan or args.pgo):
 		build_variant = build_variant.strip().lower()
 		if build_variant == "debug":
 			args.debug = True
@@ -232,8 +249,10 @@ def apply_env_defaults(args, parser):
 			args.asan = True
 		elif build_variant == "tsan":
 			args.tsan = True
+		elif build_variant == "pgo":
+			args.pgo = True
 		elif build_variant != "release":
-			parser.error("Invalid BUILD_VARIANT: expected release, debug, asan, or tsan")
+			parser.error("Invalid BUILD_VARIANT: expected release, debug, asan, tsan, or pgo")
 
 
 step("validate/configure inputs")
@@ -251,21 +270,47 @@ variant_group = parser.add_mutually_exclusive_group()
 variant_group.add_argument("--asan", help="build with ASAN", action="store_true")
 variant_group.add_argument("--tsan", help="build with TSAN", action="store_true")
 variant_group.add_argument("--debug", help="build a debug configuration", action="store_true")
+variant_group.add_argument("--pgo", help="build an instrumented Qt, train it with offscreen workloads and rebuild it with the profile (Linux)", action="store_true")
+parser.add_argument("--ltcg", help="build Qt with link time code generation", action="store_true")
+parser.add_argument("--linker", help="linker for Qt and PySide (Linux)", choices=LINKERS)
+parser.add_argument("--profile", help="feature trimming profile deciding which Qt modules and optional features are built",
+	choices=qt_feature_profiles, default="full")
+parser.add_argument("--pch", dest="pch", help="build Qt with precompiled headers (the Qt default)", action="store_true", default=None)
+parser.add_argument("--no-pch", dest="pch", help="build Qt without precompiled headers", action="store_false")
+parser.add_argument("--unity", help="unity build Qt and PySide, optionally with the number of sources per unity file",
+	nargs="?", type=int, const=0, default=None, metavar="BATCH")
+parser.add_argument("--symbolic", help="bind calls inside each Qt and PySide library at link time instead of through symbol lookups (Linux)", action="store_true")
+parser.add_argument("--benchmark-workloads", help="time offscreen item view, text and painting workloads against the built Qt", action="store_true")
+parser.add_argument("--workloads-baseline", help="earlier qt-workloads.json to compare the workload timings against", action="store")
 parser.add_argument("--universal", help="build for both x86_64 and arm64 (arm64 Mac host only)", action="store_true")
 parser.add_argument("--mirror", help="use source mirror", action="store")
 parser.add_argument("--sign", dest='sign', help="sign all executables", action="store_true", default=None)
 parser.add_argument("--no-sign", dest='sign', help="don't sign executables", action="store_false")
+parser.add_argument("--signer", help="signing tool, the local stand-in signs with fake timestamps on any platform (default: codesign on macOS, jsign on Windows)",
+	choices=signing.SIGNERS, default=signing.default_signer_name())
+parser.add_argument("--sign-jobs", help="signing tool invocations to run at once (default: depends on the signer)", type=int)
+parser.add_argument("--verbose", help="show the output of the build commands on the console, not only in the step logs", action="store_true", default=None)
 parser.add_argument("--qt-source", help="use Qt source directory", action="store")
 parser.add_argument("--pyside-source", help="use PySide source directory", action="store")
 parser.add_argument("--build-dir", dest="build_dir", help="Custom build directory to bypass windows PATH_MAX limits", action="store")
 parser.add_argument("--symbols", help="extract debug symbols into a separate archive and strip debug info from binaries", action="store_true", default=True)
 parser.add_argument("--no-symbols", dest="symbols", help="disable debug symbol extraction", action="store_false")
+parser.add_argument("--split-dwarf", help="keep debug info out of the links with -gsplit-dwarf and archive one .dwp package per binary (Linux)", action="store_true")
+parser.add_argument("--measure-link-rss", help="wrap the links with job_rss.py to report their peak memory next to the link times (Linux, CMake 3.21 or later)", action="store_true")
+parser.add_argument("--pipeline", help="post-process the Qt libraries while PySide is building", action="store_true")
+parser.add_argument("--allow-thread-policy", help="which PySide bindings release the GIL: all of them, only blocking and long calls, or all but value types and accessors",
+	choices=allow_thread_policy.POLICIES, default=allow_thread_policy.DEFAULT_POLICY)
+parser.add_argument("--compile-bytecode", help="ship precompiled checked-hash bytecode for the PySide Python sources", action="store_true")
+parser.add_argument("--benchmark-startup", help="measure PySide import and QApplication startup time of the build", action="store_true")
+parser.add_argument("--step-cache", help="restore and store the ICU, Qt and PySide install trees in this directory or http(s) URL", action="store")
+parser.add_argument("--step-cache-read-only", help="only restore from the step cache, never store", action="store_true")
 
 if not sys.platform.startswith("win"):
-	parser.add_argument("-j", "--jobs", dest='jobs', default=None, help="Number of build threads (Defaults to 1.1*cpu_count)")
+	parser.add_argument("-j", "--jobs", dest='jobs', default=None, help="Number of build threads, or 'auto' to size compile and link jobs from available memory (Defaults to 1.1*cpu_count)")
 
 args = parser.parse_args()
 apply_env_defaults(args, parser)
+build_output.verbose = args.verbose
 
 if args.patch:
 	args.patch = os.path.abspath(args.patch)
@@ -287,20 +332,87 @@ if args.debug:
 	build_opts.remove("-release")
 	build_opts += ["-debug"]
 
-extra_cmake_args = []
+if args.pgo:
+	pgo_compiler = build_pgo.compiler_family()
+	if sys.platform != 'linux' or pgo_compiler is None:
+		parser.error("--pgo is only supported on Linux with GCC or Clang")
+	print(f"Building with PGO ({pgo_compiler})")
+
+if args.ltcg:
+	build_opts += ["-ltcg"]
+
+if args.linker:
+	if sys.platform != 'linux':
+		parser.error("--linker is only supported on Linux")
+	if shutil.which(LINKERS[args.linker]) is None:
+		parser.error(f"The {args.linker} linker is not installed ({LINKERS[args.linker]} not found)")
+	print(f"Linking with {args.linker}")
+	build_opts += ["-linker", args.linker]
+
+feature_profile = qt_feature_profiles[args.profile]
+profile_problems = qt_profiles.check_profile(feature_profile, qt_modules, pyside_modules, LINUX_PLUGIN_TYPES)
+if profile_problems:
+	parser.error(f"The {args.profile} profile cannot build what is shipped: " + "; ".join(profile_problems))
+build_opts += qt_profiles.configure_flags(feature_profile, qt_modules)
+if args.profile != "full":
+	print(f"Trimming Qt with the {args.profile} profile: {', '.join(qt_profiles.trimmed(feature_profile, qt_modules))}")
+
+if args.pch is not None:
+	build_opts += ["-pch" if args.pch else "-no-pch"]
+
+if args.unity is not None:
+	if args.unity < 0:
+		parser.error("--unity batch size must be positive")
+	build_opts += ["-unity-build"]
+	if args.unity:
+		build_opts += ["-unity-build-batch-size", str(args.unity)]
+
+# Compiler and linker flags of the Qt build, passed to CMake by qt_configure_extra()
+compile_flags = []
+linker_flags = []
+if args.symbolic:
+	if sys.platform != 'linux':
+		parser.error("--symbolic is only supported on Linux")
+	# Qt's reduce_relocations feature links with -Bsymbolic-functions and is otherwise only
+	# enabled when configure detects linker support, so require it. -fno-semantic-interposition
+	# lets the compiler inline and call functions of the same library directly.
+	print("Building with -Bsymbolic-functions and -fno-semantic-interposition")
+	build_opts += ["-reduce-relocations"]
+	compile_flags.append("-fno-semantic-interposition")
 if args.symbols:
 	if sys.platform == 'win32':
-		debug_flag = "/Zi"
-		extra_cmake_args += ["-DCMAKE_EXE_LINKER_FLAGS=/DEBUG",
-			"-DCMAKE_MODULE_LINKER_FLAGS=/DEBUG",
-			"-DCMAKE_SHARED_LINKER_FLAGS=/DEBUG"]
+		compile_flags.append("/Zi")
+		linker_flags.append("/DEBUG")
 	elif sys.platform == 'darwin':
-		debug_flag = "-gline-tables-only"
+		compile_flags.append("-gline-tables-only")
 	else:
-		debug_flag = "-g1"
-	extra_cmake_args += [f"-DCMAKE_C_FLAGS={debug_flag}",
-		f"-DCMAKE_CXX_FLAGS={debug_flag}"]
-configure_extra = ["--"] + extra_cmake_args if extra_cmake_args else []
+		compile_flags.append("-g1")
+if args.split_dwarf:
+	if sys.platform != 'linux':
+		parser.error("--split-dwarf is only supported on Linux")
+	if not args.symbols:
+		parser.error("--split-dwarf needs debug symbols, it cannot be combined with --no-symbols")
+	if args.ltcg:
+		# The .dwo files of link time code generation are temporary files of the linker
+		parser.error("--split-dwarf cannot be combined with --ltcg")
+	if find_dwp() is None:
+		parser.error(f"--split-dwarf needs a DWARF packager ({' or '.join(DWP_TOOLS)} not found)")
+	print("Building with split DWARF")
+	compile_flags.append("-gsplit-dwarf")
+if args.measure_link_rss and sys.platform != 'linux':
+	parser.error("--measure-link-rss is only supported on Linux")
+
+
+def cmake_flag_args(compile_flags, linker_flags):
+	cmake_args = []
+	if linker_flags:
+		joined = " ".join(linker_flags)
+		cmake_args += [f"-DCMAKE_EXE_LINKER_FLAGS={joined}", f"-DCMAKE_MODULE_LINKER_FLAGS={joined}",
+			f"-DCMAKE_SHARED_LINKER_FLAGS={joined}"]
+	if compile_flags:
+		joined = " ".join(compile_flags)
+		cmake_args += [f"-DCMAKE_C_FLAGS={joined}", f"-DCMAKE_CXX_FLAGS={joined}"]
+	return cmake_args
 
 mirror = []
 if args.mirror:
@@ -342,12 +454,15 @@ if sys.platform == 'win32':
 
 platform_name = normalized_platform()
 
-# Copy libclang to the build directory
+# Extract libclang into the build directory, once per archive
 extern_libclang_artifact = Path("artifacts-extern") / "artifacts" / f"libclang_{platform_name}_{llvm_version}.zip"
+libclang_extraction = None
 if extern_libclang_artifact.exists():
-	with zipfile.ZipFile(extern_libclang_artifact) as zf:
-		zf.extractall('build')
-		os.environ['LLVM_INSTALL_DIR'] = str((Path("build") / "libclang").resolve())
+	libclang_install_dir, libclang_extraction = libclang_cache.prepare(extern_libclang_artifact,
+		Path("build") / "libclang-cache", llvm_version)
+	print(f"{'Reused' if libclang_extraction['cached'] else 'Extracted'} libclang in {libclang_install_dir} "
+		f"({libclang_extraction['seconds']:.1f} s)")
+	os.environ['LLVM_INSTALL_DIR'] = str(libclang_install_dir.resolve())
 
 if "LLVM_INSTALL_DIR" in os.environ:
 	llvm_dir = Path(os.environ["LLVM_INSTALL_DIR"]) / llvm_version
@@ -365,6 +480,57 @@ if args.build_dir is not None:
 else:
 	qt_dir = base_dir / "build"
 
+if args.asan:
+	build_variant = "asan"
+elif args.tsan:
+	build_variant = "tsan"
+elif args.debug:
+	build_variant = "debug"
+elif args.pgo:
+	build_variant = "pgo"
+else:
+	build_variant = "release"
+
+# Compile and link flags that change the build outputs, part of the step cache keys
+output_cmake_args = cmake_flag_args(compile_flags, linker_flags)
+job_pool_cmake_args = []
+
+job_plan = None
+job_memory_path = qt_dir / "job-memory.json"
+job_rss_log = qt_dir / "job-rss.log"
+link_rss_measured = False
+if str(getattr(args, "jobs", None)).lower() == "auto":
+	# Size compile and link concurrency from available memory and the peak RSS measured
+	# for each job class in previous builds, and give links their own ninja pool
+	job_plan = build_jobs.plan_jobs(build_variant, job_memory_path)
+	args.jobs = job_plan["jobs"]
+	parallel = ["-j", str(args.jobs)]
+	qt_dir.mkdir(parents=True, exist_ok=True)
+	if job_rss_log.exists():
+		job_rss_log.unlink()
+	job_pool_cmake_args = build_jobs.cmake_job_pool_args(job_plan, job_rss_log)
+	link_rss_measured = build_jobs.linker_launcher_supported()
+	print(f"Automatic jobs: {job_plan['jobs']} total, {job_plan['link_jobs']} link")
+elif args.measure_link_rss:
+	# Peak linker memory is reported next to the link times, to compare debug info modes
+	if build_jobs.linker_launcher_supported():
+		qt_dir.mkdir(parents=True, exist_ok=True)
+		if job_rss_log.exists():
+			job_rss_log.unlink()
+		job_pool_cmake_args = build_jobs.cmake_rss_launcher_args(job_rss_log, ("link",))
+		link_rss_measured = True
+	else:
+		print("CMake {}.{} or later is needed to measure link memory, continuing without".format(*build_jobs.LINKER_LAUNCHER_CMAKE_VERSION))
+
+
+def qt_configure_extra(extra_compile_flags=(), extra_linker_flags=()):
+	cmake_args = cmake_flag_args(compile_flags + list(extra_compile_flags), linker_flags + list(extra_linker_flags))
+	cmake_args += job_pool_cmake_args
+	return ["--"] + cmake_args if cmake_args else []
+
+
+configure_extra = qt_configure_extra()
+
 source_path = qt_dir / "src"
 qt_source_path = source_path / "qt"
 build_path = source_path / "build"
@@ -377,6 +543,8 @@ else:
 	qt_version_dir = qt_version
 qt_artifact_name = f'qt_{platform_name}_{qt_version}.zip'
 qt_symbols_artifact_name = f'qt_symbols_{platform_name}_{qt_version}.zip'
+artifact_roles = list(dict.fromkeys(["runtime"] + [role for role, _ in artifact_role_rules]))
+qt_role_artifact_names = {role: f'qt_{role}_{platform_name}_{qt_version}.zip' for role in artifact_roles}
 if sys.platform == 'win32':
 	compiler = msvc_dir_name
 elif sys.platform == 'darwin':
@@ -420,7 +588,7 @@ print(f"Codesigning:                 {'YES' if args.sign else 'NO'}")
 print(f"PySide:                      {'YES' if args.pyside else 'NO'}")
 print("")
 
-emit_build_metadata(
+build_metadata = emit_build_metadata(
 	repo_name="qt-build",
 	artifact_path=artifact_path,
 	paths={
@@ -450,6 +618,7 @@ emit_build_metadata(
 		"artifact_filenames": {
 			"qt": qt_artifact_name,
 			"qt_symbols": qt_symbols_artifact_name,
+			**{f"qt_{role}": name for role, name in qt_role_artifact_names.items()},
 		},
 		"archive_internal_roots": {
 			"qt": qt_archive_root,
@@ -459,6 +628,7 @@ emit_build_metadata(
 		"clean": args.clean,
 		"install": args.install,
 		"prompt": args.prompt,
+		"verbose": args.verbose,
 		"pyside": args.pyside,
 		"patch": args.patch,
 		"asan": args.asan,
@@ -467,19 +637,69 @@ emit_build_metadata(
 		"universal": args.universal,
 		"mirror": args.mirror,
 		"sign": args.sign,
+		"signer": args.signer,
+		"sign_jobs": args.sign_jobs,
 		"qt_source": args.qt_source,
 		"pyside_source": args.pyside_source,
 		"build_dir": args.build_dir,
 		"symbols": args.symbols,
+		"split_dwarf": args.split_dwarf,
+		"pipeline": args.pipeline,
+		"benchmark_startup": args.benchmark_startup,
+		"compile_bytecode": args.compile_bytecode,
+		"step_cache": args.step_cache,
+		"step_cache_read_only": args.step_cache_read_only,
+		"pgo": args.pgo,
+		"ltcg": args.ltcg,
+		"linker": args.linker,
+		"profile": args.profile,
+		"pch": args.pch,
+		"unity": args.unity,
+		"symbolic": args.symbolic,
+		"allow_thread": allow_thread_policy.describe(args.allow_thread_policy),
+		"benchmark_workloads": args.benchmark_workloads,
+		"workloads_baseline": args.workloads_baseline,
 		"jobs": getattr(args, "jobs", None),
+		"job_plan": job_plan,
 	},
 	env_var_names=(
 		"JOB_NAME", "BUILD_NUMBER", "BUILD_URL", "BRANCH_NAME", "CHANGE_ID", "WORKSPACE",
 		"PYTHONUNBUFFERED", "BUILD_DIR", "ARTIFACTS_DIR", "SOURCE_MIRROR", "JOBS", "SIGN",
 		"NO_INSTALL", "NO_PROMPT", "CLEAN", "BUILD_VARIANT", "QT_INSTALL_DIR", "LLVM_INSTALL_DIR",
-		"YUBIKEY_PIN",
+		"YUBIKEY_PIN", "STEP_CACHE",
 	),
 )
+if libclang_extraction is not None:
+	update_build_metadata(artifact_path, libclang=libclang_extraction)
+
+
+build_step_cache = None
+
+
+def write_run_metadata():
+	step_timer.stop()
+	sections = {"timings": step_timer.as_dict(), "build_retries": build_retries,
+		"link_timings": {"linker": args.linker or "default", "builds": link_timings},
+		"compile_modes": {"pch": args.pch, "unity": args.unity, "builds": compile_modes}}
+	if build_step_cache is not None:
+		sections["step_cache"] = build_step_cache.events
+	if job_plan is not None:
+		sections["job_memory"] = build_jobs.update_job_memory(job_memory_path, build_variant, job_rss_log)
+	if args.symbols:
+		sections["debug_info"] = {
+			"split_dwarf": args.split_dwarf,
+			"link_ms": {name: timing["total_ms"] for name, timing in link_timings.items()},
+			"max_link_ms": max((timing["max_ms"] for timing in link_timings.values()), default=None),
+			"peak_link_rss": build_jobs.measured_job_memory(job_rss_log).get("link") if link_rss_measured else None,
+			"symbols_ms": symbol_timings,
+			"packages": split_dwarf_packages,
+		}
+	sections["logs"] = {"events": str(artifact_path / "build-events.jsonl"), "steps": build_output.logs}
+	update_build_metadata(artifact_path, **sections)
+
+
+# Also runs on sys.exit() so failed builds still report how far they got
+atexit.register(write_run_metadata)
 
 
 qt_patches = []
@@ -491,6 +711,72 @@ pyside_patches = []
 for patch in sorted(pyside_patches_path.iterdir()):
 	if patch.suffix == '.patch':
 		pyside_patches.append(patch.resolve())
+if args.allow_thread_policy != allow_thread_policy.DEFAULT_POLICY:
+	pyside_patches.append(allow_thread_policy.PATCH_PATH)
+
+if args.step_cache:
+	build_step_cache = step_cache.StepCache(step_cache.open_backend(args.step_cache), qt_dir / "step-cache",
+		read_only=args.step_cache_read_only)
+
+# Everything that decides what the ICU, Qt and PySide steps produce. Trees built from a
+# user provided source directory are never cached, since their contents are unknown.
+toolchain_fingerprint = {
+	"system": platform.system(),
+	"machine": platform.machine(),
+	"tools": {name: tool.get("value") for name, tool in build_metadata["tools"].items()
+		if name in ("cmake", "ninja", "clang", "gcc", "cl", "xcodebuild")},
+	"windows_build_environment": build_metadata.get("windows_build_environment"),
+	"environment": {name: os.environ.get(name) for name in ("CC", "CXX", "CFLAGS", "CXXFLAGS", "LDFLAGS", "CMAKE_OSX_ARCHITECTURES")},
+}
+icu_cache_key = step_cache.cache_key("ICU", {
+	"icu_version": ICU_VERSION,
+	"platform": platform_name,
+	"toolchain": toolchain_fingerprint,
+})
+qt_cache_key = None if args.qt_source else step_cache.cache_key("Qt", {
+	"qt_version": qt_version,
+	"qt_modules": qt_modules,
+	"build_opts": build_opts,
+	# Configure writes the prefix into files of the install tree, like the pkg-config files
+	"prefix": str(install_path),
+	"cmake_args": output_cmake_args,
+	"variant": build_variant,
+	"platform": platform_name,
+	"universal": args.universal,
+	"min_macos": min_macos,
+	"toolchain": toolchain_fingerprint,
+	"patches": step_cache.patch_stack(qt_patches + ([args.patch] if args.patch else [])),
+	"icu": icu_cache_key if sys.platform == 'linux' else None,
+	"pgo_workloads": qt_workloads_benchmark.source_digest() if args.pgo else None,
+})
+pyside_cache_key = None if qt_cache_key is None or args.pyside_source else step_cache.cache_key("PySide", {
+	"qt": qt_cache_key,
+	"pyside_modules": pyside_modules,
+	"patches": step_cache.patch_stack(pyside_patches),
+	"python": [sys.implementation.name, sys.version],
+	"symbols": args.symbols,
+	"split_dwarf": args.split_dwarf,
+	"llvm_version": llvm_version,
+	"linker": args.linker,
+	"unity": args.unity,
+	"symbolic": args.symbolic,
+	"allow_thread": allow_thread_policy.describe(args.allow_thread_policy),
+})
+
+
+def restore_step_output(name, key, dest):
+	if build_step_cache is None or key is None:
+		return False
+	step(f"restore cached {name}")
+	return build_step_cache.restore(name, key, dest)
+
+
+def store_step_output(name, key, src):
+	if build_step_cache is None or key is None or build_step_cache.read_only:
+		return
+	step(f"store {name} in step cache")
+	build_step_cache.store(name, key, src)
+
 
 if args.qt_source:
 	print(f"Use existing Qt source directory at {args.qt_source}")
@@ -542,18 +828,30 @@ if args.clean:
 		(base_dir / "CMakeCache.txt").unlink()
 
 
+# Replaces the step logs of an earlier build, the steps so far were kept in memory
+build_output.attach(artifact_path / "logs", artifact_path / "build-events.jsonl")
+
+
 if args.install and user_qt_parent_path.exists():
 	if args.prompt and input("\nAn install already exists at the target location. Overwrite? ") != "y":
 		print("Aborted")
 		sys.exit(1)
 
 
+# Restored install trees make their sources and builds unnecessary. The PySide install lives
+# inside the Qt install tree, so it is only restored here on top of a restored Qt.
+qt_restored = restore_step_output("Qt", qt_cache_key, install_path)
+pyside_restored = args.pyside and qt_restored and restore_step_output("PySide", pyside_cache_key, pyside_install_path)
+
+
 if not args.no_clone:
 	step("fetch/copy source")
 	if os.path.exists(source_path):
 		remove_dir(source_path)
 
-	if args.qt_source:
+	if qt_restored:
+		print("\nQt was restored from the step cache, not fetching its source")
+	elif args.qt_source:
 		print("\nCopying existing Qt source...")
 		shutil.copytree(args.qt_source, qt_source_path)
 	else:
@@ -604,7 +902,7 @@ if not args.no_clone:
 			print("\nApplying user provided patch...")
 			apply_patch(args.patch, qt_source_path)
 
-	if sys.platform == 'linux':
+	if sys.platform == 'linux' and not qt_restored:
 		print("Cloning libicu")
 		if args.mirror:
 			run_checked(["git", "clone", f"{args.mirror}icu.git", qt_source_path / "icu"], "Failed to clone Qt git repository")
@@ -612,7 +910,7 @@ if not args.no_clone:
 			run_checked(["git", "clone", ICU_REPO_URL, qt_source_path / "icu"], "Failed to clone Qt git repository")
 		run_checked(["git", "checkout", ICU_VERSION], "Failed to check out branch '{}'".format(ICU_VERSION), cwd=qt_source_path / "icu")
 
-	if args.pyside:
+	if args.pyside and not pyside_restored:
 		if args.pyside_source:
 			print("\nCopying existing PySide source...")
 			shutil.copytree(args.pyside_source, pyside_source_path)
@@ -630,12 +928,62 @@ if not args.no_clone:
 				print(f"\nApplying patch {patch}...")
 				apply_patch(patch, pyside_source_path)
 
+pgo_profile_path = qt_dir / "pgo-profile"
+pgo_instrumented_path = qt_dir / "pgo-instrumented"
+qt_workloads_build_path = qt_dir / "qt-workloads"
+
+
+def train_pgo_profile():
+	# The instrumented build uses the same build directory as the optimized one, since GCC
+	# names its profiles after the object file paths. Returns the flags that use the profile.
+	for path in (pgo_profile_path, pgo_instrumented_path):
+		if path.exists():
+			remove_dir(path)
+	pgo_profile_path.mkdir(parents=True)
+	instrument_compile_flags, instrument_linker_flags = build_pgo.instrument_flags(pgo_compiler, pgo_profile_path)
+	# Link time code generation only matters for the optimized build
+	instrumented_opts = [opt for opt in build_opts if opt != "-ltcg"]
+
+	step("configure instrumented Qt")
+	print("\nConfiguring instrumented Qt...")
+	run_checked([qt_source_path / "configure"] + instrumented_opts + ["-prefix", pgo_instrumented_path] +
+		qt_configure_extra(instrument_compile_flags, instrument_linker_flags), "Failed to configure", cwd=build_path)
+
+	step("build instrumented Qt")
+	print("\nBuilding instrumented Qt...")
+	run_checked_with_retries([make_cmd] + parallel, "Instrumented Qt failed to build", cwd=build_path)
+	report_ninja_build(build_path, "qt-instrumented")
+
+	step("install instrumented Qt")
+	run_checked([make_cmd, "install"], "Instrumented Qt failed to install", cwd=build_path)
+
+	step("train PGO profile")
+	print("\nTraining PGO profile with offscreen workloads...")
+	binary = qt_workloads_benchmark.build_workloads(pgo_instrumented_path, qt_workloads_build_path / "instrumented")
+	# ICU is installed into the final prefix
+	training = qt_workloads_benchmark.run_benchmark(binary, repeat=1,
+		library_paths=[pgo_instrumented_path / "lib", install_path / "lib"])
+	profiles = build_pgo.merge_profiles(pgo_compiler, pgo_profile_path)
+	print(f"Collected {profiles['files']} profile files ({profiles['bytes'] / (1024 * 1024):.1f} MB)")
+	update_build_metadata(artifact_path, pgo={
+		"compiler": pgo_compiler,
+		"profiles": profiles,
+		"instrumented_seconds": {name: result["median_seconds"] for name, result in training["results"].items()},
+	})
+
+	remove_dir(build_path)
+	os.mkdir(build_path)
+	remove_dir(pgo_instrumented_path)
+	return build_pgo.profile_use_flags(pgo_compiler, pgo_profile_path)
+
+
 step("prepare directories")
 if os.path.exists(build_path):
 	remove_dir(build_path)
 
-if sys.platform == 'darwin':
-	build_opts += ['-qt-freetype']
+if qt_restored:
+	print("\nUsing the Qt install tree from the step cache")
+elif sys.platform == 'darwin':
 	os.mkdir(build_path)
 
 	if platform.processor() != 'arm' or args.universal:
@@ -649,6 +997,7 @@ if sys.platform == 'darwin':
 		step("build")
 		print("\nBuilding Qt for x86_64...")
 		run_checked_with_retries([make_cmd] + parallel, "Qt failed to build", cwd=build_path / "x86_64")
+		report_ninja_build(build_path / "x86_64", "qt-x86_64")
 
 		step("install/stage")
 		print("\nInstalling Qt for x86_64...")
@@ -665,6 +1014,7 @@ if sys.platform == 'darwin':
 		step("build")
 		print("\nBuilding Qt for ARM64...")
 		run_checked_with_retries([make_cmd] + parallel, "Qt failed to build", cwd=build_path / "arm64")
+		report_ninja_build(build_path / "arm64", "qt-arm64")
 
 		step("install/stage")
 		print("\nInstalling Qt for ARM64...")
@@ -689,7 +1039,7 @@ if sys.platform == 'darwin':
 					header = file_path.open('rb').read(4)
 					if header != b"\xcf\xfa\xed\xfe" and header != b"!<ar":
 						continue
-					subprocess.call(["lipo", "-create", build_path / "target_x86_64" / rel_path / filename,
+					run_captured(["lipo", "-create", build_path / "target_x86_64" / rel_path / filename,
 						build_path / "target_arm64" / rel_path / filename, "-output", file_path])
 		else:
 			if os.path.exists(install_path):
@@ -707,32 +1057,36 @@ else:
 	os.mkdir(build_path)
 
 	if sys.platform == 'linux':
-		step("configure dependencies/toolchain")
-		print("\n Configuring libicu...")
-
-		icu_source_path = qt_source_path / "icu" / "icu4c" / "source"
-		run_checked([icu_source_path / "configure",
-			"--disable-draft", "--disable-extras", "--disable-icuio",
-			"--disable-layoutex", "--disable-tools", "--disable-tests",
-			"--disable-samples", "--prefix=" + str(install_path)],
-			"Failed to configure", cwd=icu_source_path)
-
-		step("build")
-		print("\nBuilding libicu...")
-		run_checked(["make"] + parallel, "libicu failed to build", cwd=icu_source_path)
-
-		step("install/stage")
-		print("\nInstalling Qt...")
-		run_checked(["make", "install"], "Qt failed to install", cwd=icu_source_path)
+		# ICU installs into the Qt prefix before anything else, so the install tree at this
+		# point is exactly the ICU prefix
+		if not restore_step_output("ICU", icu_cache_key, install_path):
+			step("configure dependencies/toolchain")
+			print("\n Configuring libicu...")
+
+			icu_source_path = qt_source_path / "icu" / "icu4c" / "source"
+			run_checked([icu_source_path / "configure",
+				"--disable-draft", "--disable-extras", "--disable-icuio",
+				"--disable-layoutex", "--disable-tools", "--disable-tests",
+				"--disable-samples", "--prefix=" + str(install_path)],
+				"Failed to configure", cwd=icu_source_path)
+
+			step("build")
+			print("\nBuilding libicu...")
+			run_checked(["make"] + parallel, "libicu failed to build", cwd=icu_source_path)
+
+			step("install/stage")
+			print("\nInstalling Qt...")
+			run_checked(["make", "install"], "Qt failed to install", cwd=icu_source_path)
+			store_step_output("ICU", icu_cache_key, install_path)
 
 		os.environ["ICU_PREFIX"] = str(install_path)
 
-		build_opts += ['-bundled-xcb-xinput']
+	if args.pgo:
+		configure_extra = qt_configure_extra(*train_pgo_profile())
 
 	step("configure dependencies/toolchain")
 	print("\nConfiguring Qt...")
 	if sys.platform == 'win32':
-		build_opts += ["-directwrite"]  # use DirectWrite for font rendering on Windows
 		run_checked([qt_source_path / "configure.bat"] + build_opts +
 			["-prefix", install_path] + configure_extra, "Failed to configure", cwd=build_path)
 	else:
@@ -742,27 +1096,145 @@ else:
 	step("build")
 	print("\nBuilding Qt...")
 	run_checked_with_retries([make_cmd] + parallel, "Qt failed to build", cwd=build_path)
+	report_ninja_build(build_path, "qt")
 
 	step("install/stage")
 	print("\nInstalling Qt...")
 	run_checked([make_cmd, "install"], "Qt failed to install", cwd=build_path)
 
 	if sys.platform == 'linux':
-		# Older compilers don't seem to want to take libicu built above, just make sure we
-		# bundle the one that is actually used
-		deps = subprocess.Popen(["ldd", os.path.join(install_path, "lib/libQt6Core.so")], stdout=subprocess.PIPE).communicate()[0]
-		deps = deps.decode('charmap').strip().split("\n")
-		deps = [line.split("=>") for line in deps]
-		for dep in deps:
-			if len(dep) < 2:
-				continue
-			name, path = dep[0].strip(), dep[1].split("(")[0].strip()
-			if "libicu" in path and "Qt" not in path:
-				shutil.copyfile(path, os.path.join(install_path, "lib", name))
-				subprocess.call(f'patchelf --set-rpath \\$ORIGIN {install_path}/lib/{name}', shell=True)
+		step("bundle library dependencies")
+		# Older compilers don't seem to want to take libicu built above, and Qt can pick up other
+		# libraries from outside the prefix. Bundle what the libraries, plugins and tools actually
+		# resolve to, repeating for the dependencies of the bundled libraries.
+		bundled_names = set()
+		while True:
+			to_bundle = {name: path for name, path in elf_deps.DependencyGraph([install_path]).libraries_to_bundle().items()
+				if name not in bundled_names}
+			if not to_bundle:
+				break
+			for name, path in to_bundle.items():
+				bundled_names.add(name)
+				target = install_path / "lib" / name
+				# Never overwrite a file Qt installed, or write through a link at that name
+				if target.is_symlink() or target.exists():
+					print(f"Not bundling {name} from {path}, {target} already exists")
+					continue
+				print(f"Bundling {name} from {path}")
+				shutil.copyfile(path, target)
+				run_checked(["patchelf", "--set-rpath", "$ORIGIN", target], f"ERROR: Failed to change rpath in {name}")
+
+if args.profile != "full":
+	step("check feature profile")
+	missing = qt_profiles.verify_install(install_path, pyside_modules, LINUX_PLUGIN_TYPES if sys.platform == 'linux' else ())
+	if missing:
+		print(f"The {args.profile} profile left out what is shipped: {', '.join(missing)}")
+		sys.exit(1)
 
+if not qt_restored:
+	step("report feature costs")
+	# Diagnostic only, like the ninja log analysis
+	try:
+		qt_ninja_dirs = ninja_log.find_build_dirs(build_path)
+		costs = qt_profiles.feature_costs(qt_ninja_dirs[0] if qt_ninja_dirs else build_path, install_path, qt_modules)
+		report = qt_profiles.write_report(artifact_path / "qt-feature-costs.json", args.profile, feature_profile, qt_modules, costs)
+		update_build_metadata(artifact_path, feature_profile={key: report[key]
+			for key in ("profile", "trimmed", "configure_flags", "build_ms", "install_bytes")})
+	except Exception as e:
+		print(f"Failed to report feature costs: {e}")
 
-if args.pyside:
+	if args.split_dwarf:
+		step("package split DWARF")
+		# Before the step cache stores the tree, since the .dwo files stay in the build directory
+		split_dwarf_packages["qt"] = timed_symbol_step("dwp qt", package_split_dwarf, [install_path])
+
+	store_step_output("Qt", qt_cache_key, install_path)
+
+
+if args.benchmark_workloads or args.pgo:
+	step("benchmark Qt workloads")
+	# Diagnostic only, a build that cannot run the workloads (e.g. cross-architecture) still ships
+	try:
+		binary = qt_workloads_benchmark.build_workloads(install_path, qt_workloads_build_path / "optimized")
+		workloads = qt_workloads_benchmark.run_benchmark(binary,
+			library_paths=[install_path / ("bin" if sys.platform == 'win32' else "lib")])
+		with open(artifact_path / "qt-workloads.json", "w", encoding="utf-8") as f:
+			json.dump(workloads, f, indent=2)
+			f.write("\n")
+		if args.workloads_baseline:
+			with open(args.workloads_baseline, "r", encoding="utf-8") as f:
+				baseline = json.load(f)
+			qt_workloads_benchmark.compare_results(baseline, workloads)
+			update_build_metadata(artifact_path, workloads_comparison={
+				name: {"baseline_seconds": baseline["results"].get(name, {}).get("median_seconds"), "seconds": result["median_seconds"]}
+				for name, result in workloads["results"].items()})
+	except Exception as e:
+		print(f"Qt workloads benchmark failed: {e}")
+
+
+qt_exclude = [pyside_install_path, bundle_path / "PySide6", install_path / "install_pyside_pth.py"]
+pyside_roots = [pyside_install_path, bundle_path / "PySide6", install_path / "install_pyside_pth.py"]
+
+
+def open_qt_archives():
+	# The combined archive plus one archive per role in artifact_role_rules
+	return RoleArchives(artifact_path / qt_artifact_name, {role: artifact_path / name for role, name in qt_role_artifact_names.items()},
+		artifact_role_rules, qt_archive_root)
+
+
+def sign_install_tree():
+	if args.signer is None:
+		print("No signer for this platform, use --signer local for the stand-in signer")
+		return
+	# The local signer writes its signatures next to the build instead of into the binaries
+	report = sign_tree([install_path], signer=signing.create_signer(args.signer, qt_dir / "signing"), jobs=args.sign_jobs)
+	update_build_metadata(artifact_path, signing=report)
+
+
+def report_qt_archives(qt_archives):
+	summary = qt_archives.close()
+	for role, entry in summary.items():
+		print(f"{entry['artifact']:48} {entry['bytes'] / (1024 * 1024):8.1f} MB")
+	update_build_metadata(artifact_path, artifact_roles=summary)
+
+
+def post_process_qt(symbols_zip, qt_zip):
+	# Everything outside of the PySide install is final once Qt is installed, so its debug
+	# symbols, bundle libraries and (when not signing) archive entries can be produced while
+	# PySide builds. PySide outputs are merged in afterwards. Output goes to a log of its own
+	# instead of the log of whatever step the main thread is in.
+	started_at = time.time()
+	start = time.monotonic()
+	with build_output.background_step("post-process Qt"):
+		if symbols_zip is not None:
+			if sys.platform == 'win32':
+				collect_build_pdbs(symbols_zip, build_path)
+			timed_symbol_step("extract qt", extract_symbols, symbols_zip, [install_path], install_path, exclude=qt_exclude,
+				split_dwarf=args.split_dwarf)
+		bundle_qt_plugins(install_path, bundle_path)
+		if qt_zip is not None:
+			add_tree_to_zip(qt_zip, install_path, qt_archive_root, exclude=qt_exclude)
+	step_timer.add("post-process Qt (background)", started_at, time.monotonic() - start)
+
+
+post_process_executor = None
+post_process_future = None
+symbols_zip = None
+qt_zip = None
+if args.pipeline and args.pyside:
+	step("start Qt post-processing")
+	if args.symbols:
+		symbols_zip = zipfile.ZipFile(artifact_path / qt_symbols_artifact_name, 'w', zipfile.ZIP_DEFLATED)
+	# Signing modifies the binaries in place, which has to wait until PySide no longer uses them
+	if not args.sign:
+		qt_zip = open_qt_archives()
+	post_process_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+	post_process_future = post_process_executor.submit(post_process_qt, symbols_zip, qt_zip)
+
+if args.pyside and not qt_restored:
+	pyside_restored = restore_step_output("PySide", pyside_cache_key, pyside_install_path)
+
+if args.pyside and not pyside_restored:
 	step("build")
 	print("\nBuilding Python 3 bindings...")
 	if sys.platform == 'win32':
@@ -785,15 +1257,34 @@ if args.pyside:
 		else:
 			os.environ["CFLAGS"] = os.environ.get("CFLAGS", "") + " -g1"
 			os.environ["CXXFLAGS"] = os.environ.get("CXXFLAGS", "") + " -g1"
+	if args.split_dwarf:
+		os.environ["CFLAGS"] = os.environ.get("CFLAGS", "") + " -gsplit-dwarf"
+		os.environ["CXXFLAGS"] = os.environ.get("CXXFLAGS", "") + " -gsplit-dwarf"
+	if args.linker:
+		# CMake initializes the linker flags of each PySide project from LDFLAGS
+		os.environ["LDFLAGS"] = os.environ.get("LDFLAGS", "") + f" -fuse-ld={args.linker}"
+	if args.symbolic:
+		os.environ["CFLAGS"] = os.environ.get("CFLAGS", "") + " -fno-semantic-interposition"
+		os.environ["CXXFLAGS"] = os.environ.get("CXXFLAGS", "") + " -fno-semantic-interposition"
+		os.environ["LDFLAGS"] = os.environ.get("LDFLAGS", "") + " -Wl,-Bsymbolic-functions"
+	# Read by the shiboken generator through pyside-allow-thread-policy.patch
+	os.environ.update(allow_thread_policy.generator_environment(args.allow_thread_policy))
 	run_checked(["uv", "pip", "install", "--python", sys.executable, "-r", "requirements.txt"],
 		"Python 3 bindings failed to install package dependencies", cwd=pyside_build_path)
-	run_checked([sys.executable, "setup.py", "install", "--standalone", "--limited-api=yes", "--no-unity",
+	if args.unity is None:
+		unity = ["--no-unity"]
+	else:
+		unity = ["--unity"] + ([f"--unity-build-batch-size={args.unity}"] if args.unity else [])
+	run_checked([sys.executable, "setup.py", "install", "--standalone", "--limited-api=yes"] + unity + [
 			"--module-subset=" + ",".join(pyside_modules),
 			"--qt-target-path=" + str(install_path),
 			"--qtpaths=" + str(qtpaths),
 			"--macos-deployment-target=" + min_macos,
 			"--prefix=" + str(pyside_install_path),
 		] + parallel, "Python 3 bindings failed to build", cwd=pyside_build_path)
+	# setup.py drives a separate CMake project for each of shiboken6, the generator and PySide6
+	for pyside_ninja_dir in ninja_log.find_build_dirs(pyside_build_path):
+		report_ninja_build(pyside_ninja_dir, "pyside-" + pyside_ninja_dir.name)
 
 	if sys.platform.startswith("win"):
 		# pyside/Lib/site-packages -> pyside/site-packages
@@ -839,243 +1330,157 @@ if args.pyside:
 		for f in glob.glob(os.path.join(llvm_dir, "lib", "libclang.so*")):
 			shutil.copy(f, os.path.join(pyside_install_path, "site-packages", "shiboken6_generator", os.path.basename(f)), follow_symlinks=False)
 
-	# Add PySide installer to place it into Python path
-	shutil.copy(os.path.join(base_dir, "install_pyside_pth.py"), os.path.join(install_path, "install_pyside_pth.py"))
-
-
-if args.symbols:
-	if sys.platform == 'darwin':
-		print("\nExtracting debug symbols...")
-		dsym_files = []
-		strip_files = []
-		for root, dirs, files in os.walk(install_path):
-			for file in files:
-				file_path = os.path.join(root, file)
-				if mac_should_strip(file_path):
-					strip_files.append(file_path)
-					if not file.endswith('.a'):
-						dsym_files.append(file_path)
-
-		with zipfile.ZipFile(artifact_path / qt_symbols_artifact_name, 'w', zipfile.ZIP_DEFLATED) as z:
-			for f in dsym_files:
-				print(f"Processing {f}...")
-				dsym_path = f + ".dSYM"
-				if subprocess.call(["dsymutil", "-o", dsym_path, f]) != 0:
-					print(f"Failed to generate dSYM from {f}")
-					sys.exit(1)
-				for i in glob.glob(dsym_path + "/**/*", recursive=True):
-					if os.path.isfile(i) and should_package_file(os.path.basename(i)):
-						z.write(i, os.path.relpath(i, install_path))
-				shutil.rmtree(dsym_path)
-
-		print("\nStripping debug info...")
-		for f in strip_files:
-			if subprocess.call(["strip", "-S", f]) != 0:
-				print(f"Failed to strip debug info from {f}")
-				sys.exit(1)
-			print(f"Stripped debug info from {f}")
-
-	elif sys.platform == 'linux':
-		print("\nExtracting debug symbols...")
-		symbol_files = []
-		strip_files = []
-		for root, dirs, files in os.walk(install_path):
-			for file in files:
-				file_path = os.path.join(root, file)
-				if os.path.islink(file_path):
-					continue
-				if not os.path.isfile(file_path):
-					continue
-				if file.endswith('.o'):
-					continue
-				header = open(file_path, 'rb').read(7)
-				if header[:4] == b"\x7fELF":
-					strip_files.append(file_path)
-					symbol_files.append(file_path)
-				elif header == b"!<arch>" and file.endswith('.a'):
-					strip_files.append(file_path)
+	if args.split_dwarf:
+		step("package split DWARF")
+		split_dwarf_packages["pyside"] = timed_symbol_step("dwp pyside", package_split_dwarf, [pyside_install_path])
 
-		with zipfile.ZipFile(artifact_path / qt_symbols_artifact_name, 'w', zipfile.ZIP_DEFLATED) as z:
-			for f in symbol_files:
-				debug_file = f + ".debug"
-				if subprocess.call(["objcopy", "--only-keep-debug",
-						"--compress-debug-sections=zlib", f, debug_file]) != 0:
-					print(f"Failed to extract debug symbols from {f}")
-					sys.exit(1)
+	store_step_output("PySide", pyside_cache_key, pyside_install_path)
 
-				# Re-inject .eh_frame data from the original binary
-				with tempfile.TemporaryDirectory() as tmp:
-					remove_args = []
-					add_args = []
-					for section in [".eh_frame", ".eh_frame_hdr"]:
-						dump = os.path.join(tmp, section.lstrip("."))
-						subprocess.run(["objcopy", "--dump-section",
-							f"{section}={dump}", f],
-							capture_output=True)
-						if not os.path.exists(dump):
-							continue
-						remove_args += ["--remove-section", section]
-						add_args += ["--add-section", f"{section}={dump}"]
-					if remove_args:
-						subprocess.run(["objcopy"] + remove_args + [debug_file], check=True)
-						subprocess.run(["objcopy"] + add_args + [debug_file], check=True)
-
-				z.write(debug_file, os.path.relpath(debug_file, install_path))
-				os.remove(debug_file)
-
-		print("\nStripping debug info...")
-		for f in strip_files:
-			if subprocess.call(["strip", "--strip-debug", f]) != 0:
-				print(f"Failed to strip debug info from {f}")
-				sys.exit(1)
-			print(f"Stripped debug info from {f}")
-
-	elif sys.platform == 'win32':
-		print("\nCollecting debug symbols...")
+if args.pyside:
+	# Add PySide installer to place it into Python path
+	shutil.copy(os.path.join(base_dir, "install_pyside_pth.py"), os.path.join(install_path, "install_pyside_pth.py"))
+	# Module index and finder used by install_pyside_pth.py --index
+	shutil.copy(os.path.join(base_dir, "pyside_index_finder.py"), os.path.join(pyside_install_path, "pyside_index_finder.py"))
+	module_index = pyside_index_finder.write_index(pyside_install_path)
+	print(f"Indexed top-level modules {', '.join(module_index['modules'])}")
+
+
+def measure_cold_imports(site_packages, pycache_prefix=None, repeat=3):
+	# Median import time in ms of each PySide module in a fresh interpreter. Pointing
+	# PYTHONPYCACHEPREFIX at an empty directory hides any existing bytecode.
+	# Imported here, the benchmark scripts change sys.path on import
+	from benchmarks import pyside_startup_benchmark
+	extra_env = {"PYTHONPYCACHEPREFIX": str(pycache_prefix)} if pycache_prefix else None
+	result = {}
+	for module in pyside_modules:
+		runs = [pyside_startup_benchmark.time_module_import(sys.executable, site_packages, module, extra_env)["cumulative_us"]
+			for _ in range(repeat)]
+		result[module] = sorted(runs)[len(runs) // 2] / 1000
+	return result
+
+
+if args.pyside and args.compile_bytecode:
+	step("compile PySide bytecode")
+	print("\nCompiling PySide bytecode...")
+	site_packages = pyside_install_path / "site-packages"
+	bytecode = compile_bytecode(site_packages, ddir=os.path.join("pyside", "site-packages"))
+	if bytecode["failed"]:
+		# These ship as sources only and compile on first import, or fail to import
+		print(f"WARNING: {len(bytecode['failed'])} PySide sources failed to compile:")
+		for path in bytecode["failed"]:
+			print(f"  {path}")
+	try:
+		with tempfile.TemporaryDirectory() as empty_cache:
+			bytecode["import_ms_without_bytecode"] = measure_cold_imports(site_packages, pycache_prefix=empty_cache)
+		bytecode["import_ms_with_bytecode"] = measure_cold_imports(site_packages)
+	except Exception as e:
+		# Cross-architecture builds may not be able to import what they built
+		bytecode["import_error"] = str(e)
+	print(f"Added {bytecode['files']} .pyc files ({bytecode['bytes'] / (1024 * 1024):.1f} MB) for {bytecode['cache_tag']}")
+	for module, before in bytecode.get("import_ms_without_bytecode", {}).items():
+		print(f"  import PySide6.Qt{module}: {before:.1f} ms -> {bytecode['import_ms_with_bytecode'][module]:.1f} ms")
+	update_build_metadata(artifact_path, bytecode=bytecode)
+
+
+if post_process_future is None:
+	if args.symbols:
+		step("extract debug symbols")
 		with zipfile.ZipFile(artifact_path / qt_symbols_artifact_name, 'w', zipfile.ZIP_DEFLATED) as z:
-			# PDBs from the build directory
-			for pdb in glob.glob(str(build_path) + '/**/*.pdb', recursive=True):
-				rel = os.path.relpath(pdb, build_path)
-				parts = rel.replace('\\', '/').split('/')
-				# Ignore intermediate PDBs that the compiler generates. We only care about linker PDBs.
-				if 'CMakeFiles' in parts or 'config.tests' in parts or parts[:2] == ['qtbase', 'lib']:
-					continue
-				z.write(pdb, rel)
-				print(f"Added {pdb}")
-			# PDBs from the install directory (remove after archiving)
-			for pdb in glob.glob(str(install_path) + '/**/*.pdb', recursive=True):
-				z.write(pdb, os.path.relpath(pdb, install_path))
-				os.remove(pdb)
-				print(f"Added {pdb}")
-
-
-# Create modified libraries that contain the correct rpath for bundling. These will be signed separately
-# so that each bundle does not need to re-sign the libraries.
-if sys.platform == 'darwin':
-	os.mkdir(bundle_path)
-	for plugin_type in MACOS_PLUGIN_TYPES:
-		os.mkdir(os.path.join(bundle_path, plugin_type))
-	if args.pyside:
-		os.mkdir(os.path.join(bundle_path, "PySide6"))
-
-	for plugin_type in MACOS_PLUGIN_TYPES:
-		for f in glob.glob(os.path.join(install_path, "plugins", plugin_type, "*.dylib")):
-			target = os.path.join(bundle_path, plugin_type, os.path.basename(f))
-			shutil.copy(f, target)
-			run_checked(["install_name_tool", "-delete_rpath", "@loader_path/../../lib", target], f"Failed to remove rpath from {target}")
-			run_checked(["install_name_tool", "-add_rpath", "@loader_path/../../../Frameworks", target], f"Failed to add framework rpath to {target}")
-
-	if args.pyside:
-		for f in glob.glob(os.path.join(pyside_install_path, "site-packages", "PySide6", "*.so")):
-			target = os.path.join(bundle_path, "PySide6", os.path.basename(f))
-			shutil.copy(f, target)
-			run_checked(["install_name_tool", "-delete_rpath", "@loader_path/Qt/lib", target], f"Failed to remove rpath from {target}")
-			run_checked(["install_name_tool", "-add_rpath", "@loader_path/../../../Frameworks", target], f"Failed to add framework rpath to {target}")
-
-		for f in glob.glob(os.path.join(pyside_install_path, "site-packages", "PySide6", "*.dylib")):
-			target = os.path.join(bundle_path, "PySide6", os.path.basename(f))
-			shutil.copy(f, target)
-			run_checked(["install_name_tool", "-delete_rpath", "@loader_path/Qt/lib", target], f"Failed to remove rpath from {target}")
-			run_checked(["install_name_tool", "-add_rpath", "@loader_path/../../../Frameworks", target], f"Failed to add framework rpath to {target}")
-elif sys.platform == 'linux':
-	os.mkdir(bundle_path)
-	for plugin_type in LINUX_PLUGIN_TYPES:
-		os.mkdir(os.path.join(bundle_path, plugin_type))
-	if args.pyside:
-		os.mkdir(os.path.join(bundle_path, "PySide6"))
-
-	for plugin_type in LINUX_PLUGIN_TYPES:
-		for f in glob.glob(os.path.join(install_path, "plugins", plugin_type, "*.so")):
-			target = os.path.join(bundle_path, plugin_type, os.path.basename(f))
-			shutil.copy(f, target)
-			run_checked(["patchelf", "--set-rpath", "$ORIGIN/../..", target], f"ERROR: Failed to change rpath in {target}")
-
-	if args.pyside:
-		qt_major_minor_version = ".".join(qt_version.split(".")[0:2])
-		for f in glob.glob(os.path.join(pyside_install_path, "site-packages", "PySide6", "*.abi3.so")):
-			target = os.path.join(bundle_path, "PySide6", os.path.basename(f))
-			shutil.copy(f, target)
-			run_checked(["patchelf", "--set-rpath", "$ORIGIN:$ORIGIN/../shiboken6:$ORIGIN/../..", target], f"Failed to change rpath in {target}")
-
-		for f in glob.glob(os.path.join(pyside_install_path, "site-packages", "PySide6", f"libpyside6*.so.{qt_major_minor_version}")):
-			target = os.path.join(bundle_path, "PySide6", os.path.basename(f))
-			shutil.copy(f, target)
-			run_checked(["patchelf", "--set-rpath", "$ORIGIN:$ORIGIN/../shiboken6:$ORIGIN/../..", target], f"Failed to change rpath in {target}")
-
-
-if args.sign:
-	step("sign staged outputs")
-	if sys.platform == 'darwin':
-		# Sign all Mach-O files in the installation
-		for root, dirs, files in os.walk(install_path):
-			for file in files:
-				file_path = os.path.join(root, file)
-				if not os.access(file_path, os.X_OK):
-					continue
+			if sys.platform == 'win32':
+				collect_build_pdbs(z, build_path)
+			timed_symbol_step("extract", extract_symbols, z, [install_path], install_path, split_dwarf=args.split_dwarf)
+
+	if sys.platform in ('darwin', 'linux'):
+		step("prepare bundle libraries")
+		bundle_qt_plugins(install_path, bundle_path)
+		if args.pyside:
+			bundle_pyside(pyside_install_path, bundle_path, qt_version)
+
+	if args.sign:
+		step("sign staged outputs")
+		sign_install_tree()
+
+	step("package artifacts")
+	print("\nCreating archive...")
+	with open_qt_archives() as z:
+		add_tree_to_zip(z, install_path, qt_archive_root)
+	report_qt_archives(z)
+else:
+	step("wait for Qt post-processing")
+	post_process_future.result()
+	post_process_executor.shutdown()
+
+	if symbols_zip is not None:
+		step("extract debug symbols")
+		timed_symbol_step("extract pyside", extract_symbols, symbols_zip, pyside_roots, install_path,
+			split_dwarf=args.split_dwarf)
+		symbols_zip.close()
+
+	if sys.platform in ('darwin', 'linux'):
+		step("prepare bundle libraries")
+		bundle_pyside(pyside_install_path, bundle_path, qt_version)
+
+	if args.sign:
+		# Qt binaries could not be signed in the background, since the PySide build loads them
+		step("sign staged outputs")
+		sign_install_tree()
+
+	step("package artifacts")
+	print("\nCreating archive...")
+	if qt_zip is not None:
+		add_tree_to_zip(qt_zip, install_path, qt_archive_root, roots=pyside_roots)
+		report_qt_archives(qt_zip)
+	else:
+		with open_qt_archives() as z:
+			add_tree_to_zip(z, install_path, qt_archive_root)
+		report_qt_archives(z)
 
-				# Check for Mach-O signature
-				header = open(file_path, 'rb').read(4)
-				if header != b"\xca\xfe\xba\xbe" and header != b"\xcf\xfa\xed\xfe":
-					continue
 
-				if not mac_sign(file_path):
-					print(f"Failed to sign {file_path}")
-					sys.exit(1)
+if sys.platform == 'linux':
+	step("analyze library dependencies")
+	# Diagnostic only, like the ninja log analysis
+	try:
+		base, groups = elf_deps.qt_entry_points(install_path, LINUX_PLUGIN_TYPES)
+		elf_report = elf_deps.analyze([install_path], base, groups)
+		elf_deps.print_summary(elf_report)
+		with open(artifact_path / "elf-dependencies.json", "w", encoding="utf-8") as f:
+			json.dump(elf_report, f, indent=2)
+			f.write("\n")
+		update_build_metadata(artifact_path, elf_dependencies={
+			"objects": elf_report["objects"],
+			"unresolved": elf_report["unresolved"],
+			"external": elf_report["external"],
+			"duplicates": len(elf_report["duplicates"]),
+			"conflicts": sorted(elf_report["conflicts"]),
+			"entry_points": {
+				"QApplication": elf_report["entry_points"]["base"],
+				**{name: group["max"] for name, group in elf_report["entry_points"]["groups"].items()},
+			},
+		})
+	except Exception as e:
+		print(f"Failed to analyze library dependencies: {e}")
+
+	step("report dynamic linking")
+	# Written for every build, so a --symbolic build can be compared against a regular one
+	# with elf_deps.py --compare-dynamic-linking
+	try:
+		linking_report = elf_deps.dynamic_linking_report([install_path])
+		elf_deps.print_dynamic_linking(linking_report)
+		with open(artifact_path / "dynamic-linking.json", "w", encoding="utf-8") as f:
+			json.dump(linking_report, f, indent=2)
+			f.write("\n")
+		update_build_metadata(artifact_path, dynamic_linking={"symbolic": args.symbolic, **linking_report["totals"]})
+	except Exception as e:
+		print(f"Failed to report dynamic linking: {e}")
 
-		# Sign all frameworks and applications in the installation
-		for root, dirs, files in os.walk(install_path):
-			for dir in dirs:
-				if ".framework" in dir or ".app" in dir:
-					dir_path = os.path.join(root, dir)
-
-					if not mac_sign(dir_path):
-						print(f"Failed to sign {dir_path}")
-						sys.exit(1)
-	elif sys.platform.startswith("win"):
-		# Look for all exe/dll files in the installation
-		for root, dirs, files in os.walk(install_path):
-			for file in files:
-				if file.endswith(".exe") or file.endswith(".dll") or file.endswith(".pyd"):
-					file_path = os.path.join(root, file)
-					if not signWindowsFiles(file_path):
-						print(f"Failed to sign {file_path}")
-						sys.exit(1)
-
-
-step("package artifacts")
-print("\nCreating archive...")
-with zipfile.ZipFile(artifact_path / qt_artifact_name, 'w', zipfile.ZIP_DEFLATED) as z:
-	for root, dirs, files in os.walk(install_path):
-		relpath = Path(root).resolve().relative_to(install_path.resolve())
-		relpath_parts = [] if relpath == Path('.') else [str(relpath)]
-		for dir in dirs:
-			file_path = Path(root) / dir
-			arc_name = os.path.join(qt_archive_root, *relpath_parts, dir)
-			if file_path.is_symlink():
-				info = zipfile.ZipInfo(arc_name, datetime.datetime.now().timetuple())
-				info.compress_type = zipfile.ZIP_DEFLATED
-				info.external_attr = ZIP_SYMLINK_ATTR
-				z.writestr(info, os.readlink(file_path))
-		for file in files:
-			if not should_package_file(file):
-				continue
-			print(f"Adding {relpath}/{file}...")
-			file_path = Path(root) / file
-			arc_name = os.path.join(qt_archive_root, *relpath_parts, file)
-			info = zipfile.ZipInfo(arc_name, datetime.datetime.now().timetuple())
-			info.compress_type = zipfile.ZIP_DEFLATED
-
-			if file_path.is_symlink():
-				info.external_attr = ZIP_SYMLINK_ATTR
-				z.writestr(info, os.readlink(file_path))
-			else:
-				if os.access(file_path, os.X_OK):
-					info.external_attr = ZIP_EXECUTABLE_ATTR
-				else:
-					info.external_attr = ZIP_REGULAR_FILE_ATTR
 
-				with file_path.open('rb') as f:
-					z.writestr(info, f.read())
+if args.benchmark_startup and args.pyside:
+	step("benchmark PySide startup")
+	# Measures the packaged files, so regressions from a new Qt or PySide version or patch show up
+	if run_captured([sys.executable, base_dir / "benchmarks" / "pyside_startup_benchmark.py",
+			"--site-packages", pyside_install_path / "site-packages",
+			"--output", artifact_path / "pyside-startup.json"])[0] != 0:
+		print("PySide startup benchmark failed")
 
 
 if args.install:
@@ -1087,3 +1492,6 @@ if args.clean:
 	step("cleanup")
 	print("Cleaning up...")
 	remove_dir(source_path)
+
+
+build_output.end_step()
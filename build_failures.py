@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+import re
+
+
+OOM = "oom"
+DISK_FULL = "disk_full"
+COMPILER_CRASH = "compiler_crash"
+COMPILE_ERROR = "compile_error"
+UNKNOWN = "unknown"
+
+# Failures worth another attempt. Disk full will fail the same way until someone frees
+# space, real errors fail the same way every time, and unrecognized failures could be either.
+TRANSIENT_FAILURES = (OOM, COMPILER_CRASH)
+# When the failed edges disagree, the first of these decides
+_SEVERITY = (COMPILE_ERROR, DISK_FULL, OOM, COMPILER_CRASH, UNKNOWN)
+
+_PATTERNS = (
+	(OOM, re.compile(
+		r"Killed signal terminated program|terminated with signal 9|signal 9 \[Killed\]|"
+		r"internal compiler error: Killed|unable to execute command: Killed|"
+		r"virtual memory exhausted|out of memory|std::bad_alloc|Cannot allocate memory|"
+		r"fatal error C1060|fatal error C1076|fatal error LNK1102|error C3859", re.IGNORECASE)),
+	(DISK_FULL, re.compile(r"No space left on device|ENOSPC|disk full|fatal error C1085|"
+		r"fatal error LNK1180", re.IGNORECASE)),
+	(COMPILER_CRASH, re.compile(
+		r"internal compiler error|Segmentation fault|frontend command failed due to signal|"
+		r"PLEASE submit a bug report|unable to execute command|fatal error C1001|"
+		r"terminated with signal", re.IGNORECASE)),
+	(COMPILE_ERROR, re.compile(
+		r"(^|[\s:])error:|\berror C\d{4}\b|\berror LNK\d{4}\b|undefined reference to|"
+		r"ld: symbol\(s\) not found|CMake Error", re.IGNORECASE)),
+)
+# A diagnostic at a source location, like "a.cpp:12:5: error:" or "a.cpp(12): error C2065:".
+# Resource errors MSVC reports at a location are left to _PATTERNS.
+_LOCATED_ERROR_RE = re.compile(
+	r"^\S.*?(?::\d+(?::\d+)?:|\(\d+(?:,\d+)?\)\s*:)\s*(?:fatal )?error\b(?!\s+C(?:1060|1076|3859|1085|1001)\b)",
+	re.IGNORECASE)
+_FAILED_RE = re.compile(r"^FAILED: (?:\[code=-?\d+\] )?(.*)$")
+# Lines that end the output of a failed edge
+_BLOCK_END_RE = re.compile(r"^(?:\[\d+/\d+\]|ninja: )")
+
+
+def failed_blocks(lines):
+	"""Split the output into the blocks following each ninja "FAILED:" line, or return all of
+	it as one block when there are none, like for a configure or install step."""
+	blocks = []
+	block = None
+	for line in lines:
+		if _FAILED_RE.match(line.strip()):
+			block = [line]
+			blocks.append(block)
+		elif block is not None and _BLOCK_END_RE.match(line):
+			block = None
+		elif block is not None:
+			block.append(line)
+	return blocks or [list(lines)]
+
+
+def _classify_block(lines):
+	# A compile error at a source location wins over OOM or crash text in the quoted source,
+	# like a line that throws std::bad_alloc
+	if any(_LOCATED_ERROR_RE.match(line.strip()) for line in lines):
+		return COMPILE_ERROR
+	# Patterns go from the most to the least specific, since an OOM kill also prints
+	# "fatal error:" and would otherwise look like a real compile error
+	text = "\n".join(lines)
+	for kind, pattern in _PATTERNS:
+		if pattern.search(text):
+			return kind
+	return UNKNOWN
+
+
+def classify_failure(returncode, lines):
+	"""Classify a failed build from its exit code and the tail of its output. Only the output
+	of the failed edges is looked at, and a real error in any of them decides."""
+	kinds = {_classify_block(block) for block in failed_blocks(lines)}
+	kind = next(k for k in _SEVERITY if k in kinds)
+	# Ninja itself was killed, e.g. by the OOM killer picking the largest process group
+	if kind == UNKNOWN and returncode is not None and returncode < 0:
+		return OOM
+	return kind
+
+
+def failed_outputs(lines):
+	"""Return the outputs of the edges that ninja reported as FAILED."""
+	outputs = []
+	for line in lines:
+		match = _FAILED_RE.match(line.strip())
+		if match:
+			outputs.extend(o for o in match.group(1).split(" ") if o and o not in outputs)
+	return outputs
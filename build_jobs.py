@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import re
+import subprocess
+import sys
+from math import floor
+from pathlib import Path
+
+
+GIB = 1024 ** 3
+# Memory left for the OS, ninja and the page cache
+RESERVED_MEMORY = 2 * GIB
+# Peak RSS per job before any build has been measured. Debug and sanitizer builds carry
+# much more debug info and instrumentation through the compiler and especially the linker.
+DEFAULT_JOB_MEMORY = {
+	"release": {"compile": int(1.0 * GIB), "link": int(3.0 * GIB)},
+	"debug": {"compile": int(1.5 * GIB), "link": int(6.0 * GIB)},
+	"asan": {"compile": int(2.0 * GIB), "link": int(8.0 * GIB)},
+	"tsan": {"compile": int(2.0 * GIB), "link": int(8.0 * GIB)},
+	"pgo": {"compile": int(1.5 * GIB), "link": int(4.0 * GIB)},
+}
+# Leave headroom over the measured peak, since the next version may need more
+MEASURED_HEADROOM = 1.25
+JOB_RSS_LAUNCHER = Path(__file__).resolve().parent / "job_rss.py"
+# CMAKE_<LANG>_LINKER_LAUNCHER is not known to older CMake, which ignores it
+LINKER_LAUNCHER_CMAKE_VERSION = (3, 21)
+
+
+def _read_int(path):
+	try:
+		value = Path(path).read_text().strip()
+	except OSError:
+		return None
+	if not value or value == "max":
+		return None
+	try:
+		return int(value)
+	except ValueError:
+		return None
+
+
+def _cgroup_memory_available():
+	# cgroup v2, then v1. Limits higher than the machine's memory mean "unlimited".
+	for limit_path, usage_path in (
+		("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory.current"),
+		("/sys/fs/cgroup/memory/memory.limit_in_bytes", "/sys/fs/cgroup/memory/memory.usage_in_bytes"),
+	):
+		limit = _read_int(limit_path)
+		if limit is None or limit >= 1 << 60:
+			continue
+		return max(limit - (_read_int(usage_path) or 0), 0)
+	return None
+
+
+def available_memory():
+	"""Bytes of memory the build can use without swapping, or None when unknown."""
+	available = None
+	if sys.platform.startswith("linux"):
+		try:
+			with open("/proc/meminfo", "r") as f:
+				for line in f:
+					if line.startswith("MemAvailable:"):
+						available = int(line.split()[1]) * 1024
+						break
+		except OSError:
+			pass
+		cgroup = _cgroup_memory_available()
+		if cgroup is not None:
+			available = cgroup if available is None else min(available, cgroup)
+	elif sys.platform == "darwin":
+		# macOS compresses and purges memory aggressively, total memory is a good estimate
+		try:
+			available = int(subprocess.check_output(["sysctl", "-n", "hw.memsize"], text=True).strip())
+		except (OSError, subprocess.CalledProcessError, ValueError):
+			pass
+	elif sys.platform == "win32":
+		import ctypes
+
+		class MEMORYSTATUSEX(ctypes.Structure):
+			_fields_ = [
+				("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+				("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+				("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+				("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+				("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+			]
+
+		status = MEMORYSTATUSEX()
+		status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+		if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+			available = status.ullAvailPhys
+	return available
+
+
+def available_cpus():
+	if hasattr(os, "sched_getaffinity"):
+		cpus = len(os.sched_getaffinity(0))
+	else:
+		cpus = os.cpu_count() or 1
+	# cgroup v2 CPU quota, e.g. "400000 100000" for four CPUs
+	try:
+		quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()
+		if quota != "max":
+			cpus = min(cpus, max(1, int(int(quota) / int(period))))
+	except (OSError, ValueError):
+		pass
+	return cpus
+
+
+def load_job_memory(history_path, variant):
+	"""Return per-class peak RSS for `variant`, measured values overriding the defaults."""
+	memory = dict(DEFAULT_JOB_MEMORY.get(variant, DEFAULT_JOB_MEMORY["release"]))
+	try:
+		with open(history_path, "r", encoding="utf-8") as f:
+			measured = json.load(f).get(variant, {})
+	except (OSError, ValueError):
+		measured = {}
+	for job_class, peak in measured.items():
+		if job_class in memory and peak:
+			memory[job_class] = int(peak * MEASURED_HEADROOM)
+	return memory
+
+
+def plan_jobs(variant, history_path):
+	"""Pick total and link concurrency so the worst case fits in memory.
+
+	The worst case is `link_jobs` links running next to `jobs - link_jobs` compiles, so
+	link_jobs * link + (jobs - link_jobs) * compile must stay within the budget.
+	"""
+	cpus = available_cpus()
+	memory = available_memory()
+	per_job = load_job_memory(history_path, variant)
+	compile_rss, link_rss = per_job["compile"], per_job["link"]
+	if memory is None:
+		jobs = link_jobs = cpus
+		budget = None
+	else:
+		budget = max(memory - RESERVED_MEMORY, compile_rss)
+		jobs = max(1, min(cpus, floor(budget / compile_rss)))
+		if link_rss > compile_rss:
+			link_jobs = floor((budget - jobs * compile_rss) / (link_rss - compile_rss))
+		else:
+			link_jobs = jobs
+		if link_jobs < 1:
+			link_jobs = 1
+			jobs = max(1, min(jobs, floor((budget - link_rss) / compile_rss) + 1))
+		link_jobs = min(link_jobs, jobs)
+	return {
+		"variant": variant,
+		"cpus": cpus,
+		"available_memory": memory,
+		"budget": budget,
+		"job_memory": per_job,
+		"jobs": jobs,
+		"link_jobs": link_jobs,
+	}
+
+
+def cmake_job_pool_args(plan, rss_log=None):
+	"""CMake arguments that put compiles and links into separate ninja pools, and wrap
+	them with the job_rss.py launcher so their peak RSS is measured for the next build."""
+	args = [
+		f"-DCMAKE_JOB_POOLS=compile={plan['jobs']};link={plan['link_jobs']}",
+		"-DCMAKE_JOB_POOL_COMPILE=compile",
+		"-DCMAKE_JOB_POOL_LINK=link",
+	]
+	if rss_log is not None:
+		args += cmake_rss_launcher_args(rss_log)
+	return args
+
+
+def cmake_version(cmake="cmake"):
+	"""(major, minor) of `cmake`, or None when it cannot be run."""
+	try:
+		output = subprocess.run([cmake, "--version"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True).stdout
+	except OSError:
+		return None
+	match = re.search(r"version (\d+)\.(\d+)", output)
+	return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def linker_launcher_supported(cmake="cmake"):
+	version = cmake_version(cmake)
+	return version is not None and version >= LINKER_LAUNCHER_CMAKE_VERSION
+
+
+def cmake_rss_launcher_args(rss_log, job_classes=("compile", "link")):
+	"""CMake arguments wrapping the compiles and/or links with the job_rss.py launcher. Links
+	are left alone when CMake is too old for a linker launcher."""
+	launcher = f"{sys.executable};-S;{JOB_RSS_LAUNCHER};{rss_log}"
+	wrap_links = "link" in job_classes and linker_launcher_supported()
+	args = []
+	for lang in ("C", "CXX"):
+		if "compile" in job_classes:
+			args.append(f"-DCMAKE_{lang}_COMPILER_LAUNCHER={launcher};compile")
+		if wrap_links:
+			args.append(f"-DCMAKE_{lang}_LINKER_LAUNCHER={launcher};link")
+	return args
+
+
+def measured_job_memory(rss_log):
+	"""Summarize a job_rss.py log into the 95th percentile compile and the largest link RSS."""
+	samples = {}
+	try:
+		with open(rss_log, "r") as f:
+			for line in f:
+				fields = line.split()
+				if len(fields) == 2:
+					samples.setdefault(fields[0], []).append(int(fields[1]))
+	except (OSError, ValueError):
+		return {}
+	result = {}
+	for job_class, values in samples.items():
+		values.sort()
+		if job_class == "link":
+			result[job_class] = values[-1]
+		else:
+			result[job_class] = values[min(len(values) - 1, int(len(values) * 0.95))]
+		result[f"{job_class}_count"] = len(values)
+	return result
+
+
+def update_job_memory(history_path, variant, rss_log):
+	measured = measured_job_memory(rss_log)
+	if not measured:
+		return None
+	try:
+		with open(history_path, "r", encoding="utf-8") as f:
+			history = json.load(f)
+	except (OSError, ValueError):
+		history = {}
+	entry = history.setdefault(variant, {})
+	for job_class in ("compile", "link"):
+		if job_class in measured:
+			entry[job_class] = measured[job_class]
+	Path(history_path).parent.mkdir(parents=True, exist_ok=True)
+	with open(history_path, "w", encoding="utf-8") as f:
+		json.dump(history, f, indent=2, sort_keys=True)
+		f.write("\n")
+	return measured
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+# Log capture for build.py. Everything a step prints and the output of the commands it runs
+# goes to a gzip log per step, compressed as it is written. The console only gets what build.py
+# prints itself, rate-limited progress of long commands and loops, and when a step fails, the
+# last lines of its log. Every step, command, progress counter and failure is also appended to
+# a JSON lines event stream for tools that follow the build.
+#
+# Usage: build_log.py tail <log.gz> [-n <lines>]
+
+import argparse
+import collections
+import contextlib
+import gzip
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+
+
+DEFAULT_TAIL_LINES = 60
+DEFAULT_PROGRESS_INTERVAL = 5.0
+# Sync flush the compressed logs this often, so they can be read while the build runs
+FLUSH_INTERVAL = 2.0
+_NINJA_PROGRESS_RE = re.compile(r"^\[(\d+)/(\d+)\]")
+
+_active = None
+
+
+def active():
+	"""The BuildLog of the running build, or None outside of build.py."""
+	return _active
+
+
+def _slug(name):
+	return re.sub(r"[^A-Za-z0-9]+", "-", name).strip("-").lower()
+
+
+class _Tee:
+	"""sys.stdout replacement writing to the console and the current step log."""
+
+	def __init__(self, log, console):
+		self.log = log
+		self.console = console
+
+	def write(self, text):
+		self.console.write(text)
+		self.log.write(text)
+		return len(text)
+
+	def flush(self):
+		self.console.flush()
+
+	def __getattr__(self, name):
+		return getattr(self.console, name)
+
+
+class Progress:
+	"""A counter printed to the console at most every `interval` seconds. Items go to the log."""
+
+	def __init__(self, log, label, total=None, interval=DEFAULT_PROGRESS_INTERVAL):
+		self.log = log
+		self.label = label
+		self.total = total
+		self.interval = interval
+		self.count = 0
+		self.start = time.monotonic()
+		self.last_print = self.start
+
+	def _line(self):
+		count = f"{self.count}/{self.total}" if self.total else str(self.count)
+		return f"{self.label}: {count} ({time.monotonic() - self.start:.0f} s)\n"
+
+	def update(self, item=None, count=None):
+		self.count = self.count + 1 if count is None else count
+		if item is not None:
+			self.log.write(f"{item}\n", console=False)
+		now = time.monotonic()
+		if now - self.last_print >= self.interval:
+			self.last_print = now
+			self.log.console.write(self._line())
+			self.log.console.flush()
+
+	def done(self):
+		if self.count:
+			self.log.console.write(self._line())
+		self.log.event("progress", label=self.label, count=self.count, total=self.total,
+			seconds=round(time.monotonic() - self.start, 3))
+
+
+class _Step:
+	"""Log file, tail and counters of one step."""
+
+	def __init__(self, index, name, tail_lines, background=False):
+		self.index = index
+		self.name = name
+		self.background = background
+		self.start = time.monotonic()
+		self.file = None
+		self.path = None
+		self.lines = 0
+		self.last_flush = 0.0
+		self.tail = collections.deque(maxlen=tail_lines)
+		self.partial_line = ""
+		# Text written before attach()
+		self.pending_text = []
+
+
+class BuildLog:
+	"""Step logs and event stream. Output and events from before attach() are kept in memory
+	and written out once the log directory is known.
+
+	The main thread runs one step at a time. A thread doing work that overlaps later steps
+	opens its own step with background_step(), so its output and failures go to its own log
+	instead of the log of whatever step the main thread is in."""
+
+	def __init__(self, tail_lines=DEFAULT_TAIL_LINES, progress_interval=DEFAULT_PROGRESS_INTERVAL, verbose=False):
+		self.console = sys.stdout
+		self.tail_lines = tail_lines
+		self.progress_interval = progress_interval
+		self.verbose = verbose
+		self.lock = threading.RLock()
+		self.log_dir = None
+		self.events = None
+		self.pending_events = []
+		# Steps that ended before attach(), written out by it
+		self.pending_steps = []
+		self.step_index = 0
+		self.current = _Step(0, None, tail_lines)
+		# threading.get_ident() -> step of a background thread
+		self.thread_steps = {}
+		# Step names repeat, like "build" for Qt and for PySide
+		self.logs = []
+		self.failed = False
+
+	def _step(self):
+		return self.thread_steps.get(threading.get_ident(), self.current)
+
+	@property
+	def step_name(self):
+		"""Name of the step the calling thread writes to."""
+		return self._step().name
+
+	def install(self):
+		global _active
+		_active = self
+		sys.stdout = _Tee(self, self.console)
+		excepthook = sys.excepthook
+
+		def show_exception(kind, value, tb):
+			excepthook(kind, value, tb)
+			self.write("".join(traceback.format_exception(kind, value, tb)))
+			if self.step_name is not None:
+				self.show_failure(f"{kind.__name__}: {value}")
+		sys.excepthook = show_exception
+		return self
+
+	def attach(self, log_dir, events_path):
+		"""Start writing step logs to `log_dir` and events to `events_path`, replacing the
+		logs of an earlier build."""
+		with self.lock:
+			self.log_dir = Path(log_dir)
+			self.log_dir.mkdir(parents=True, exist_ok=True)
+			for old in self.log_dir.glob("*.log.gz"):
+				old.unlink()
+			self.events = open(events_path, "w", encoding="utf-8")
+			for event in self.pending_events:
+				self._write_event(event)
+			if self.current.name is None and self.current.pending_text:
+				self.pending_steps.append(self.current)
+			for step in self.pending_steps:
+				path = self._step_log_path(step)
+				with gzip.open(path, "wt", encoding="utf-8", errors="replace") as f:
+					f.write("".join(step.pending_text))
+				self.logs.append({"step": step.name or "startup", "log": str(path)})
+			for step in [self.current, *self.thread_steps.values()]:
+				if step.name is not None:
+					self._open_step_file(step)
+					step.file.write("".join(step.pending_text))
+				step.pending_text = []
+			self.pending_events = []
+			self.pending_steps = []
+
+	def _step_log_path(self, step):
+		return self.log_dir / f"{step.index:02}-{_slug(step.name or 'startup')}.log.gz"
+
+	def _open_step_file(self, step):
+		step.path = self._step_log_path(step)
+		step.file = gzip.open(step.path, "wt", encoding="utf-8", errors="replace", compresslevel=6)
+		self.logs.append({"step": step.name, "log": str(step.path)})
+
+	def _write_event(self, event):
+		self.events.write(json.dumps(event, default=str) + "\n")
+		self.events.flush()
+
+	def event(self, kind, step=None, **fields):
+		step = step or self._step()
+		event = {"time": time.time(), "event": kind, "step": step.name, **fields}
+		if step.background:
+			event["background"] = True
+		with self.lock:
+			if self.events is None:
+				self.pending_events.append(event)
+			else:
+				self._write_event(event)
+
+	def write(self, text, console=False):
+		"""Append `text` to the log of the calling thread's step, and to the console with `console`."""
+		if console:
+			self.console.write(text)
+		with self.lock:
+			step = self._step()
+			step.lines += text.count("\n")
+			*lines, step.partial_line = (step.partial_line + text).split("\n")
+			step.tail.extend(lines)
+			if step.file is None:
+				if self.log_dir is None:
+					step.pending_text.append(text)
+				return
+			step.file.write(text)
+			now = time.monotonic()
+			if now - step.last_flush >= FLUSH_INTERVAL:
+				step.last_flush = now
+				step.file.flush()
+
+	def _begin(self, name, background):
+		self.step_index += 1
+		step = _Step(self.step_index, name, self.tail_lines, background)
+		if self.log_dir is not None:
+			self._open_step_file(step)
+		return step
+
+	def _finish(self, step, status):
+		self.event("step_end", step=step, status=status, seconds=round(time.monotonic() - step.start, 3),
+			lines=step.lines, log=str(step.path) if step.path else None)
+		if step.file is not None:
+			step.file.close()
+			step.file = None
+		elif self.log_dir is None and step.pending_text:
+			self.pending_steps.append(step)
+
+	def start_step(self, name):
+		with self.lock:
+			self.end_step()
+			if self.current.name is None and self.log_dir is None and self.current.pending_text:
+				self.pending_steps.append(self.current)
+			self.current = self._begin(name, background=False)
+		self.event("step_start", step=self.current)
+
+	def end_step(self, status="ok"):
+		"""End the main thread's step, or the background step of the calling thread."""
+		with self.lock:
+			ident = threading.get_ident()
+			if ident in self.thread_steps:
+				self._finish(self.thread_steps.pop(ident), status)
+				return
+			if self.current.name is None:
+				return
+			self._finish(self.current, status)
+			self.current = _Step(self.current.index, None, self.tail_lines)
+
+	@contextlib.contextmanager
+	def background_step(self, name):
+		"""Give the calling thread a step of its own for the duration of the block."""
+		ident = threading.get_ident()
+		with self.lock:
+			step = self._begin(name, background=True)
+			self.thread_steps[ident] = step
+		self.event("step_start", step=step)
+		try:
+			yield step
+		except BaseException:
+			with self.lock:
+				if self.thread_steps.get(ident) is step:
+					self.end_step(status="failed")
+			raise
+		with self.lock:
+			if self.thread_steps.get(ident) is step:
+				self.end_step()
+
+	def progress(self, label, total=None):
+		return Progress(self, label, total, self.progress_interval)
+
+	def run(self, cmd, cwd=None, env=None, shell=False, tail_lines=None):
+		"""Run `cmd` with its output going to the step log (and the console when verbose).
+		Ninja style "[done/total]" lines drive a progress counter, other output a line count."""
+		start = time.monotonic()
+		name = os.path.basename(str(cmd[0] if isinstance(cmd, (list, tuple)) else cmd.split()[0]))
+		edges = self.progress(name)
+		lines = self.progress(f"{name} output lines")
+		proc = subprocess.Popen(cmd, cwd=cwd, env=env, shell=shell, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+			text=True, errors="replace", bufsize=1)
+		tail = collections.deque(maxlen=tail_lines or self.tail_lines)
+		for line in proc.stdout:
+			tail.append(line.rstrip("\n"))
+			match = _NINJA_PROGRESS_RE.match(line)
+			if self.verbose:
+				self.write(line, console=True)
+			elif match:
+				edges.total = int(match.group(2))
+				edges.update(line.rstrip("\n"), count=int(match.group(1)))
+			else:
+				lines.update(line.rstrip("\n"))
+		returncode = proc.wait()
+		for counter in (edges, lines):
+			if counter.count and time.monotonic() - counter.start >= self.progress_interval:
+				counter.done()
+		self.event("command", command=[str(c) for c in cmd] if isinstance(cmd, (list, tuple)) else cmd,
+			cwd=str(cwd) if cwd else None, returncode=returncode, seconds=round(time.monotonic() - start, 3))
+		return returncode, list(tail)
+
+	def show_failure(self, message=None):
+		"""Print the last lines of the calling thread's step and record the failure."""
+		with self.lock:
+			step = self._step()
+			lines = list(step.tail) + ([step.partial_line] if step.partial_line else [])
+			if step.file is not None:
+				step.file.flush()
+		self.console.write(f"\n--- Last {len(lines)} lines of step '{step.name}'"
+			+ (f" (full log: {step.path})" if step.path else "") + " ---\n")
+		self.console.write("".join(f"{line}\n" for line in lines))
+		self.console.write("--- End of log ---\n")
+		self.console.flush()
+		self.failed = True
+		self.event("failure", message=message, tail=lines)
+		self.end_step(status="failed")
+
+	def close(self):
+		# A step still running here ended the build without reaching the next step, through
+		# sys.exit() or an error printed without show_failure()
+		with self.lock:
+			background = list(self.thread_steps.values())
+			self.thread_steps = {}
+		for step in background:
+			self._finish(step, "interrupted")
+		interrupted = self.current.name is not None or bool(background)
+		self.end_step("interrupted")
+		status = "failed" if self.failed else "interrupted" if interrupted else "ok"
+		self.event("build_end", status=status, logs=self.logs)
+		with self.lock:
+			if self.events is not None:
+				self.events.close()
+				self.events = None
+
+
+class _PrintProgress:
+	"""Stands in for Progress without a build log, printing every item as before."""
+
+	def update(self, item=None, count=None):
+		if item is not None:
+			print(item)
+
+	def done(self):
+		pass
+
+
+def progress(label, total=None):
+	"""A progress counter on the active build log, or one printing every item when there is none."""
+	return _active.progress(label, total) if _active is not None else _PrintProgress()
+
+
+def run(cmd, cwd=None, shell=False):
+	"""Returns (returncode, tail lines) through the active build log, or with the output
+	going straight to the console when there is none."""
+	if _active is not None:
+		return _active.run(cmd, cwd=cwd, shell=shell)
+	return subprocess.call(cmd, cwd=cwd, shell=shell), []
+
+
+def show_failure(message=None):
+	"""Show the tail of the failing step when running under a build log."""
+	if _active is not None:
+		_active.show_failure(message)
+
+
+def read_tail(path, lines=DEFAULT_TAIL_LINES):
+	# Logs of a build that is still running or was killed lack the gzip trailer
+	tail = collections.deque(maxlen=lines)
+	try:
+		with gzip.open(path, "rt", encoding="utf-8", errors="replace") as f:
+			for line in f:
+				tail.append(line.rstrip("\n"))
+	except (EOFError, gzip.BadGzipFile):
+		pass
+	return list(tail)
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Read build step logs")
+	subparsers = parser.add_subparsers(dest="command", required=True)
+	tail_parser = subparsers.add_parser("tail", help="print the last lines of a step log, even while it is written")
+	tail_parser.add_argument("log", help="compressed step log")
+	tail_parser.add_argument("-n", "--lines", type=int, default=DEFAULT_TAIL_LINES, help="lines to print")
+	args = parser.parse_args(argv)
+
+	for line in read_tail(args.log, args.lines):
+		print(line)
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
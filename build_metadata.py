@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 
+import concurrent.futures
 import datetime
 import json
 import os
@@ -8,11 +9,18 @@ import shutil
 import socket
 import subprocess
 import sys
+import time
 from pathlib import Path
 
 
 _SECRET_KEY_PARTS = ("TOKEN", "PASSWORD", "PASS", "SECRET", "PIN", "KEY", "CREDENTIAL", "CERT")
 _CI_ENV_VARS = ("JOB_NAME", "BUILD_NUMBER", "BUILD_URL", "BRANCH_NAME", "CHANGE_ID")
+# All probes run at once and share this deadline, so a hung tool costs at most this long
+_PROBE_DEADLINE = 15
+# Tool versions are cached by resolved path and mtime. Version managers that swap the
+# tool behind an unchanged shim are covered by expiring entries after a day.
+_TOOL_CACHE_TTL = 24 * 60 * 60
+_TOOL_CACHE_VERSION = 1
 
 
 def _redact(key, value):
@@ -23,9 +31,10 @@ def _redact(key, value):
 	return value
 
 
-def _run(cmd, cwd=None):
+def _run(cmd, cwd=None, deadline=None):
+	timeout = _PROBE_DEADLINE if deadline is None else max(deadline - time.monotonic(), 0.1)
 	try:
-		proc = subprocess.run(cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=15)
+		proc = subprocess.run(cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=timeout)
 	except FileNotFoundError:
 		return {"value": None, "error": f"{cmd[0]} not found"}
 	except Exception as e:
@@ -43,13 +52,18 @@ def _first_line(result):
 	return value.splitlines()[0]
 
 
-def _git_metadata(repo_root):
+_GIT_PROBES = {
+	"remote": ["git", "config", "--get", "remote.origin.url"],
+	"branch": ["git", "rev-parse", "--abbrev-ref", "HEAD"],
+	"commit": ["git", "rev-parse", "HEAD"],
+	"status": ["git", "status", "--porcelain"],
+}
+
+
+def _git_metadata(results):
 	if not shutil.which("git"):
 		return {"remote_url": None, "branch": None, "commit": None, "dirty": None, "error": "git not found"}
-	remote = _run(["git", "config", "--get", "remote.origin.url"], cwd=repo_root)
-	branch = _run(["git", "rev-parse", "--abbrev-ref", "HEAD"], cwd=repo_root)
-	commit = _run(["git", "rev-parse", "HEAD"], cwd=repo_root)
-	status = _run(["git", "status", "--porcelain"], cwd=repo_root)
+	remote, branch, commit, status = (results[name] for name in ("remote", "branch", "commit", "status"))
 	errors = [r["error"] for r in (remote, branch, commit, status) if r.get("error")]
 	return {
 		"remote_url": remote.get("value"),
@@ -60,7 +74,7 @@ def _git_metadata(repo_root):
 	}
 
 
-def _tool_versions():
+def _tool_commands():
 	tools = {
 		"cmake": ["cmake", "--version"],
 		"ninja": ["ninja", "--version"],
@@ -76,7 +90,96 @@ def _tool_versions():
 		tools["sw_vers"] = ["sw_vers"]
 	tools["uv"] = ["uv", "--version"]
 	tools["mise"] = ["mise", "--version"]
-	return {name: _run(cmd) for name, cmd in tools.items()}
+	return tools
+
+
+def _tool_cache_path():
+	if sys.platform == "win32":
+		base = os.environ.get("LOCALAPPDATA") or str(Path.home() / "AppData" / "Local")
+	elif sys.platform == "darwin":
+		base = str(Path.home() / "Library" / "Caches")
+	else:
+		base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+	return Path(base) / "qt-build" / "tool-versions.json"
+
+
+def _tool_cache_key(cmd):
+	path = shutil.which(cmd[0])
+	if path is None:
+		return None
+	resolved = os.path.realpath(path)
+	try:
+		st = os.stat(resolved)
+	except OSError:
+		return None
+	return "|".join([resolved, str(st.st_mtime_ns), str(st.st_size)] + list(cmd[1:]))
+
+
+def _load_tool_cache(path):
+	try:
+		with path.open("r", encoding="utf-8") as f:
+			cache = json.load(f)
+	except (OSError, ValueError):
+		return {}
+	if cache.get("version") != _TOOL_CACHE_VERSION:
+		return {}
+	now = time.time()
+	return {k: v for k, v in cache.get("entries", {}).items() if now - v.get("time", 0) < _TOOL_CACHE_TTL}
+
+
+def _save_tool_cache(path, entries):
+	try:
+		path.parent.mkdir(parents=True, exist_ok=True)
+		tmp_path = path.with_name(path.name + f".{os.getpid()}.tmp")
+		with tmp_path.open("w", encoding="utf-8") as f:
+			json.dump({"version": _TOOL_CACHE_VERSION, "entries": entries}, f, indent=2, sort_keys=True)
+		os.replace(tmp_path, path)
+	except OSError:
+		pass
+
+
+def _probe(repo_root):
+	"""Run the tool and git probes concurrently under one deadline.
+
+	Returns (tools, git results, probe statistics). Tool versions come from the on-disk cache
+	when the resolved executable is unchanged. Git state is always probed."""
+	start = time.monotonic()
+	deadline = start + _PROBE_DEADLINE
+	cache_path = _tool_cache_path()
+	cache = _load_tool_cache(cache_path)
+	tools = {}
+	cached = []
+	pending = {}
+	for name, cmd in _tool_commands().items():
+		key = _tool_cache_key(cmd)
+		if key is None:
+			tools[name] = {"value": None, "error": f"{cmd[0]} not found"}
+		elif key in cache:
+			tools[name] = cache[key]["result"]
+			cached.append(name)
+		else:
+			pending[name] = (key, cmd)
+
+	git_commands = _GIT_PROBES if shutil.which("git") else {}
+	with concurrent.futures.ThreadPoolExecutor(max_workers=max(len(pending) + len(git_commands), 1)) as executor:
+		tool_futures = {name: executor.submit(_run, cmd, None, deadline) for name, (key, cmd) in pending.items()}
+		git_futures = {name: executor.submit(_run, cmd, repo_root, deadline) for name, cmd in git_commands.items()}
+		git = {name: future.result() for name, future in git_futures.items()}
+		for name, future in tool_futures.items():
+			result = future.result()
+			tools[name] = result
+			if result.get("error") is None:
+				cache[pending[name][0]] = {"result": result, "time": time.time()}
+
+	if pending:
+		_save_tool_cache(cache_path, cache)
+	stats = {
+		"seconds": round(time.monotonic() - start, 3),
+		"cached": sorted(cached),
+		"probed": sorted(pending),
+		"cache_path": str(cache_path),
+	}
+	return dict(sorted(tools.items())), git, stats
 
 
 def emit_build_metadata(repo_name, artifact_path, paths=None, versions=None, options=None, env_var_names=()):
@@ -86,11 +189,12 @@ def emit_build_metadata(repo_name, artifact_path, paths=None, versions=None, opt
 	repo_root = paths.get("repo_root") or str(Path(__file__).resolve().parent)
 	env_names = list(dict.fromkeys(list(_CI_ENV_VARS) + list(env_var_names or ())))
 	environment = {name: _redact(name, os.environ.get(name)) for name in env_names}
+	tools, git_results, probe_stats = _probe(repo_root)
 	metadata = {
 		"schema_version": 1,
 		"generated_at_utc": datetime.datetime.now(datetime.timezone.utc).isoformat(),
 		"repo_name": repo_name,
-		"repository": {"root": repo_root, **_git_metadata(repo_root)},
+		"repository": {"root": repo_root, **_git_metadata(git_results)},
 		"ci": {name: environment[name] for name in _CI_ENV_VARS},
 		"host": {
 			"platform": platform.platform(),
@@ -103,7 +207,8 @@ def emit_build_metadata(repo_name, artifact_path, paths=None, versions=None, opt
 			"hostname": socket.gethostname(),
 		},
 		"python": {"executable": sys.executable, "version": sys.version},
-		"tools": _tool_versions(),
+		"tools": tools,
+		"tool_probe": probe_stats,
 		"paths": paths,
 		"versions": versions,
 		"options": options,
@@ -127,6 +232,7 @@ def emit_build_metadata(repo_name, artifact_path, paths=None, versions=None, opt
 	print(f"Python: {sys.executable} :: {platform.python_version()}")
 	for name in sorted(metadata["tools"]):
 		print(f"{name}: {_first_line(metadata['tools'][name])}")
+	print(f"Tool probing took {probe_stats['seconds']}s ({len(probe_stats['cached'])} cached, {len(probe_stats['probed'])} probed)")
 	for section_name, section in (("Paths", paths), ("Versions", versions), ("Options", options), ("Environment", environment)):
 		print(f"{section_name}:")
 		for key in sorted(section):
@@ -139,3 +245,18 @@ def emit_build_metadata(repo_name, artifact_path, paths=None, versions=None, opt
 	print(f"Build metadata written to: {metadata_path}")
 	print("=== End reproducibility preamble ===\n")
 	return metadata
+
+
+def update_build_metadata(artifact_path, **sections):
+	metadata_path = Path(artifact_path) / "build-metadata.json"
+	try:
+		with metadata_path.open("r", encoding="utf-8") as f:
+			metadata = json.load(f)
+	except (OSError, ValueError):
+		metadata = {}
+	metadata.update(sections)
+	Path(artifact_path).mkdir(parents=True, exist_ok=True)
+	with metadata_path.open("w", encoding="utf-8") as f:
+		json.dump(metadata, f, indent=2, sort_keys=True)
+		f.write("\n")
+	return metadata
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# Compiler flags and profile handling for profile guided optimization of Qt. build.py builds
+# an instrumented Qt, runs the offscreen workloads in benchmarks/qt_workloads against it, and
+# rebuilds Qt with the collected profile.
+
+import glob
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import build_log
+
+
+GCC = "gcc"
+CLANG = "clang"
+
+
+def compiler_family():
+	"""Return GCC or CLANG for the C++ compiler CMake will pick, or None when PGO is unsupported."""
+	if sys.platform == "win32":
+		return None
+	if sys.platform == "darwin":
+		return CLANG
+	compiler = os.environ.get("CXX") or shutil.which("c++") or "g++"
+	try:
+		version = subprocess.run([compiler, "--version"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+			text=True).stdout
+	except OSError:
+		return None
+	return CLANG if "clang" in version.lower() else GCC
+
+
+def instrument_flags(family, profile_dir):
+	"""Return (compile flags, link flags) of the instrumented build."""
+	if family == GCC:
+		# Qt is heavily multithreaded, atomic counter updates keep the profile consistent
+		flags = [f"-fprofile-generate={profile_dir}", "-fprofile-update=atomic"]
+		return flags, [f"-fprofile-generate={profile_dir}"]
+	flags = [f"-fprofile-generate={profile_dir}"]
+	return flags, flags
+
+
+def profile_use_flags(family, profile_dir):
+	"""Return (compile flags, link flags) of the build optimized with the profile."""
+	if family == GCC:
+		# Code the training workload never reaches is optimized as usual instead of for size
+		return [f"-fprofile-use={profile_dir}", "-fprofile-partial-training", "-fprofile-correction",
+			"-Wno-missing-profile"], []
+	return [f"-fprofile-use={merged_profile_path(profile_dir)}", "-Wno-profile-instr-unprofiled",
+		"-Wno-profile-instr-out-of-date"], []
+
+
+def merged_profile_path(profile_dir):
+	return Path(profile_dir) / "qt.profdata"
+
+
+def _llvm_profdata():
+	if sys.platform == "darwin":
+		return ["xcrun", "llvm-profdata"]
+	return [shutil.which("llvm-profdata") or "llvm-profdata"]
+
+
+def merge_profiles(family, profile_dir):
+	"""Prepare the raw profiles in `profile_dir` for the optimized build and describe them.
+
+	GCC reads its .gcda files directly. Clang's .profraw files are merged into one
+	.profdata file."""
+	profile_dir = Path(profile_dir)
+	if family == GCC:
+		files = glob.glob(str(profile_dir / "**" / "*.gcda"), recursive=True)
+		if not files:
+			raise RuntimeError(f"The training run wrote no profiles to {profile_dir}")
+		return {"files": len(files), "bytes": sum(os.path.getsize(f) for f in files)}
+	files = sorted(glob.glob(str(profile_dir / "*.profraw")))
+	if not files:
+		raise RuntimeError(f"The training run wrote no profiles to {profile_dir}")
+	merged = merged_profile_path(profile_dir)
+	if build_log.run(_llvm_profdata() + ["merge", "-output", str(merged)] + files)[0] != 0:
+		raise RuntimeError("Failed to merge the PGO profiles")
+	return {"files": len(files), "bytes": merged.stat().st_size}
@@ -0,0 +1,520 @@
+#!/usr/bin/env python3
+# Post-build stages of build.py: symbol extraction, stripping, bundling, signing and packaging.
+# They work on explicit roots so the Qt and PySide parts of the install tree can be processed
+# separately, and so they can be run outside of a full build.
+
+import compileall
+import concurrent.futures
+import copy
+import datetime
+import fnmatch
+import glob
+import importlib.util
+import py_compile
+import re
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+import build_log
+import signing
+
+
+ZIP_SYMLINK_ATTR = 0o120755 << 16
+ZIP_EXECUTABLE_ATTR = 0o755 << 16 # -rwxr-xr-x
+ZIP_REGULAR_FILE_ATTR = 0o644 << 16 # -rw-r--r--
+# GNU dwp crashes on the DWARF 5 that current GCC emits by default
+DWP_TOOLS = ("llvm-dwp", "dwp")
+MACOS_PLUGIN_TYPES = ("platforms", "imageformats")
+LINUX_PLUGIN_TYPES = (
+	"platforms", "imageformats", "wayland-decoration-client", "wayland-graphics-integration-client",
+	"wayland-shell-integration", "platforminputcontexts"
+)
+
+
+def run_checked(cmd, error_message, cwd=None, shell=False):
+	returncode, _ = build_log.run(cmd, cwd=cwd, shell=shell)
+	if returncode != 0:
+		print(error_message)
+		build_log.show_failure(error_message)
+		sys.exit(1)
+
+
+def remove_dir(path):
+	if sys.platform == 'win32':
+		# Windows being Windows. Not doing this as a recursive delete from the shell will yield
+		# "access denied" errors. Even deleting the individual files from the terminal does this.
+		# Somehow, deleting this way works correctly.
+		build_log.run('rmdir /S /Q "' + str(path) + '"', shell=True)
+	else:
+		shutil.rmtree(path)
+
+
+def install_staged_output(staged_path, user_qt_path):
+	user_qt_old_path = user_qt_path.parent / (user_qt_path.name + '-old')
+
+	if user_qt_old_path.exists():
+		print(f'Removing backup install at {user_qt_old_path}')
+		remove_dir(user_qt_old_path)
+
+	if user_qt_path.exists():
+		print(f'Overwriting existing Qt at {user_qt_path} with {staged_path}')
+		print(f'Moving {user_qt_path} to {user_qt_old_path} just in case')
+		user_qt_path.rename(user_qt_old_path)
+	else:
+		print(f'Installing new Qt at {user_qt_path} with {staged_path}')
+
+	user_qt_path.parent.mkdir(parents=True, exist_ok=True)
+	shutil.copytree(staged_path, user_qt_path, symlinks=True)
+
+
+def should_package_file(file_name):
+	return file_name != '.DS_Store'
+
+
+def walk_files(roots, exclude=()):
+	"""Yield every file (including symlinks to files) under `roots`, skipping excluded directories.
+
+	`roots` may contain files as well as directories, and so may `exclude`. Paths are compared
+	after normalization, so callers can pass them as Path or str. Missing roots are skipped."""
+	exclude = {os.path.normpath(str(p)) for p in exclude}
+	for root in roots:
+		root = str(root)
+		if os.path.isfile(root) or os.path.islink(root):
+			yield root
+			continue
+		for dirpath, dirs, files in os.walk(root):
+			dirs[:] = [d for d in dirs if os.path.normpath(os.path.join(dirpath, d)) not in exclude]
+			for file in files:
+				file_path = os.path.join(dirpath, file)
+				if os.path.normpath(file_path) not in exclude:
+					yield file_path
+
+
+def mac_should_strip(file_path):
+	"""Check if a file is a Mach-O binary that we should strip."""
+	if os.path.islink(file_path) or not os.path.isfile(file_path):
+		return False
+	if file_path.endswith('.o'):
+		return False
+	header = open(file_path, 'rb').read(4)
+	if header not in (b"\xcf\xfa\xed\xfe", b"\xca\xfe\xba\xbe"):
+		return False
+	# Skip binaries that are already signed with a non-ad-hoc signature.
+	# They were built by another project and it is that project's
+	# responsibility to provide debug symbols for them.
+	sig = subprocess.run(["codesign", "-d", "--verbose=2", file_path],
+		capture_output=True, text=True)
+	if sig.returncode == 0 and "Authority=" in sig.stderr:
+		return False
+	return True
+
+
+def linux_symbol_candidates(roots, exclude=()):
+	"""Return (symbol_files, strip_files): ELF files to extract symbols from, and those plus
+	static archives to strip."""
+	symbol_files = []
+	strip_files = []
+	for file_path in walk_files(roots, exclude):
+		if os.path.islink(file_path):
+			continue
+		if not os.path.isfile(file_path):
+			continue
+		if file_path.endswith('.o') or file_path.endswith('.dwp'):
+			continue
+		header = open(file_path, 'rb').read(7)
+		if header[:4] == b"\x7fELF":
+			strip_files.append(file_path)
+			symbol_files.append(file_path)
+		elif header == b"!<arch>" and file_path.endswith('.a'):
+			strip_files.append(file_path)
+	return symbol_files, strip_files
+
+
+def mac_symbol_candidates(roots, exclude=()):
+	dsym_files = []
+	strip_files = []
+	for file_path in walk_files(roots, exclude):
+		if mac_should_strip(file_path):
+			strip_files.append(file_path)
+			if not file_path.endswith('.a'):
+				dsym_files.append(file_path)
+	return dsym_files, strip_files
+
+
+def extract_linux_symbols(symbol_files, z, install_path):
+	for f in symbol_files:
+		debug_file = f + ".debug"
+		run_checked(["objcopy", "--only-keep-debug", "--compress-debug-sections=zlib", f, debug_file],
+			f"Failed to extract debug symbols from {f}")
+
+		# Re-inject .eh_frame data from the original binary
+		with tempfile.TemporaryDirectory() as tmp:
+			remove_args = []
+			add_args = []
+			for section in [".eh_frame", ".eh_frame_hdr"]:
+				dump = os.path.join(tmp, section.lstrip("."))
+				subprocess.run(["objcopy", "--dump-section",
+					f"{section}={dump}", f],
+					capture_output=True)
+				if not os.path.exists(dump):
+					continue
+				remove_args += ["--remove-section", section]
+				add_args += ["--add-section", f"{section}={dump}"]
+			if remove_args:
+				run_checked(["objcopy"] + remove_args + [debug_file], f"Failed to remove unwind sections from {debug_file}")
+				run_checked(["objcopy"] + add_args + [debug_file], f"Failed to add unwind sections to {debug_file}")
+
+		z.write(debug_file, os.path.relpath(debug_file, install_path))
+		os.remove(debug_file)
+
+
+def find_dwp():
+	for tool in DWP_TOOLS:
+		path = shutil.which(tool)
+		if path is not None:
+			return path
+	return None
+
+
+def package_split_dwarf(roots, exclude=(), dwp=None):
+	"""Package the .dwo files of each ELF binary under `roots` into a .dwp next to it, where
+	gdb and lldb look for it. The .dwo files are found through the skeleton units in the
+	binary, so the build directory must still exist. Binaries without split debug info, like
+	bundled libraries, get no package and go through objcopy extraction instead."""
+	dwp = dwp or find_dwp()
+	symbol_files, _ = linux_symbol_candidates(roots, exclude)
+
+	def package(f):
+		output = f + ".dwp"
+		result = subprocess.run([dwp, "-e", f, "-o", output], capture_output=True, text=True)
+		if result.returncode != 0:
+			print(f"Failed to package split DWARF of {f}: {result.stderr.strip()}")
+			if os.path.exists(output):
+				os.remove(output)
+			return None
+		# Nothing is written for binaries without skeleton units
+		return output if os.path.exists(output) else None
+
+	with concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+		packages = [p for p in executor.map(package, symbol_files) if p is not None]
+	return {"binaries": len(symbol_files), "packages": len(packages), "bytes": sum(os.path.getsize(p) for p in packages)}
+
+
+def archive_split_dwarf(symbol_files, z, install_path):
+	"""Move the .dwp packages of `symbol_files` into `z`. Returns the files that had one."""
+	packaged = []
+	for f in symbol_files:
+		package = f + ".dwp"
+		if not os.path.exists(package):
+			continue
+		z.write(package, os.path.relpath(package, install_path))
+		os.remove(package)
+		packaged.append(f)
+	return packaged
+
+
+def extract_mac_symbols(dsym_files, z, install_path):
+	processed = build_log.progress("Generated dSYMs", len(dsym_files))
+	for f in dsym_files:
+		processed.update(f"Processing {f}...")
+		dsym_path = f + ".dSYM"
+		run_checked(["dsymutil", "-o", dsym_path, f], f"Failed to generate dSYM from {f}")
+		for i in glob.glob(dsym_path + "/**/*", recursive=True):
+			if os.path.isfile(i) and should_package_file(os.path.basename(i)):
+				z.write(i, os.path.relpath(i, install_path))
+		shutil.rmtree(dsym_path)
+	processed.done()
+
+
+def strip_debug_info(strip_files):
+	strip_args = ["strip", "-S"] if sys.platform == 'darwin' else ["strip", "--strip-debug"]
+	stripped = build_log.progress("Stripped debug info", len(strip_files))
+	for f in strip_files:
+		run_checked(strip_args + [f], f"Failed to strip debug info from {f}")
+		stripped.update(f"Stripped debug info from {f}")
+	stripped.done()
+
+
+def collect_build_pdbs(z, build_path):
+	# PDBs from the build directory
+	added = build_log.progress("Added build PDBs")
+	for pdb in glob.glob(str(build_path) + '/**/*.pdb', recursive=True):
+		rel = os.path.relpath(pdb, build_path)
+		parts = rel.replace('\\', '/').split('/')
+		# Ignore intermediate PDBs that the compiler generates. We only care about linker PDBs.
+		if 'CMakeFiles' in parts or 'config.tests' in parts or parts[:2] == ['qtbase', 'lib']:
+			continue
+		z.write(pdb, rel)
+		added.update(f"Added {pdb}")
+	added.done()
+
+
+def collect_install_pdbs(z, roots, install_path, exclude=()):
+	# PDBs from the install directory (remove after archiving)
+	added = build_log.progress("Added install PDBs")
+	for pdb in walk_files(roots, exclude):
+		if not pdb.endswith('.pdb'):
+			continue
+		z.write(pdb, os.path.relpath(pdb, install_path))
+		os.remove(pdb)
+		added.update(f"Added {pdb}")
+	added.done()
+
+
+def extract_symbols(z, roots, install_path, exclude=(), split_dwarf=False):
+	"""Move debug info from the binaries under `roots` into the symbols archive `z`.
+
+	With `split_dwarf`, binaries that package_split_dwarf() made a .dwp for only have their
+	package archived. They keep the small skeleton units debuggers use to find it."""
+	if sys.platform == 'darwin':
+		print("\nExtracting debug symbols...")
+		dsym_files, strip_files = mac_symbol_candidates(roots, exclude)
+		extract_mac_symbols(dsym_files, z, install_path)
+		print("\nStripping debug info...")
+		strip_debug_info(strip_files)
+	elif sys.platform == 'linux':
+		print("\nExtracting debug symbols...")
+		symbol_files, strip_files = linux_symbol_candidates(roots, exclude)
+		if split_dwarf:
+			packaged = set(archive_split_dwarf(symbol_files, z, install_path))
+			print(f"Archived {len(packaged)} split DWARF packages")
+			symbol_files = [f for f in symbol_files if f not in packaged]
+			strip_files = [f for f in strip_files if f not in packaged]
+		extract_linux_symbols(symbol_files, z, install_path)
+		print("\nStripping debug info...")
+		strip_debug_info(strip_files)
+	elif sys.platform == 'win32':
+		print("\nCollecting debug symbols...")
+		collect_install_pdbs(z, roots, install_path, exclude)
+
+
+def compile_bytecode(root, ddir=None):
+	"""Byte-compile every Python source under `root` in parallel.
+
+	Uses checked-hash invalidation so the .pyc files do not depend on source mtimes (which
+	change when the archive is extracted) and are identical between builds. `ddir` replaces
+	the build path in the recorded file names. Returns the number and total size of the
+	.pyc files for the running interpreter, and the sources that failed to compile."""
+	# Deployment templates such as __init__.tmpl.py are not valid Python
+	skip = re.compile(r"\.tmpl\.py$")
+	ok = compileall.compile_dir(str(root), ddir=ddir, force=True, quiet=1, workers=0, rx=skip,
+		invalidation_mode=py_compile.PycInvalidationMode.CHECKED_HASH)
+	# compile_dir() only reports that something failed, find out what from the missing .pyc files
+	failed = sorted(os.path.relpath(path, root) for path in walk_files([root])
+		if path.endswith(".py") and not skip.search(path) and not os.path.exists(importlib.util.cache_from_source(path)))
+	tag = sys.implementation.cache_tag
+	files = 0
+	size = 0
+	for path in walk_files([root]):
+		if os.path.basename(os.path.dirname(path)) == "__pycache__" and f".{tag}." in os.path.basename(path):
+			files += 1
+			size += os.path.getsize(path)
+	return {"ok": bool(ok) and not failed, "cache_tag": tag, "files": files, "bytes": size, "failed": failed}
+
+
+def _bundle_copy(sources, target_dir, fix_rpath):
+	for f in sources:
+		target = os.path.join(target_dir, os.path.basename(f))
+		shutil.copy(f, target)
+		fix_rpath(target)
+
+
+# Create modified libraries that contain the correct rpath for bundling. These will be signed separately
+# so that each bundle does not need to re-sign the libraries.
+def bundle_qt_plugins(install_path, bundle_path):
+	if sys.platform == 'darwin':
+		def fix_rpath(target):
+			run_checked(["install_name_tool", "-delete_rpath", "@loader_path/../../lib", target], f"Failed to remove rpath from {target}")
+			run_checked(["install_name_tool", "-add_rpath", "@loader_path/../../../Frameworks", target], f"Failed to add framework rpath to {target}")
+		plugin_types, suffix = MACOS_PLUGIN_TYPES, "*.dylib"
+	elif sys.platform == 'linux':
+		def fix_rpath(target):
+			run_checked(["patchelf", "--set-rpath", "$ORIGIN/../..", target], f"ERROR: Failed to change rpath in {target}")
+		plugin_types, suffix = LINUX_PLUGIN_TYPES, "*.so"
+	else:
+		return
+
+	os.makedirs(bundle_path, exist_ok=True)
+	for plugin_type in plugin_types:
+		os.mkdir(os.path.join(bundle_path, plugin_type))
+	for plugin_type in plugin_types:
+		_bundle_copy(glob.glob(os.path.join(install_path, "plugins", plugin_type, suffix)),
+			os.path.join(bundle_path, plugin_type), fix_rpath)
+
+
+def bundle_pyside(pyside_install_path, bundle_path, qt_version):
+	pyside_path = os.path.join(pyside_install_path, "site-packages", "PySide6")
+	if sys.platform == 'darwin':
+		def fix_rpath(target):
+			run_checked(["install_name_tool", "-delete_rpath", "@loader_path/Qt/lib", target], f"Failed to remove rpath from {target}")
+			run_checked(["install_name_tool", "-add_rpath", "@loader_path/../../../Frameworks", target], f"Failed to add framework rpath to {target}")
+		patterns = ("*.so", "*.dylib")
+	elif sys.platform == 'linux':
+		def fix_rpath(target):
+			run_checked(["patchelf", "--set-rpath", "$ORIGIN:$ORIGIN/../shiboken6:$ORIGIN/../..", target], f"Failed to change rpath in {target}")
+		qt_major_minor_version = ".".join(qt_version.split(".")[0:2])
+		patterns = ("*.abi3.so", f"libpyside6*.so.{qt_major_minor_version}")
+	else:
+		return
+
+	os.makedirs(os.path.join(bundle_path, "PySide6"))
+	for pattern in patterns:
+		_bundle_copy(glob.glob(os.path.join(pyside_path, pattern)), os.path.join(bundle_path, "PySide6"), fix_rpath)
+
+
+def _is_macho(file_path):
+	if os.path.islink(file_path) or not os.access(file_path, os.X_OK):
+		return False
+	with open(file_path, 'rb') as f:
+		return f.read(4) in (b"\xca\xfe\xba\xbe", b"\xcf\xfa\xed\xfe")
+
+
+def signing_groups(roots, exclude=()):
+	"""Files to sign in order: every group is signed after the previous one. On macOS the
+	Mach-O files come first, then frameworks and applications, the most deeply nested first."""
+	if sys.platform == 'darwin':
+		groups = [[f for f in walk_files(roots, exclude) if _is_macho(f)]]
+		excluded = {os.path.normpath(str(p)) for p in exclude}
+		bundles = []
+		for root in roots:
+			for dirpath, dirs, files in os.walk(root):
+				dirs[:] = [d for d in dirs if os.path.normpath(os.path.join(dirpath, d)) not in excluded]
+				bundles += [os.path.join(dirpath, d) for d in dirs if ".framework" in d or ".app" in d]
+		for depth in sorted({b.count(os.sep) for b in bundles}, reverse=True):
+			groups.append([b for b in bundles if b.count(os.sep) == depth])
+		return groups
+	if sys.platform.startswith("win"):
+		return [[f for f in walk_files(roots, exclude) if f.endswith((".exe", ".dll", ".pyd"))]]
+	return [[f for f in walk_files(roots, exclude) if not os.path.islink(f) and _is_elf(f)]]
+
+
+def _is_elf(file_path):
+	with open(file_path, 'rb') as f:
+		return f.read(4) == b"\x7fELF"
+
+
+def sign_tree(roots, exclude=(), signer=None, jobs=None):
+	"""Sign the binaries under `roots` with `signer` (see signing.py), the platform's signer
+	by default. Exits when a file cannot be signed. Returns the signing report."""
+	if signer is None:
+		name = signing.default_signer_name()
+		if name is None:
+			return None
+		signer = signing.create_signer(name, tempfile.gettempdir())
+	report = signing.sign_files(signer, signing_groups(roots, exclude), jobs)
+	print(f"Signed {report['files']} files in {report['batches']} batches with {signer.name} ({report['seconds']:.1f} s)")
+	if report["failed"]:
+		for f in report["failed"]:
+			print(f"Failed to sign {f}")
+		sys.exit(1)
+	return report
+
+
+def add_tree_to_zip(z, install_path, archive_root, roots=None, exclude=()):
+	"""Add the files under `roots` (default: all of `install_path`) to `z`, named relative
+	to `install_path` below `archive_root` and keeping symlinks and executable bits."""
+	install_path = Path(install_path)
+	excluded = {os.path.normpath(str(p)) for p in exclude}
+	added = build_log.progress(f"Added to {archive_root or 'archive'}")
+	for top in (roots if roots is not None else [install_path]):
+		top = Path(top)
+		if not top.exists() and not top.is_symlink():
+			continue
+		if top.is_file() or top.is_symlink():
+			walk = [(str(top.parent), [], [top.name])]
+		else:
+			walk = os.walk(top)
+		for root, dirs, files in walk:
+			dirs[:] = [d for d in dirs if os.path.normpath(os.path.join(root, d)) not in excluded]
+			files = [f for f in files if os.path.normpath(os.path.join(root, f)) not in excluded]
+			relpath = Path(root).resolve().relative_to(install_path.resolve())
+			relpath_parts = [] if relpath == Path('.') else [str(relpath)]
+			for dir in dirs:
+				file_path = Path(root) / dir
+				arc_name = os.path.join(archive_root, *relpath_parts, dir)
+				if file_path.is_symlink():
+					info = zipfile.ZipInfo(arc_name, datetime.datetime.now().timetuple())
+					info.compress_type = zipfile.ZIP_DEFLATED
+					info.external_attr = ZIP_SYMLINK_ATTR
+					z.writestr(info, os.readlink(file_path))
+			for file in files:
+				if not should_package_file(file):
+					continue
+				added.update(f"Adding {relpath}/{file}...")
+				file_path = Path(root) / file
+				arc_name = os.path.join(archive_root, *relpath_parts, file)
+				info = zipfile.ZipInfo(arc_name, datetime.datetime.now().timetuple())
+				info.compress_type = zipfile.ZIP_DEFLATED
+
+				if file_path.is_symlink():
+					info.external_attr = ZIP_SYMLINK_ATTR
+					z.writestr(info, os.readlink(file_path))
+				else:
+					if os.access(file_path, os.X_OK):
+						info.external_attr = ZIP_EXECUTABLE_ATTR
+					else:
+						info.external_attr = ZIP_REGULAR_FILE_ATTR
+
+					with file_path.open('rb') as f:
+						z.writestr(info, f.read())
+	added.done()
+
+
+def classify_file_role(relative_path, role_rules, default_role="runtime"):
+	"""Return the role of the file at `relative_path` (with forward slashes) from the first
+	rule in `role_rules` with a matching pattern."""
+	for role, patterns in role_rules:
+		if any(fnmatch.fnmatchcase(relative_path, pattern) for pattern in patterns):
+			return role
+	return default_role
+
+
+class RoleArchives:
+	"""Writes each entry both to a combined archive and to the archive of its role.
+
+	It stands in for the ZipFile passed to add_tree_to_zip(). `role_paths` maps each role
+	to its archive path, and entry names are classified relative to `archive_root`.
+	"""
+
+	def __init__(self, combined_path, role_paths, role_rules, archive_root, default_role="runtime"):
+		self.combined_path = Path(combined_path)
+		self.role_paths = {role: Path(path) for role, path in role_paths.items()}
+		self.combined = zipfile.ZipFile(self.combined_path, 'w', zipfile.ZIP_DEFLATED)
+		self.roles = {role: zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) for role, path in self.role_paths.items()}
+		self._rules = role_rules
+		self._default_role = default_role
+		self._prefix = Path(archive_root).as_posix().rstrip("/") + "/"
+		self._counts = {role: {"files": 0, "uncompressed_bytes": 0} for role in self.roles}
+		self.summary = None
+
+	def writestr(self, info, data):
+		name = info.filename
+		relative = name[len(self._prefix):] if name.startswith(self._prefix) else name
+		role = classify_file_role(relative, self._rules, self._default_role)
+		self.combined.writestr(info, data)
+		# writestr() records the entry offset in `info`, each archive needs its own
+		self.roles[role].writestr(copy.copy(info), data)
+		self._counts[role]["files"] += 1
+		self._counts[role]["uncompressed_bytes"] += len(data)
+
+	def close(self):
+		if self.summary is not None:
+			return self.summary
+		self.combined.close()
+		for z in self.roles.values():
+			z.close()
+		self.summary = {"combined": {"artifact": self.combined_path.name, "bytes": self.combined_path.stat().st_size}}
+		for role, path in self.role_paths.items():
+			self.summary[role] = dict(self._counts[role], artifact=path.name, bytes=path.stat().st_size)
+		return self.summary
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+try:
+	import resource
+except ImportError:
+	# Not available on Windows, only wall time is recorded there
+	resource = None
+
+
+# ru_maxrss is reported in bytes on macOS and in kilobytes everywhere else
+_MAXRSS_SCALE = 1 if sys.platform == "darwin" else 1024
+# ru_inblock/ru_oublock count 512 byte blocks
+_BLOCK_SIZE = 512
+DEFAULT_REGRESSION_THRESHOLD = 10.0
+DEFAULT_MIN_SECONDS = 30.0
+
+
+def _snapshot():
+	sample = {"wall": time.monotonic()}
+	if resource is None:
+		return sample
+	own = resource.getrusage(resource.RUSAGE_SELF)
+	children = resource.getrusage(resource.RUSAGE_CHILDREN)
+	sample.update({
+		"user": own.ru_utime + children.ru_utime,
+		"system": own.ru_stime + children.ru_stime,
+		"child_maxrss": children.ru_maxrss * _MAXRSS_SCALE,
+		"read_bytes": (own.ru_inblock + children.ru_inblock) * _BLOCK_SIZE,
+		"write_bytes": (own.ru_oublock + children.ru_oublock) * _BLOCK_SIZE,
+	})
+	return sample
+
+
+class StepTimer:
+	"""Records wall time and resource usage of each build step.
+
+	RUSAGE_CHILDREN only reports the largest RSS of any waited-for child so far, so a
+	step's peak child RSS is only known when it raised that maximum. Otherwise it is
+	recorded as null, meaning the step stayed below the peak of an earlier step.
+	"""
+
+	def __init__(self):
+		self.steps = []
+		self._name = None
+		self._start = None
+		self._started_at = None
+		self._counts = {}
+
+	def start(self, name):
+		self.stop()
+		count = self._counts.get(name, 0) + 1
+		self._counts[name] = count
+		self._name = name if count == 1 else f"{name} ({count})"
+		self._start = _snapshot()
+		self._started_at = time.time()
+
+	def stop(self):
+		if self._name is None:
+			return None
+		end = _snapshot()
+		entry = {
+			"name": self._name,
+			"started_at": self._started_at,
+			"wall_seconds": round(end["wall"] - self._start["wall"], 3),
+		}
+		if resource is not None:
+			entry.update({
+				"user_seconds": round(end["user"] - self._start["user"], 3),
+				"system_seconds": round(end["system"] - self._start["system"], 3),
+				"peak_child_rss_bytes": end["child_maxrss"] if end["child_maxrss"] > self._start["child_maxrss"] else None,
+				"read_bytes": end["read_bytes"] - self._start["read_bytes"],
+				"write_bytes": end["write_bytes"] - self._start["write_bytes"],
+			})
+		self.steps.append(entry)
+		self._name = None
+		return entry
+
+	def add(self, name, started_at, wall_seconds):
+		"""Record work that ran in the background, overlapping the sequential steps."""
+		self.steps.append({
+			"name": name,
+			"started_at": started_at,
+			"wall_seconds": round(wall_seconds, 3),
+			"background": True,
+		})
+
+	def as_dict(self):
+		return {
+			"steps": list(self.steps),
+			"total_wall_seconds": round(sum(s["wall_seconds"] for s in self.steps if not s.get("background")), 3),
+		}
+
+
+def _load_steps(path):
+	with open(path, "r", encoding="utf-8") as f:
+		metadata = json.load(f)
+	timings = metadata.get("timings") or {}
+	return {s["name"]: s for s in timings.get("steps", [])}
+
+
+def compare_timings(old_path, new_path, threshold=DEFAULT_REGRESSION_THRESHOLD, min_seconds=DEFAULT_MIN_SECONDS):
+	"""Return (rows, regressions) comparing step wall times of two build-metadata.json files.
+
+	A step regressed when its wall time grew by more than `threshold` percent and by more
+	than `min_seconds` seconds, so short steps do not trip on noise.
+	"""
+	old_steps = _load_steps(old_path)
+	new_steps = _load_steps(new_path)
+	rows = []
+	regressions = []
+	for name in list(dict.fromkeys(list(old_steps) + list(new_steps))):
+		old = old_steps.get(name, {}).get("wall_seconds")
+		new = new_steps.get(name, {}).get("wall_seconds")
+		delta = None if old is None or new is None else new - old
+		percent = None if delta is None or old == 0 else delta * 100.0 / old
+		regressed = delta is not None and delta > min_seconds and (percent is None or percent > threshold)
+		row = {"name": name, "old": old, "new": new, "delta": delta, "percent": percent, "regressed": regressed}
+		rows.append(row)
+		if regressed:
+			regressions.append(row)
+	return rows, regressions
+
+
+def _format_seconds(value):
+	return "-" if value is None else f"{value:.1f}s"
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Compare per-step timings of two build-metadata.json files")
+	subparsers = parser.add_subparsers(dest="command", required=True)
+	compare = subparsers.add_parser("compare", help="flag steps that got slower between two builds")
+	compare.add_argument("old", help="baseline build-metadata.json")
+	compare.add_argument("new", help="build-metadata.json to check")
+	compare.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD, help="regression threshold in percent")
+	compare.add_argument("--min-seconds", type=float, default=DEFAULT_MIN_SECONDS, help="ignore regressions smaller than this many seconds")
+	args = parser.parse_args(argv)
+
+	rows, regressions = compare_timings(args.old, args.new, args.threshold, args.min_seconds)
+	print(f"{'Step':40} {'Old':>10} {'New':>10} {'Delta':>10} {'%':>8}")
+	for row in rows:
+		percent = "-" if row["percent"] is None else f"{row['percent']:+.1f}"
+		marker = "  REGRESSED" if row["regressed"] else ""
+		print(f"{row['name']:40} {_format_seconds(row['old']):>10} {_format_seconds(row['new']):>10} "
+			f"{_format_seconds(row['delta']):>10} {percent:>8}{marker}")
+	if regressions:
+		print(f"\n{len(regressions)} step(s) regressed by more than {args.threshold}% and {args.min_seconds}s")
+		return 1
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
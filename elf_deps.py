@@ -0,0 +1,607 @@
+#!/usr/bin/env python3
+# Dependency graph of the ELF shared objects in an install tree, built by reading DT_NEEDED,
+# DT_RPATH and DT_RUNPATH the way ld.so resolves them, without running any of the binaries.
+# build.py uses it to bundle libraries that resolve outside the install tree (like a system
+# libicu picked up by an older compiler), to flag libraries present or loaded from more than
+# one place, and to report how many libraries and symbol lookups each entry point costs at load
+# time. It also counts the dynamic relocations, exported symbols and GNU hash table size of each
+# library, which --symbolic builds are meant to shrink.
+
+import argparse
+import glob
+import json
+import mmap
+import os
+import struct
+import sys
+from pathlib import Path
+
+from file_hash import file_digest
+
+
+ELF_MAGIC = b"\x7fELF"
+PT_LOAD = 1
+PT_DYNAMIC = 2
+DT_NULL = 0
+DT_NEEDED = 1
+DT_PLTRELSZ = 2
+DT_HASH = 4
+DT_STRTAB = 5
+DT_SYMTAB = 6
+DT_RELA = 7
+DT_RELASZ = 8
+DT_RELAENT = 9
+DT_STRSZ = 10
+DT_SONAME = 14
+DT_RPATH = 15
+DT_REL = 17
+DT_RELSZ = 18
+DT_RELENT = 19
+DT_PLTREL = 20
+DT_JMPREL = 23
+DT_RUNPATH = 29
+DT_RELRSZ = 35
+DT_GNU_HASH = 0x6ffffef5
+DT_RELACOUNT = 0x6ffffff9
+DT_RELCOUNT = 0x6ffffffa
+SHN_UNDEF = 0
+STB_GLOBAL = 1
+STB_WEAK = 2
+STB_GNU_UNIQUE = 10
+
+DEFAULT_SYSTEM_DIRS = ("/lib64", "/usr/lib64", "/lib", "/usr/lib")
+# Libraries that must come from the install tree even when the system has a copy, because the
+# system one may be a different version than Qt was built against
+ALWAYS_BUNDLE_PREFIXES = ("libicu",)
+
+
+class ElfFile:
+	"""The dynamic section of one ELF object: what it is called, what it needs and where it
+	looks, plus its dynamic symbol counts. `dynamic` maps each tag to its values."""
+
+	def __init__(self, path, elf_class, machine, dynamic, strings, symbols, gnu_hash=None):
+		self.path = str(path)
+		self.elf_class = elf_class
+		self.machine = machine
+		self.dynamic = dynamic
+		self.soname = strings.get(DT_SONAME, [None])[0]
+		self.needed = strings.get(DT_NEEDED, [])
+		self.rpath = _split_path(strings.get(DT_RPATH, [""])[0])
+		self.runpath = _split_path(strings.get(DT_RUNPATH, [""])[0])
+		self.imports, self.exports = symbols
+		self.gnu_hash = gnu_hash
+
+	def relocations(self):
+		"""Dynamic relocation counts: relative ones only add the load address, symbolic ones
+		need a symbol lookup at load time, and PLT ones a lookup on the first call (or at load
+		time with BIND_NOW)."""
+		rela_size = self.dynamic.get(DT_RELAENT, [24 if self.elf_class == 2 else 12])[0] or 1
+		rel_size = self.dynamic.get(DT_RELENT, [16 if self.elf_class == 2 else 8])[0] or 1
+		total = self.dynamic.get(DT_RELASZ, [0])[0] // rela_size + self.dynamic.get(DT_RELSZ, [0])[0] // rel_size
+		# Linkers sort relative relocations first and record how many there are
+		relative = self.dynamic.get(DT_RELACOUNT, [0])[0] + self.dynamic.get(DT_RELCOUNT, [0])[0]
+		plt_size = rela_size if self.dynamic.get(DT_PLTREL, [DT_RELA])[0] == DT_RELA else rel_size
+		return {
+			"relative": relative,
+			"symbolic": max(total - relative, 0),
+			"plt": self.dynamic.get(DT_PLTRELSZ, [0])[0] // plt_size,
+			"relr_bytes": self.dynamic.get(DT_RELRSZ, [0])[0],
+		}
+
+	@property
+	def name(self):
+		return self.soname or os.path.basename(self.path)
+
+
+def _split_path(value):
+	return [p for p in value.split(":") if p] if value else []
+
+
+def _read_symbols(data, fmt, elf_class, dynamic, vaddr_to_offset):
+	"""Return ((undefined, exported) dynamic symbol counts, GNU hash table size). The symbol
+	count comes from the DT_HASH or DT_GNU_HASH table, since the dynamic section does not
+	record it."""
+	symtab = dynamic.get(DT_SYMTAB, [None])[0]
+	if symtab is None:
+		return (0, 0), None
+	count = None
+	gnu_hash = None
+	if DT_GNU_HASH in dynamic:
+		offset = vaddr_to_offset(dynamic[DT_GNU_HASH][0])
+		if offset is not None:
+			nbuckets, symoffset, bloom_size, _ = struct.unpack_from(fmt + "IIII", data, offset)
+			word_size = 8 if elf_class == 2 else 4
+			buckets_offset = offset + 16 + bloom_size * word_size
+			buckets = struct.unpack_from(fmt + "I" * nbuckets, data, buckets_offset)
+			last = max(buckets) if buckets else 0
+			if last < symoffset:
+				count = symoffset
+			else:
+				# Walk the chain of the highest bucket to its end marker
+				chains_offset = buckets_offset + nbuckets * 4
+				# struct.error past the end of a truncated table
+				while not struct.unpack_from(fmt + "I", data, chains_offset + (last - symoffset) * 4)[0] & 1:
+					last += 1
+				count = last + 1
+			gnu_hash = {
+				"buckets": nbuckets,
+				"bloom_words": bloom_size,
+				"hashed_symbols": count - symoffset,
+				"bytes": 16 + bloom_size * word_size + nbuckets * 4 + (count - symoffset) * 4,
+			}
+	if DT_HASH in dynamic:
+		offset = vaddr_to_offset(dynamic[DT_HASH][0])
+		if offset is not None:
+			count = struct.unpack_from(fmt + "II", data, offset)[1]
+	offset = vaddr_to_offset(symtab)
+	if count is None or offset is None:
+		return (0, 0), gnu_hash
+	size = 24 if elf_class == 2 else 16
+	imports = exports = 0
+	for index in range(1, min(count, (len(data) - offset) // size)):
+		entry = offset + index * size
+		if elf_class == 2:
+			info, other, shndx = struct.unpack_from(fmt + "BBH", data, entry + 4)
+		else:
+			info, other, shndx = struct.unpack_from(fmt + "BBH", data, entry + 12)
+		if shndx == SHN_UNDEF:
+			imports += 1
+		elif info >> 4 in (STB_GLOBAL, STB_WEAK, STB_GNU_UNIQUE) and other & 3 == 0:
+			exports += 1
+	return (imports, exports), gnu_hash
+
+
+def read_elf(path):
+	"""Parse the dynamic section of `path`. Returns None for files that are not ELF objects."""
+	try:
+		with open(path, "rb") as f:
+			if f.read(4) != ELF_MAGIC:
+				return None
+			size = os.fstat(f.fileno()).st_size
+			data = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+	except (OSError, ValueError):
+		return None
+	with data:
+		# Truncated or corrupt files that pass the checks below are not ELF objects either
+		try:
+			return _parse_elf(path, data)
+		except (struct.error, IndexError, ValueError):
+			return None
+
+
+def _parse_elf(path, data):
+	if len(data) < 52:
+		return None
+	elf_class, encoding = data[4], data[5]
+	if elf_class not in (1, 2) or encoding not in (1, 2) or (elf_class == 2 and len(data) < 64):
+		return None
+	fmt = "<" if encoding == 1 else ">"
+	if elf_class == 2:
+		machine, = struct.unpack_from(fmt + "H", data, 18)
+		phoff, = struct.unpack_from(fmt + "Q", data, 32)
+		phentsize, phnum = struct.unpack_from(fmt + "HH", data, 54)
+	else:
+		machine, = struct.unpack_from(fmt + "H", data, 18)
+		phoff, = struct.unpack_from(fmt + "I", data, 28)
+		phentsize, phnum = struct.unpack_from(fmt + "HH", data, 42)
+	if phentsize < (56 if elf_class == 2 else 32) or phoff + phnum * phentsize > len(data):
+		return None
+
+	loads = []
+	dynamic_segment = None
+	for i in range(phnum):
+		entry = phoff + i * phentsize
+		if elf_class == 2:
+			p_type, _, p_offset, p_vaddr, _, p_filesz = struct.unpack_from(fmt + "IIQQQQ", data, entry)
+		else:
+			p_type, p_offset, p_vaddr, _, p_filesz = struct.unpack_from(fmt + "IIIII", data, entry)
+		if p_type == PT_LOAD:
+			loads.append((p_vaddr, p_offset, p_filesz))
+		elif p_type == PT_DYNAMIC:
+			dynamic_segment = (p_offset, p_filesz)
+
+	def vaddr_to_offset(address):
+		for vaddr, offset, filesz in loads:
+			if vaddr <= address < vaddr + filesz:
+				return address - vaddr + offset
+		return None
+
+	dynamic = {}
+	if dynamic_segment is not None:
+		entry_format, entry_size = (fmt + "qQ", 16) if elf_class == 2 else (fmt + "iI", 8)
+		offset, filesz = dynamic_segment
+		for entry in range(offset, min(offset + filesz, len(data)) - entry_size + 1, entry_size):
+			tag, value = struct.unpack_from(entry_format, data, entry)
+			if tag == DT_NULL:
+				break
+			dynamic.setdefault(tag, []).append(value)
+
+	strings = {}
+	strtab = vaddr_to_offset(dynamic[DT_STRTAB][0]) if DT_STRTAB in dynamic else None
+	if strtab is not None:
+		for tag in (DT_NEEDED, DT_SONAME, DT_RPATH, DT_RUNPATH):
+			for value in dynamic.get(tag, []):
+				start = strtab + value
+				if start >= len(data):
+					continue
+				end = data.find(b"\0", start)
+				end = len(data) if end < 0 else end
+				strings.setdefault(tag, []).append(data[start:end].decode("utf-8", "replace"))
+	symbols, gnu_hash = _read_symbols(data, fmt, elf_class, dynamic, vaddr_to_offset) if strtab is not None else ((0, 0), None)
+	return ElfFile(path, elf_class, machine, dynamic, strings, symbols, gnu_hash)
+
+
+def _ld_so_conf_dirs(path="/etc/ld.so.conf", seen=None):
+	seen = set() if seen is None else seen
+	if path in seen:
+		return []
+	seen.add(path)
+	dirs = []
+	try:
+		with open(path, "r", encoding="utf-8", errors="replace") as f:
+			lines = f.read().splitlines()
+	except OSError:
+		return []
+	for line in lines:
+		line = line.split("#", 1)[0].strip()
+		if line.startswith("include "):
+			pattern = line[len("include "):].strip()
+			if not os.path.isabs(pattern):
+				pattern = os.path.join(os.path.dirname(path), pattern)
+			for included in sorted(glob.glob(pattern)):
+				dirs += _ld_so_conf_dirs(included, seen)
+		elif line:
+			dirs.append(line)
+	return dirs
+
+
+def system_library_dirs():
+	"""Directories ld.so searches after the RPATH and RUNPATH of an object."""
+	dirs = []
+	for directory in _ld_so_conf_dirs() + list(DEFAULT_SYSTEM_DIRS):
+		if directory not in dirs and os.path.isdir(directory):
+			dirs.append(directory)
+	return dirs
+
+
+def find_elf_files(roots):
+	"""Every ELF object under `roots`, skipping symlinks so each file is read once."""
+	objects = {}
+	for root in roots:
+		for directory, _, names in os.walk(root):
+			for name in names:
+				path = os.path.join(directory, name)
+				if os.path.islink(path):
+					continue
+				elf = read_elf(path)
+				if elf is not None:
+					objects[os.path.realpath(path)] = elf
+	return objects
+
+
+def _expand_origin(directory, origin):
+	return directory.replace("${ORIGIN}", origin).replace("$ORIGIN", origin)
+
+
+def _inside(path, roots):
+	return any(path == root or path.startswith(root + os.sep) for root in roots)
+
+
+class DependencyGraph:
+	"""Resolves the dependencies of the ELF objects under `roots` like ld.so would on this host.
+
+	Each object first searches its DT_RPATH and those of the objects that loaded it (only when
+	it has no DT_RUNPATH), then its DT_RUNPATH, then the system directories. LD_LIBRARY_PATH is
+	ignored, since it will not be set where the build is deployed."""
+
+	def __init__(self, roots, system_dirs=None):
+		self.roots = [os.path.realpath(r) for r in roots]
+		self.system_dirs = [os.path.realpath(d) for d in (system_library_dirs() if system_dirs is None else system_dirs)]
+		self.objects = find_elf_files(self.roots)
+		# A library that is already loaded is found by its soname, whatever the search path of
+		# the object needing it, so libraries in the tree count as present
+		self.sonames = {elf.soname for elf in self.objects.values() if elf.soname}
+		self._cache = {}
+
+	def elf(self, path):
+		path = os.path.realpath(path)
+		if path not in self.objects:
+			self.objects[path] = read_elf(path)
+		return self.objects[path]
+
+	def _search_dirs(self, elf, loader_rpaths):
+		origin = os.path.dirname(elf.path)
+		dirs = []
+		if not elf.runpath:
+			dirs += [_expand_origin(d, origin) for d in elf.rpath] + loader_rpaths
+		dirs += [_expand_origin(d, origin) for d in elf.runpath]
+		return dirs + self.system_dirs
+
+	def resolve(self, elf, name, loader_rpaths=()):
+		"""Return the path `name`, needed by `elf`, resolves to, or None."""
+		if "/" in name:
+			return os.path.realpath(name) if os.path.exists(name) else None
+		for directory in self._search_dirs(elf, list(loader_rpaths)):
+			candidate = os.path.join(directory, name)
+			key = (candidate, elf.elf_class, elf.machine)
+			if key not in self._cache:
+				found = None
+				if os.path.exists(candidate):
+					target = self.elf(candidate)
+					# ld.so skips libraries of another architecture, like 32-bit multilib copies
+					if target is not None and target.elf_class == elf.elf_class and target.machine == elf.machine:
+						found = os.path.realpath(candidate)
+				self._cache[key] = found
+			if self._cache[key] is not None:
+				return self._cache[key]
+		return None
+
+	def load(self, paths):
+		"""Emulate loading `paths` into one process, in order. Returns the loaded objects as
+		{path: ElfFile} in load order and the [(needed by, name)] that did not resolve.
+		Like ld.so, a library whose soname is already loaded is not searched for again."""
+		loaded = {}
+		sonames = {}
+		unresolved = []
+		queue = []
+		for path in paths:
+			elf = self.elf(path)
+			if elf is not None and os.path.realpath(path) not in loaded:
+				loaded[os.path.realpath(path)] = elf
+				sonames[elf.name] = os.path.realpath(path)
+				queue.append((elf, []))
+		while queue:
+			elf, loader_rpaths = queue.pop(0)
+			origin = os.path.dirname(elf.path)
+			rpaths = loader_rpaths if elf.runpath else [_expand_origin(d, origin) for d in elf.rpath] + loader_rpaths
+			for name in elf.needed:
+				if name in sonames:
+					continue
+				path = self.resolve(elf, name, loader_rpaths)
+				if path is None:
+					unresolved.append((elf.path, name))
+					continue
+				sonames[name] = path
+				if path not in loaded:
+					loaded[path] = self.elf(path)
+					queue.append((loaded[path], rpaths))
+		return loaded, unresolved
+
+	def classify(self, path):
+		if _inside(path, self.roots):
+			return "bundled"
+		if any(_inside(path, [d]) for d in self.system_dirs):
+			return "system"
+		return "external"
+
+	def libraries_to_bundle(self):
+		"""Dependencies of the objects under the roots that resolve outside of them and are not
+		system libraries, or that must always be bundled. Returns {name: path}."""
+		to_bundle = {}
+		for path, elf in list(self.objects.items()):
+			if elf is None or not _inside(path, self.roots):
+				continue
+			for name in elf.needed:
+				if name in self.sonames:
+					continue
+				resolved = self.resolve(elf, name)
+				if resolved is None or _inside(resolved, self.roots):
+					continue
+				if self.classify(resolved) == "external" or name.startswith(ALWAYS_BUNDLE_PREFIXES):
+					to_bundle[name] = resolved
+		return to_bundle
+
+	def unresolved(self):
+		missing = []
+		for path, elf in sorted(self.objects.items()):
+			if elf is not None and _inside(path, self.roots):
+				missing += [(path, name) for name in elf.needed if name not in self.sonames and self.resolve(elf, name) is None]
+		return missing
+
+	def duplicates(self):
+		"""Sonames present at more than one path under the roots, with whether the copies differ.
+		Copies that differ only by RUNPATH (like the bundle/ plugin copies) still differ."""
+		by_name = {}
+		for path, elf in self.objects.items():
+			if elf is not None and elf.soname and _inside(path, self.roots):
+				by_name.setdefault(elf.soname, []).append(path)
+		result = {}
+		for name, paths in sorted(by_name.items()):
+			if len(paths) > 1:
+				digests = {file_digest(p) for p in paths}
+				result[name] = {"paths": sorted(paths), "identical": len(digests) == 1}
+		return result
+
+	def conflicts(self):
+		"""Sonames that objects under the roots resolve to different files, which loads both
+		copies or one of them in place of the other depending on load order."""
+		resolved = {}
+		for path, elf in self.objects.items():
+			if elf is None or not _inside(path, self.roots):
+				continue
+			for name in elf.needed:
+				target = self.resolve(elf, name)
+				if target is not None:
+					resolved.setdefault(name, {}).setdefault(target, []).append(path)
+		return {name: {target: sorted(users) for target, users in targets.items()}
+			for name, targets in sorted(resolved.items()) if len(targets) > 1}
+
+
+def _load_summary(graph, loaded):
+	kinds = {"bundled": 0, "system": 0, "external": 0}
+	for path in loaded:
+		kinds[graph.classify(path)] += 1
+	return {
+		"libraries": len(loaded),
+		**kinds,
+		"symbol_lookups": sum(elf.imports for elf in loaded.values() if elf is not None),
+	}
+
+
+def entry_point_costs(graph, base, groups):
+	"""Libraries and symbol lookups (undefined dynamic symbols) needed to load `base`, a list
+	of paths, and what each group of `groups` ({name: [paths]}) adds on top of it. For a group,
+	"max" is its most expensive member and "total" loads all members at once."""
+	base_loaded, base_unresolved = graph.load(base)
+	report = {"base": {**_load_summary(graph, base_loaded), "unresolved": [n for _, n in base_unresolved]}, "groups": {}}
+	for name, paths in groups.items():
+		members = {}
+		for path in paths:
+			loaded, _ = graph.load(base + [path])
+			added = {p: e for p, e in loaded.items() if p not in base_loaded}
+			members[os.path.basename(path)] = _load_summary(graph, added)
+		loaded, unresolved = graph.load(base + list(paths))
+		added = {p: e for p, e in loaded.items() if p not in base_loaded}
+		report["groups"][name] = {
+			"total": _load_summary(graph, added),
+			"max": max(members.values(), key=lambda m: (m["libraries"], m["symbol_lookups"])) if members else None,
+			"members": members,
+			"unresolved": sorted({n for _, n in unresolved}),
+		}
+	return report
+
+
+def qt_entry_points(install_path, plugin_types, platform_plugin="libqxcb.so"):
+	"""QApplication (QtWidgets and the default platform plugin) and each bundled plugin type."""
+	install_path = Path(install_path)
+	base = sorted(glob.glob(str(install_path / "lib" / "libQt6Widgets.so.*")))[:1]
+	platform = install_path / "plugins" / "platforms" / platform_plugin
+	if platform.exists():
+		base.append(str(platform))
+	groups = {}
+	for plugin_type in plugin_types:
+		plugins = sorted(glob.glob(str(install_path / "plugins" / plugin_type / "*.so")))
+		if plugins:
+			groups[plugin_type] = plugins
+	return base, groups
+
+
+def analyze(roots, base, groups, system_dirs=None):
+	"""Full report on the dependency graph of `roots`."""
+	graph = DependencyGraph(roots, system_dirs)
+	objects = [p for p, e in graph.objects.items() if e is not None and _inside(p, graph.roots)]
+	return {
+		"roots": graph.roots,
+		"system_dirs": graph.system_dirs,
+		"objects": len(objects),
+		"unresolved": [{"object": path, "needed": name} for path, name in graph.unresolved()],
+		"external": graph.libraries_to_bundle(),
+		"duplicates": graph.duplicates(),
+		"conflicts": graph.conflicts(),
+		"entry_points": entry_point_costs(graph, base, groups),
+	}
+
+
+def print_summary(report):
+	print(f"\nELF dependencies of {len(report['roots'])} root(s): {report['objects']} objects")
+	for item in report["unresolved"]:
+		print(f"  Unresolved: {item['needed']} needed by {item['object']}")
+	for name, path in report["external"].items():
+		print(f"  Not bundled: {name} from {path}")
+	for name, targets in report["conflicts"].items():
+		print(f"  Conflict: {name} resolves to {', '.join(targets)}")
+	differing = [name for name, d in report["duplicates"].items() if not d["identical"]]
+	if report["duplicates"]:
+		print(f"  {len(report['duplicates'])} sonames present more than once, {len(differing)} with differing copies")
+	entry_points = report["entry_points"]
+	base = entry_points["base"]
+	print(f"  {'Entry point':36} {'Libraries':>9} {'System':>7} {'Lookups':>9}")
+	print(f"  {'QApplication':36} {base['libraries']:>9} {base['system']:>7} {base['symbol_lookups']:>9}")
+	for name, group in entry_points["groups"].items():
+		worst = group["max"]
+		print(f"  {'+ ' + name + ' (max)':36} {worst['libraries']:>9} {worst['system']:>7} {worst['symbol_lookups']:>9}")
+
+
+def dynamic_linking_report(roots):
+	"""Dynamic relocations, exported and imported symbols and GNU hash table size of every shared
+	object under `roots`, with totals, to compare builds made with and without --symbolic."""
+	roots = [os.path.realpath(r) for r in roots]
+	libraries = {}
+	for path in find_elf_files(roots):
+		elf = read_elf(path)
+		if elf is None or elf.soname is None and not path.endswith(".so"):
+			continue
+		name = os.path.relpath(path, next(r for r in roots if _inside(path, [r])))
+		libraries[name] = {
+			"relocations": elf.relocations(),
+			"exports": elf.exports,
+			"imports": elf.imports,
+			"gnu_hash": elf.gnu_hash,
+		}
+	totals = {"libraries": len(libraries), "relative": 0, "symbolic": 0, "plt": 0, "exports": 0, "imports": 0,
+		"gnu_hash_bytes": 0}
+	for library in libraries.values():
+		for kind in ("relative", "symbolic", "plt"):
+			totals[kind] += library["relocations"][kind]
+		totals["exports"] += library["exports"]
+		totals["imports"] += library["imports"]
+		totals["gnu_hash_bytes"] += (library["gnu_hash"] or {}).get("bytes", 0)
+	return {"roots": roots, "totals": totals, "libraries": libraries}
+
+
+def _linking_counts(library):
+	return {**{k: library["relocations"][k] for k in ("relative", "symbolic", "plt")},
+		"exports": library["exports"], "imports": library["imports"],
+		"gnu_hash_bytes": (library["gnu_hash"] or {}).get("bytes", 0)}
+
+
+def compare_dynamic_linking(old, new, limit=15):
+	"""Print the change in totals and for the libraries whose symbolic plus PLT relocations
+	changed the most."""
+	columns = ("symbolic", "plt", "relative", "exports", "imports", "gnu_hash_bytes")
+	print(f"{'Library':40}" + "".join(f"{c:>16}" for c in columns))
+	print(f"{'(total)':40}" + "".join(f"{old['totals'][c]:>8}{new['totals'][c] - old['totals'][c]:>+8}" for c in columns))
+	changes = []
+	for name, library in new["libraries"].items():
+		if name not in old["libraries"]:
+			continue
+		before, after = _linking_counts(old["libraries"][name]), _linking_counts(library)
+		delta = after["symbolic"] + after["plt"] - before["symbolic"] - before["plt"]
+		if any(before[c] != after[c] for c in columns):
+			changes.append((abs(delta), name, before, after))
+	for _, name, before, after in sorted(changes, reverse=True)[:limit]:
+		print(f"{name[-40:]:40}" + "".join(f"{before[c]:>8}{after[c] - before[c]:>+8}" for c in columns))
+
+
+def print_dynamic_linking(report):
+	totals = report["totals"]
+	print(f"\nDynamic linking of {totals['libraries']} libraries: {totals['symbolic']} symbolic, {totals['plt']} PLT and "
+		f"{totals['relative']} relative relocations, {totals['exports']} exported symbols, "
+		f"{totals['gnu_hash_bytes']} bytes of GNU hash tables")
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Resolve and report the ELF dependency graph of a Qt install")
+	parser.add_argument("install_path", help="Qt install prefix; its bundle/ and pyside/ directories are included")
+	parser.add_argument("--plugin-types", default="platforms,imageformats,wayland-decoration-client,"
+		"wayland-graphics-integration-client,wayland-shell-integration,platforminputcontexts",
+		help="comma separated plugin types to report as entry points")
+	parser.add_argument("--output", help="where to write the JSON report")
+	parser.add_argument("--dynamic-linking", metavar="OUTPUT",
+		help="also write relocation, exported symbol and GNU hash counts per library to OUTPUT")
+	parser.add_argument("--compare-dynamic-linking", metavar="REPORT",
+		help="earlier --dynamic-linking report to compare against")
+	args = parser.parse_args(argv)
+
+	base, groups = qt_entry_points(args.install_path, [t for t in args.plugin_types.split(",") if t])
+	report = analyze([args.install_path], base, groups)
+	print_summary(report)
+	if args.output:
+		with open(args.output, "w", encoding="utf-8") as f:
+			json.dump(report, f, indent=2)
+			f.write("\n")
+	if args.dynamic_linking or args.compare_dynamic_linking:
+		linking = dynamic_linking_report([args.install_path])
+		print_dynamic_linking(linking)
+		if args.dynamic_linking:
+			with open(args.dynamic_linking, "w", encoding="utf-8") as f:
+				json.dump(linking, f, indent=2)
+				f.write("\n")
+		if args.compare_dynamic_linking:
+			with open(args.compare_dynamic_linking, "r", encoding="utf-8") as f:
+				compare_dynamic_linking(json.load(f), linking)
+	return 1 if report["unresolved"] or report["external"] else 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# Extracts the zip artifacts written by build.py. add_tree_to_zip() stores symlinks as entries
+# with ZIP_SYMLINK_ATTR whose data is the link target, and the file mode in the upper bits of
+# external_attr. zipfile.extractall() writes links as small text files and drops the modes.
+# This reads the central directory once, restores links and modes, and decompresses the file
+# entries on a thread pool (zlib releases the GIL), optionally only those matching some prefixes.
+#
+# Usage: extract_artifact.py <archive> <destination> [--prefix <path>]...
+
+import argparse
+import concurrent.futures
+import os
+import shutil
+import stat
+import sys
+import time
+import zipfile
+
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def entry_mode(info):
+	"""The Unix mode stored in a zip entry, or 0 for archives written without one."""
+	return info.external_attr >> 16
+
+
+def is_symlink(info):
+	return stat.S_ISLNK(entry_mode(info))
+
+
+def _matches(name, prefixes):
+	return not prefixes or name.startswith(tuple(prefixes))
+
+
+def _target_path(destination, name):
+	# Refuse entries that would land outside the destination
+	parts = name.replace("\\", "/").split("/")
+	if name.startswith(("/", "\\")) or ".." in parts or (parts and ":" in parts[0]):
+		raise ValueError(f"Unsafe path in archive: {name}")
+	return os.path.join(destination, *[p for p in parts if p])
+
+
+def _check_link(destination, path, target):
+	resolved = os.path.normpath(os.path.join(os.path.dirname(path), target))
+	if os.path.isabs(target) or os.path.commonpath([destination, resolved]) != destination:
+		raise ValueError(f"Symlink {path} points outside of {destination}: {target}")
+
+
+def _remove_existing(path):
+	if os.path.islink(path) or os.path.isfile(path):
+		os.remove(path)
+	elif os.path.isdir(path):
+		shutil.rmtree(path)
+
+
+def _extract_file(zf, info, path):
+	if os.path.islink(path):
+		# Never write through a link left over from an earlier extraction
+		os.remove(path)
+	with zf.open(info) as src, open(path, "wb") as dst:
+		shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+	mode = entry_mode(info) & 0o7777
+	if mode:
+		os.chmod(path, mode)
+	return info.file_size
+
+
+def extract(archive, destination, prefixes=(), jobs=None):
+	"""Extract `archive` into `destination`, or only the entries whose archive path starts
+	with one of `prefixes`, like "libclang/lib/libclang". Prefixes are plain strings, a
+	directory needs a trailing "/". Returns what was extracted."""
+	start = time.monotonic()
+	destination = os.path.abspath(destination)
+	summary = {"files": 0, "symlinks": 0, "directories": 0, "bytes": 0}
+	with zipfile.ZipFile(archive) as zf:
+		directories, files, links = [], [], []
+		for info in zf.infolist():
+			if not _matches(info.filename, prefixes):
+				continue
+			path = _target_path(destination, info.filename)
+			if info.is_dir():
+				directories.append(path)
+			elif is_symlink(info):
+				links.append((info, path))
+			else:
+				files.append((info, path))
+				directories.append(os.path.dirname(path))
+
+		for path in sorted(set(directories)):
+			os.makedirs(path, exist_ok=True)
+		summary["directories"] = len(set(directories))
+
+		# ZipFile serializes the reads of its shared file handle, decompression runs in parallel
+		with concurrent.futures.ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+			futures = [executor.submit(_extract_file, zf, info, path) for info, path in files]
+			for future in futures:
+				summary["bytes"] += future.result()
+		summary["files"] = len(files)
+
+		# Links last, so a link to a directory never redirects the files extracted above
+		for info, path in links:
+			target = zf.read(info).decode("utf-8")
+			_check_link(destination, path, target)
+			os.makedirs(os.path.dirname(path), exist_ok=True)
+			_remove_existing(path)
+			os.symlink(target, path)
+		summary["symlinks"] = len(links)
+	summary["seconds"] = round(time.monotonic() - start, 3)
+	return summary
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Extract a build.py zip artifact, restoring symlinks and file modes")
+	parser.add_argument("archive", help="zip archive to extract")
+	parser.add_argument("destination", help="directory to extract into")
+	parser.add_argument("--prefix", action="append", default=[],
+		help="only extract entries whose archive path starts with this string, end it with / to match a directory only (repeatable)")
+	parser.add_argument("-j", "--jobs", type=int, help="decompression threads (defaults to the CPU count)")
+	args = parser.parse_args(argv)
+
+	summary = extract(args.archive, args.destination, args.prefix, args.jobs)
+	print(f"Extracted {summary['files']} files ({summary['bytes'] / (1024 * 1024):.1f} MB) and "
+		f"{summary['symlinks']} symlinks in {summary['seconds']:.1f} s")
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
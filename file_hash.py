@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+# SHA-256 of files, shared by the step cache, the libclang cache, the ELF dependency report
+# and the local signer. Standard library only, so importing it stays cheap for the signing
+# subprocesses that run with -S.
+
+import hashlib
+
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path):
+	"""Hex SHA-256 of the contents of `path`, read in chunks."""
+	digest = hashlib.sha256()
+	with open(path, "rb") as f:
+		for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+			digest.update(chunk)
+	return digest.hexdigest()
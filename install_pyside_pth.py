@@ -1,5 +1,6 @@
 import sys
 import os
+import shutil
 from site import check_enableusersite
 from pathlib import Path
 
@@ -11,8 +12,15 @@ except ImportError:
 	getsitepackages = lambda: get_path('purelib')
 	getusersitepackages = getsitepackages
 
+# With --index, PySide is imported through a meta path finder that only handles PySide's
+# own top-level modules, instead of adding site-packages to sys.path for every import. The
+# finder runs after the sys.path search, so a PySide6 installed elsewhere on sys.path still
+# takes precedence, as with the plain .pth file.
+use_index = "--index" in sys.argv[1:]
+
 base_dir = Path(__file__).resolve().parent
-target_path = base_dir / "pyside" / "site-packages"
+pyside_path = base_dir / "pyside"
+target_path = pyside_path / "site-packages"
 
 if (os.path.isdir(target_path)):
 	print("Found install folder of {}".format(target_path))
@@ -29,7 +37,28 @@ else:
 	sys.exit(1)
 
 pyside_pth_path = os.path.join(install_path, f'pyside6.pth')
+finder_path = os.path.join(install_path, 'pyside6_index_finder.py')
+if use_index:
+	if not os.path.isfile(pyside_path / "pyside_index_finder.py"):
+		print("Failed to find the module finder at {}".format(pyside_path / "pyside_index_finder.py"))
+		sys.exit(1)
+	if not os.path.isfile(pyside_path / "pyside_module_index.json"):
+		# Builds made before the index was generated
+		sys.path.insert(0, str(pyside_path))
+		import pyside_index_finder
+		try:
+			pyside_index_finder.write_index(str(pyside_path))
+		except OSError as e:
+			print("Failed to write the module index ({}), installing the plain sys.path entry instead".format(e))
+			use_index = False
+if use_index:
+	shutil.copy(pyside_path / "pyside_index_finder.py", finder_path)
+	pth_line = "import pyside6_index_finder; pyside6_index_finder.install({!r})".format(str(pyside_path))
+else:
+	if os.path.exists(finder_path):
+		os.remove(finder_path)
+	pth_line = str(target_path)
 with open(pyside_pth_path, 'wb') as pth_file:
-	pth_file.write((str(target_path) + "\n").encode('charmap'))
+	pth_file.write((pth_line + "\n").encode('charmap'))
 
 print("PySide installed using {}".format(pyside_pth_path))
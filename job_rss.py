@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# Compiler and linker launcher that records the peak RSS of each job for build_jobs.py.
+# Usage: job_rss.py <log file> <compile|link> <command...>
+# Runs once per compile, so keep imports to the bare minimum.
+
+import os
+import sys
+
+
+def main():
+	log_path, job_class, cmd = sys.argv[1], sys.argv[2], sys.argv[3:]
+	pid = os.fork()
+	if pid == 0:
+		try:
+			os.execvp(cmd[0], cmd)
+		except OSError as e:
+			sys.stderr.write(f"job_rss.py: failed to run {cmd[0]}: {e}\n")
+			os._exit(127)
+	_, status, usage = os.wait4(pid, 0)
+	# ru_maxrss is in bytes on macOS and kilobytes elsewhere
+	peak = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+	try:
+		fd = os.open(log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+		try:
+			# A single short write with O_APPEND is atomic, so parallel jobs do not interleave
+			os.write(fd, f"{job_class} {peak}\n".encode())
+		finally:
+			os.close(fd)
+	except OSError:
+		pass
+	if os.WIFSIGNALED(status):
+		os.kill(os.getpid(), os.WTERMSIG(status))
+	return os.WEXITSTATUS(status)
+
+
+if __name__ == "__main__":
+	sys.exit(main())
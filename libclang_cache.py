@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# Extracts the libclang artifact once per archive instead of on every build. Entries are keyed
+# by the SHA-256 of the archive and hold only what the PySide build uses: the libclang library,
+# the clang-c headers, the clang builtin headers the shiboken generator parses with, and the
+# CMake packages shiboken finds clang with (plus the files those packages check for). Each
+# entry has a manifest of its files, checked before the entry is reused.
+
+import argparse
+import concurrent.futures
+import json
+import os
+import re
+import shutil
+import sys
+import time
+import zipfile
+from pathlib import Path
+
+import extract_artifact
+from file_hash import file_digest
+
+
+# Bump when the selection or the layout of an entry changes
+CACHE_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+# Paths below the libclang/<version>/ root of the archive
+EXTRACT_PREFIXES = ("lib/libclang", "bin/libclang", "include/clang-c/", "lib/clang/", "lib/cmake/")
+_IMPORT_FILE_RE = re.compile(r'"\$\{_IMPORT_PREFIX\}/([^"]+)"')
+
+
+def selected_prefixes(zf, root):
+	"""Archive paths to extract: EXTRACT_PREFIXES below `root`, and every file the imported
+	targets of the CMake packages check for, which find_package() fails without."""
+	prefixes = [root + p for p in EXTRACT_PREFIXES]
+	for name in zf.namelist():
+		if not name.startswith(root + "lib/cmake/") or not name.endswith(".cmake"):
+			continue
+		text = zf.read(name).decode("utf-8", "replace")
+		if "_IMPORT_CHECK_FILES_FOR_" not in text and "_cmake_import_check_files_for_" not in text:
+			continue
+		prefixes += [root + path for path in _IMPORT_FILE_RE.findall(text)]
+	return sorted(set(prefixes))
+
+
+def build_manifest(entry):
+	files = {}
+	symlinks = {}
+	paths = []
+	for dirpath, _, names in os.walk(entry):
+		for name in names:
+			path = os.path.join(dirpath, name)
+			rel = os.path.relpath(path, entry).replace(os.sep, "/")
+			if rel == MANIFEST_NAME:
+				continue
+			if os.path.islink(path):
+				symlinks[rel] = os.readlink(path)
+			else:
+				paths.append((rel, path))
+	with concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+		digests = executor.map(file_digest, [path for _, path in paths])
+		for (rel, path), digest in zip(paths, digests):
+			files[rel] = {"size": os.path.getsize(path), "sha256": digest}
+	return {"files": files, "symlinks": symlinks}
+
+
+def verify_entry(entry, archive_digest):
+	"""Problems with a cached entry, an empty list when it can be used as is."""
+	try:
+		with open(entry / MANIFEST_NAME, "r", encoding="utf-8") as f:
+			manifest = json.load(f)
+	except (OSError, ValueError):
+		return ["no readable manifest"]
+	if manifest.get("version") != CACHE_VERSION or manifest.get("archive_sha256") != archive_digest:
+		return ["manifest of a different archive or cache version"]
+	problems = []
+	for rel, target in manifest["symlinks"].items():
+		path = entry / rel
+		if not path.is_symlink() or os.readlink(path) != target:
+			problems.append(f"{rel}: symlink changed")
+	expected = list(manifest["files"].items())
+	for rel, info in expected:
+		path = entry / rel
+		if path.is_symlink() or not path.is_file() or path.stat().st_size != info["size"]:
+			problems.append(f"{rel}: missing or size changed")
+	if problems:
+		return problems
+	with concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+		digests = executor.map(file_digest, [entry / rel for rel, _ in expected])
+		for (rel, info), digest in zip(expected, digests):
+			if digest != info["sha256"]:
+				problems.append(f"{rel}: contents changed")
+	return problems
+
+
+def prepare(archive, cache_dir, llvm_version):
+	"""Return (install_dir, report) for the libclang in `archive`, extracting it into
+	`cache_dir` unless a verified entry for the same archive exists. `install_dir` is what
+	LLVM_INSTALL_DIR should point at, with the `llvm_version` directory inside it."""
+	start = time.monotonic()
+	cache_dir = Path(cache_dir)
+	digest = file_digest(archive)
+	entry = cache_dir / f"v{CACHE_VERSION}-{digest[:16]}"
+	report = {"archive": str(archive), "archive_sha256": digest, "entry": str(entry)}
+
+	if entry.exists():
+		problems = verify_entry(entry, digest)
+		if not problems:
+			report.update(cached=True, seconds=round(time.monotonic() - start, 3))
+			return entry / "libclang", report
+		print(f"Discarding cached libclang in {entry}: {'; '.join(problems[:5])}")
+		shutil.rmtree(entry)
+		report["discarded"] = problems[:20]
+
+	root = f"libclang/{llvm_version}/"
+	with zipfile.ZipFile(archive) as zf:
+		prefixes = selected_prefixes(zf, root)
+	# Extract next to the final location and rename, so an interrupted run leaves no entry
+	staging = cache_dir / f"{entry.name}.{os.getpid()}.tmp"
+	if staging.exists():
+		shutil.rmtree(staging)
+	summary = extract_artifact.extract(archive, staging, prefixes)
+	if not summary["files"]:
+		shutil.rmtree(staging)
+		raise RuntimeError(f"{archive} has no libclang below {root}")
+	manifest = {"version": CACHE_VERSION, "archive": os.path.basename(archive), "archive_sha256": digest,
+		"prefixes": prefixes, **build_manifest(staging)}
+	with open(staging / MANIFEST_NAME, "w", encoding="utf-8") as f:
+		json.dump(manifest, f, indent=2, sort_keys=True)
+		f.write("\n")
+	os.replace(staging, entry)
+
+	# Entries of earlier archives are never used again
+	for old in cache_dir.glob("v*-*"):
+		if old != entry and old.is_dir() and not old.name.endswith(".tmp"):
+			shutil.rmtree(old, ignore_errors=True)
+	report.update(cached=False, files=summary["files"], symlinks=summary["symlinks"], bytes=summary["bytes"],
+		seconds=round(time.monotonic() - start, 3))
+	return entry / "libclang", report
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Extract the parts of a libclang artifact PySide needs, cached by archive hash")
+	parser.add_argument("archive", help="libclang_<platform>_<version>.zip")
+	parser.add_argument("--llvm-version", required=True, help="LLVM version directory inside the archive")
+	parser.add_argument("--cache-dir", default="build/libclang-cache", help="where to keep the extracted entries")
+	args = parser.parse_args(argv)
+
+	install_dir, report = prepare(args.archive, args.cache_dir, args.llvm_version)
+	state = "Reused" if report["cached"] else "Extracted"
+	print(f"{state} libclang in {install_dir} ({report['seconds']:.1f} s)")
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+
+import argparse
+import bisect
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+
+TOP_COUNT = 25
+PARALLELISM_BUCKETS = 600
+_LINK_RE = re.compile(r"(\.so(\.[0-9]+)*|\.dylib|\.dll|\.exe|\.pyd|\.bundle)$")
+_GRAPH_NODE_RE = re.compile(r'^"(0x[0-9a-f]+)" \[label="([^"]*)"(, shape=ellipse)?\]$')
+_GRAPH_EDGE_RE = re.compile(r'^"(0x[0-9a-f]+)" -> "(0x[0-9a-f]+)"(?: \[label=" ([^"]*)"\])?')
+_SOURCE_SUFFIXES = (".c", ".cc", ".cpp", ".cxx", ".m", ".mm")
+# Objects CMake builds from generated unity sources (unity_0_cxx.cxx.o) and precompiled headers
+_UNITY_RE = re.compile(r"(^|/)unity_[0-9]+_(c|cxx|objc|objcxx)\.[a-z]+\.(o|obj)$")
+_PCH_RE = re.compile(r"(^|/)cmake_pch[^/]*\.(gch|pch|o|obj)$")
+
+
+def classify_rule(rule):
+	"""Classify an edge by the CMake-generated ninja rule name, e.g. CXX_COMPILER__Core_."""
+	rule = rule.upper()
+	if "STATIC_LIBRARY_LINKER" in rule:
+		return "archive"
+	if "LINKER" in rule:
+		return "link"
+	if "COMPILER" in rule:
+		return "compile"
+	if "AUTOGEN" in rule or "CUSTOM_COMMAND" in rule:
+		return "codegen"
+	return None
+
+
+def classify_output(output):
+	name = os.path.basename(output)
+	if name.endswith((".o", ".obj")):
+		return "compile"
+	if name.endswith((".a", ".lib")):
+		return "archive"
+	if _LINK_RE.search(name) or "/bin/" in f"/{output}" or ".framework/" in output:
+		return "link"
+	if name.startswith(("moc_", "qrc_", "ui_")) or name.endswith((".moc", "_autogen", "timestamp")):
+		return "codegen"
+	return "other"
+
+
+def parse_ninja_log(path):
+	"""Return one entry per edge of the last ninja invocation in a .ninja_log file.
+
+	Each invocation appends its edges in completion order with its clock restarting at
+	zero, so the last one starts after the last entry whose end time goes backwards.
+	Earlier entries are left out: when ninja recompacts the log it rewrites the surviving
+	entries of all earlier invocations in hash order, and their runs cannot be told apart.
+	Edges with several outputs share a command hash and are merged.
+	"""
+	last_run = []
+	last_end = -1
+	with open(path, "r", encoding="utf-8", errors="replace") as f:
+		header = f.readline()
+		if not header.startswith("# ninja log v"):
+			raise ValueError(f"{path} is not a ninja log")
+		for line in f:
+			fields = line.rstrip("\n").split("\t")
+			if len(fields) < 5:
+				continue
+			start, end = int(fields[0]), int(fields[1])
+			if end < last_end:
+				last_run = []
+			last_end = end
+			last_run.append((start, end, fields[3], fields[4]))
+	edges = []
+	merged = {}
+	for start, end, output, command_hash in last_run:
+		key = (start, end, command_hash)
+		if key in merged:
+			merged[key]["outputs"].append(output)
+			continue
+		edge = {
+			"start": start,
+			"end": end,
+			"duration": end - start,
+			"outputs": [output],
+			"kind": classify_output(output),
+		}
+		merged[key] = edge
+		edges.append(edge)
+	for edge in edges:
+		edge["output"] = min(edge["outputs"], key=len)
+	return edges
+
+
+def _graph_dependencies(build_dir):
+	"""Return (deps, rules) from `ninja -t graph`: the files each file directly depends
+	on, and the rule that produces each output.
+
+	Returns None when ninja is not available or the graph cannot be produced.
+	"""
+	ninja = shutil.which("ninja")
+	if ninja is None:
+		return None
+	try:
+		proc = subprocess.run([ninja, "-C", str(build_dir), "-t", "graph"], stdout=subprocess.PIPE,
+			stderr=subprocess.DEVNULL, text=True, timeout=300)
+	except (OSError, subprocess.TimeoutExpired):
+		return None
+	if proc.returncode != 0:
+		return None
+
+	labels = {}
+	edge_nodes = {}
+	inputs = {}
+	rules = {}
+	for line in proc.stdout.splitlines():
+		line = line.strip()
+		node = _GRAPH_NODE_RE.match(line)
+		if node:
+			if node.group(3):
+				edge_nodes[node.group(1)] = node.group(2)
+			else:
+				labels[node.group(1)] = node.group(2)
+			continue
+		arrow = _GRAPH_EDGE_RE.match(line)
+		if arrow:
+			inputs.setdefault(arrow.group(2), []).append(arrow.group(1))
+			if arrow.group(3):
+				rules[arrow.group(2)] = arrow.group(3)
+
+	# Resolve every file node to the set of file nodes it needs, looking through edge nodes
+	deps = {}
+	for node_id, label in labels.items():
+		found = set()
+		for source in inputs.get(node_id, []):
+			if source in edge_nodes:
+				found.update(s for s in inputs.get(source, []) if s in labels)
+				rules[node_id] = edge_nodes[source]
+			elif source in labels:
+				found.add(source)
+		deps[label] = [labels[s] for s in found]
+	return deps, {labels[n]: rule for n, rule in rules.items() if n in labels}
+
+
+def _critical_path_from_graph(edges, deps):
+	by_output = {}
+	for edge in edges:
+		for output in edge["outputs"]:
+			by_output[output] = edge
+
+	# Longest path over edges that were actually run, walking through nodes that were not
+	# (sources, phony aliases) without adding time for them.
+	memo = {}
+
+	def resolve(root):
+		# Post-order walk with an explicit stack, dependency chains can be thousands of edges
+		# long. A dependency already on the stack (a cycle) counts as nothing.
+		visiting = {root}
+		stack = [[root, iter(deps.get(root, [])), (0, None)]]
+		while stack:
+			frame = stack[-1]
+			output, pending, best = frame
+			for dep in pending:
+				if dep in memo:
+					candidate = memo[dep]
+				elif dep in visiting:
+					candidate = (0, None)
+				else:
+					visiting.add(dep)
+					stack.append([dep, iter(deps.get(dep, [])), (0, None)])
+					break
+				if candidate[0] > best[0]:
+					best = candidate
+			else:
+				stack.pop()
+				visiting.discard(output)
+				edge = by_output.get(output)
+				result = (best[0] + edge["duration"], (edge, best[1])) if edge is not None else best
+				memo[output] = result
+				if stack and result[0] > stack[-1][2][0]:
+					stack[-1][2] = result
+				continue
+			frame[2] = best
+		return memo[root]
+
+	best = (0, None)
+	for output in by_output:
+		candidate = memo[output] if output in memo else resolve(output)
+		if candidate[0] > best[0]:
+			best = candidate
+	path = []
+	chain = best[1]
+	while chain is not None:
+		path.append(chain[0])
+		chain = chain[1]
+	path.reverse()
+	return path
+
+
+def _critical_path_from_timeline(edges):
+	# Without a dependency graph, walk back from the last edge to finish, each time picking
+	# the edge that finished last before the current one started. This approximates the
+	# chain of work that kept the build from finishing earlier.
+	if not edges:
+		return []
+	ordered = sorted(edges, key=lambda e: e["end"])
+	ends = [e["end"] for e in ordered]
+	current = ordered[-1]
+	path = [current]
+	while True:
+		index = bisect.bisect_right(ends, current["start"]) - 1
+		if index < 0 or ordered[index] is current:
+			break
+		current = ordered[index]
+		path.append(current)
+	path.reverse()
+	return path
+
+
+def _parallelism(edges, bucket_count=PARALLELISM_BUCKETS):
+	if not edges:
+		return {"average": 0, "bucket_ms": 0, "samples": []}
+	begin = min(e["start"] for e in edges)
+	finish = max(e["end"] for e in edges)
+	span = max(finish - begin, 1)
+	bucket_ms = max(1, -(-span // bucket_count))
+	busy = [0] * (span // bucket_ms + 1)
+	for edge in edges:
+		start = edge["start"] - begin
+		end = edge["end"] - begin
+		first = start // bucket_ms
+		last = min((max(end - 1, start)) // bucket_ms, len(busy) - 1)
+		for i in range(first, last + 1):
+			overlap = min(end, (i + 1) * bucket_ms) - max(start, i * bucket_ms)
+			busy[i] += max(overlap, 0)
+	return {
+		"average": round(sum(e["duration"] for e in edges) / span, 2),
+		"bucket_ms": bucket_ms,
+		"samples": [round(b / bucket_ms, 2) for b in busy],
+	}
+
+
+def _header_usage(build_dir, top_count=TOP_COUNT):
+	# .ninja_deps records the headers each translation unit included, which shows the
+	# headers that a precompiled header would save the most parsing for.
+	ninja = shutil.which("ninja")
+	if ninja is None or not (Path(build_dir) / ".ninja_deps").exists():
+		return None
+	try:
+		proc = subprocess.run([ninja, "-C", str(build_dir), "-t", "deps"], stdout=subprocess.PIPE,
+			stderr=subprocess.DEVNULL, text=True, timeout=300)
+	except (OSError, subprocess.TimeoutExpired):
+		return None
+	if proc.returncode != 0:
+		return None
+	counts = {}
+	units = 0
+	for line in proc.stdout.splitlines():
+		if not line.strip():
+			continue
+		if line.startswith(" "):
+			header = line.strip()
+			if header.endswith(_SOURCE_SUFFIXES):
+				continue
+			counts[header] = counts.get(header, 0) + 1
+		else:
+			units += 1
+	top = sorted(counts.items(), key=lambda item: item[1], reverse=True)[:top_count]
+	return {"translation_units": units, "most_included": [{"header": h, "count": c} for h, c in top]}
+
+
+def _compile_modes(edges):
+	"""Count the unity and precompiled header edges, which shows whether --unity and --pch
+	took effect and what the compiles cost with them."""
+	compiles = [e for e in edges if e["kind"] == "compile"]
+	unity = [e for e in compiles if _UNITY_RE.search(e["output"])]
+	pch = [e for e in edges if _PCH_RE.search(e["output"])]
+	return {
+		"compile_count": len(compiles),
+		"compile_ms": sum(e["duration"] for e in compiles),
+		"unity_count": len(unity),
+		"unity_ms": sum(e["duration"] for e in unity),
+		"pch_count": len(pch),
+		"pch_ms": sum(e["duration"] for e in pch),
+	}
+
+
+def _edge_summary(edge):
+	return {"output": edge["output"], "kind": edge["kind"], "start_ms": edge["start"], "duration_ms": edge["duration"]}
+
+
+def analyze(build_dir, top_count=TOP_COUNT):
+	build_dir = Path(build_dir)
+	edges = parse_ninja_log(build_dir / ".ninja_log")
+	graph = _graph_dependencies(build_dir)
+	if graph is not None:
+		deps, rules = graph
+		for edge in edges:
+			rule = rules.get(edge["output"])
+			edge["kind"] = (classify_rule(rule) if rule else None) or edge["kind"]
+		critical_path = _critical_path_from_graph(edges, deps)
+		method = "graph"
+	else:
+		critical_path = _critical_path_from_timeline(edges)
+		method = "timeline"
+
+	by_kind = {}
+	for edge in edges:
+		kind = by_kind.setdefault(edge["kind"], {"count": 0, "total_ms": 0})
+		kind["count"] += 1
+		kind["total_ms"] += edge["duration"]
+
+	def slowest(kind):
+		matching = [e for e in edges if e["kind"] == kind]
+		return [_edge_summary(e) for e in sorted(matching, key=lambda e: e["duration"], reverse=True)[:top_count]]
+
+	links = sorted((e for e in edges if e["kind"] == "link"), key=lambda e: e["duration"], reverse=True)
+	wall = (max(e["end"] for e in edges) - min(e["start"] for e in edges)) if edges else 0
+	return {
+		"build_dir": str(build_dir),
+		"edge_count": len(edges),
+		"wall_ms": wall,
+		"by_kind": by_kind,
+		"critical_path": {
+			"method": method,
+			"total_ms": sum(e["duration"] for e in critical_path),
+			"edges": [_edge_summary(e) for e in critical_path],
+		},
+		"slowest_compiles": slowest("compile"),
+		"slowest_links": slowest("link"),
+		"slowest_archives": slowest("archive"),
+		"links": {
+			"count": len(links),
+			"total_ms": sum(e["duration"] for e in links),
+			"max_ms": links[0]["duration"] if links else 0,
+			"edges": [_edge_summary(e) for e in links],
+		},
+		"compile_modes": _compile_modes(edges),
+		"parallelism": _parallelism(edges),
+		"headers": _header_usage(build_dir, top_count),
+	}, edges
+
+
+def chrome_trace(edges, pid=0, process_name="ninja"):
+	"""Return Chrome trace events (chrome://tracing, Perfetto) for the edges.
+
+	Edges are packed into the lowest free lane so each lane reads like one ninja job slot.
+	"""
+	events = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": process_name}}]
+	lanes = []
+	for edge in sorted(edges, key=lambda e: (e["start"], -e["duration"])):
+		for lane, free_at in enumerate(lanes):
+			if free_at <= edge["start"]:
+				lanes[lane] = edge["end"]
+				break
+		else:
+			lane = len(lanes)
+			lanes.append(edge["end"])
+		events.append({
+			"name": edge["output"],
+			"cat": edge["kind"],
+			"ph": "X",
+			"pid": pid,
+			"tid": lane,
+			"ts": edge["start"] * 1000,
+			"dur": edge["duration"] * 1000,
+		})
+	return events
+
+
+def write_reports(build_dir, output_dir, name, pid=0):
+	"""Analyze the ninja log in `build_dir` and write ninja-<name>.json and
+	ninja-<name>.trace.json to `output_dir`. Returns the report, or None without a log."""
+	if not (Path(build_dir) / ".ninja_log").exists():
+		print(f"No ninja log found in {build_dir}")
+		return None
+	report, edges = analyze(build_dir)
+	report["name"] = name
+	output_dir = Path(output_dir)
+	output_dir.mkdir(parents=True, exist_ok=True)
+	with (output_dir / f"ninja-{name}.json").open("w", encoding="utf-8") as f:
+		json.dump(report, f, indent=2)
+		f.write("\n")
+	with (output_dir / f"ninja-{name}.trace.json").open("w", encoding="utf-8") as f:
+		json.dump({"traceEvents": chrome_trace(edges, pid, name), "displayTimeUnit": "ms"}, f)
+	print_summary(report)
+	return report
+
+
+def print_summary(report, count=10):
+	print(f"\nNinja build analysis for {report.get('name', report['build_dir'])}:")
+	print(f"  {report['edge_count']} edges, {report['wall_ms'] / 1000:.1f}s wall, "
+		f"average parallelism {report['parallelism']['average']}")
+	critical = report["critical_path"]
+	print(f"  Critical path ({critical['method']}): {len(critical['edges'])} edges, {critical['total_ms'] / 1000:.1f}s")
+	modes = report["compile_modes"]
+	print(f"  Compiles: {modes['compile_count']}, {modes['compile_ms'] / 1000:.1f}s total, "
+		f"{modes['unity_count']} unity, {modes['pch_count']} precompiled headers")
+	links = report["links"]
+	print(f"  Links: {links['count']}, {links['total_ms'] / 1000:.1f}s total, longest {links['max_ms'] / 1000:.1f}s")
+	for title, key in (("Slowest compiles", "slowest_compiles"), ("Slowest links", "slowest_links")):
+		print(f"  {title}:")
+		for edge in report[key][:count]:
+			print(f"    {edge['duration_ms'] / 1000:8.1f}s  {edge['output']}")
+
+
+def compare_links(old_report, new_report, count=20):
+	"""Print the change in duration of each link present in both ninja reports, for example
+	before and after switching linkers. Returns (old total ms, new total ms) of those links."""
+	old_links = {e["output"]: e["duration_ms"] for e in old_report.get("links", {}).get("edges", [])}
+	new_links = {e["output"]: e["duration_ms"] for e in new_report.get("links", {}).get("edges", [])}
+	common = [output for output in new_links if output in old_links]
+	old_total = sum(old_links[o] for o in common)
+	new_total = sum(new_links[o] for o in common)
+	print(f"\n{'Link':60} {'Old':>9} {'New':>9} {'%':>8}")
+	for output in sorted(common, key=lambda o: old_links[o], reverse=True)[:count]:
+		old, new = old_links[output], new_links[output]
+		percent = (new - old) * 100.0 / old if old else 0.0
+		print(f"{output[-60:]:60} {old / 1000:>8.1f}s {new / 1000:>8.1f}s {percent:>+8.1f}")
+	percent = (new_total - old_total) * 100.0 / old_total if old_total else 0.0
+	print(f"{f'All {len(common)} links':60} {old_total / 1000:>8.1f}s {new_total / 1000:>8.1f}s {percent:>+8.1f}")
+	return old_total, new_total
+
+
+def compare_builds(old_report, new_report):
+	"""Print wall time, critical path, and compile and link totals of two ninja reports, for
+	example before and after switching --pch or --unity."""
+	rows = [
+		("Wall", old_report["wall_ms"], new_report["wall_ms"]),
+		("Critical path", old_report["critical_path"]["total_ms"], new_report["critical_path"]["total_ms"]),
+	]
+	for kind in ("compile", "link", "archive", "codegen"):
+		old = old_report["by_kind"].get(kind, {}).get("total_ms", 0)
+		new = new_report["by_kind"].get(kind, {}).get("total_ms", 0)
+		rows.append((f"All {kind} edges", old, new))
+	print(f"\n{'Build':60} {'Old':>9} {'New':>9} {'%':>8}")
+	for title, old, new in rows:
+		percent = (new - old) * 100.0 / old if old else 0.0
+		print(f"{title:60} {old / 1000:>8.1f}s {new / 1000:>8.1f}s {percent:>+8.1f}")
+	old_modes = old_report.get("compile_modes", {})
+	new_modes = new_report.get("compile_modes", {})
+	for key, title in (("compile_count", "Compile edges"), ("unity_count", "Unity compile edges"), ("pch_count", "Precompiled header edges")):
+		print(f"{title:60} {old_modes.get(key, 0):>9} {new_modes.get(key, 0):>9}")
+	return old_report["wall_ms"], new_report["wall_ms"]
+
+
+def find_build_dirs(root):
+	"""Return directories under `root` that contain a ninja log, e.g. each CMake project
+	that PySide's setup.py builds."""
+	return sorted(p.parent for p in Path(root).glob("**/.ninja_log"))
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Summarize a ninja build from its .ninja_log")
+	parser.add_argument("build_dir", help="ninja build directory")
+	parser.add_argument("--output-dir", default=".", help="where to write the JSON report and Chrome trace")
+	parser.add_argument("--name", default="build", help="name used in the output file names")
+	parser.add_argument("--compare-links", help="earlier ninja-<name>.json report to compare link times against")
+	parser.add_argument("--compare", help="earlier ninja-<name>.json report to compare build and compile times against")
+	args = parser.parse_args(argv)
+	report = write_reports(args.build_dir, args.output_dir, args.name)
+	if report is None:
+		return 1
+	if args.compare_links:
+		with open(args.compare_links, "r", encoding="utf-8") as f:
+			compare_links(json.load(f), report)
+	if args.compare:
+		with open(args.compare, "r", encoding="utf-8") as f:
+			compare_builds(json.load(f), report)
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
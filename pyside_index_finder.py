@@ -0,0 +1,86 @@
+# Meta path finder for a PySide build, installed by install_pyside_pth.py --index.
+#
+# Instead of appending pyside/site-packages to sys.path, which makes every import in the
+# interpreter look in one more directory, the finder answers only for the top-level names
+# listed in pyside_module_index.json (PySide6, shiboken6, ...) and returns None for all
+# other imports after a single dict lookup. Submodules are found through the package's
+# __path__ as usual. The index is generated at build time by write_index().
+
+import json
+import os
+import sys
+
+INDEX_FILE_NAME = "pyside_module_index.json"
+INDEX_VERSION = 1
+_EXTENSION_SUFFIXES = (".so", ".pyd")
+
+
+def build_index(site_packages):
+	modules = []
+	distributions = []
+	for entry in sorted(os.listdir(site_packages)):
+		path = os.path.join(site_packages, entry)
+		if entry.endswith((".dist-info", ".egg-info")):
+			distributions.append(entry.split("-")[0].lower().replace("_", "-"))
+		elif os.path.isdir(path):
+			if entry.isidentifier() and os.path.isfile(os.path.join(path, "__init__.py")):
+				modules.append(entry)
+		elif entry.endswith(".py"):
+			modules.append(entry[:-3])
+		elif entry.endswith(_EXTENSION_SUFFIXES):
+			modules.append(entry.split(".")[0])
+	return {"version": INDEX_VERSION, "root": "site-packages", "modules": sorted(set(modules)),
+		"distributions": sorted(set(distributions))}
+
+
+def write_index(pyside_path):
+	"""Write the module index for pyside_path/site-packages next to this finder."""
+	index = build_index(os.path.join(pyside_path, "site-packages"))
+	with open(os.path.join(pyside_path, INDEX_FILE_NAME), "w", encoding="utf-8") as f:
+		json.dump(index, f, indent=2)
+		f.write("\n")
+	return index
+
+
+class PySideIndexFinder:
+	def __init__(self, root, modules, distributions=()):
+		self._root = root
+		self._modules = frozenset(modules)
+		self._distributions = frozenset(distributions)
+
+	def find_spec(self, fullname, path=None, target=None):
+		if path is not None or fullname not in self._modules:
+			return None
+		from importlib.machinery import PathFinder
+		return PathFinder.find_spec(fullname, [self._root])
+
+	def invalidate_caches(self):
+		pass
+
+	def find_distributions(self, context=None):
+		# Keeps importlib.metadata.version("PySide6") working without the sys.path entry
+		from importlib.metadata import DistributionFinder, MetadataPathFinder
+		if context is None:
+			context = DistributionFinder.Context()
+		name = context.name
+		if name is not None and name.lower().replace("_", "-") not in self._distributions:
+			return iter(())
+		return MetadataPathFinder.find_distributions(DistributionFinder.Context(name=name, path=[self._root]))
+
+
+def install(pyside_path):
+	"""Register the finder for the PySide build at `pyside_path`. Called from pyside6.pth."""
+	try:
+		with open(os.path.join(pyside_path, INDEX_FILE_NAME), "r", encoding="utf-8") as f:
+			index = json.load(f)
+	except (OSError, ValueError):
+		index = None
+	if index is None or index.get("version") != INDEX_VERSION:
+		# Fall back to the plain sys.path entry rather than breaking imports
+		sys.path.append(os.path.join(pyside_path, "site-packages"))
+		return None
+	finder = PySideIndexFinder(os.path.join(pyside_path, index["root"]), index["modules"], index.get("distributions", ()))
+	# After the standard path finder, so a PySide6 found on sys.path still wins, as it did
+	# with the sys.path entry appended by the plain .pth file
+	sys.meta_path.append(finder)
+	return finder
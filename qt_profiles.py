@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# Feature trimming profiles for the Qt build. A profile in target_qt6_version.qt_feature_profiles
+# declares the modules and optional features it needs; everything else in qt_modules is passed
+# to configure as -skip, and every other optional feature as -no-feature-*. Profiles are checked
+# against what the build ships (pyside_modules and the bundled plugin types) before configuring,
+# and the install is checked again afterwards.
+#
+# To show what trimming buys, the build time and install size of each module and optional
+# feature are estimated from the ninja log and the install tree. `compare` prints the time and
+# size a trimmed build saved over an earlier one.
+
+import argparse
+import fnmatch
+import json
+import os
+import sys
+from pathlib import Path
+
+import ninja_log
+
+
+# Optional features a profile can drop. "sources" are fnmatch patterns on the outputs in the
+# ninja log of the top-level build, "files" are fnmatch patterns on paths relative to the install
+# directory and "libraries" are Qt library names, matched on every platform's file names.
+TRIMMABLE_FEATURES = {
+	"assistant": {"module": "qttools", "sources": ["qttools/src/assistant/*", "*/bin/assistant"], "files": ["bin/assistant*", "bin/Assistant.app/*"]},
+	"designer": {"module": "qttools", "sources": ["qttools/src/designer/*", "*/bin/designer", "*/plugins/designer/*"],
+		"libraries": ["Designer", "DesignerComponents", "UiPlugin"], "files": ["bin/designer*", "bin/Designer.app/*", "plugins/designer/*"]},
+	"distancefieldgenerator": {"module": "qttools", "sources": ["qttools/src/distancefieldgenerator/*", "*/bin/qdistancefieldgenerator"],
+		"files": ["bin/qdistancefieldgenerator*"]},
+	"kmap2qmap": {"module": "qttools", "sources": ["qttools/src/kmap2qmap/*", "*/bin/kmap2qmap"], "files": ["bin/kmap2qmap*"]},
+	"linguist": {"module": "qttools", "sources": ["qttools/src/linguist/*", "*/bin/linguist", "*/bin/lrelease", "*/bin/lupdate", "*/bin/lconvert"],
+		"files": ["bin/linguist*", "bin/Linguist.app/*", "bin/lrelease*", "bin/lupdate*", "bin/lconvert*", "bin/lprodump*"]},
+	"pixeltool": {"module": "qttools", "sources": ["qttools/src/pixeltool/*", "*/bin/pixeltool"], "files": ["bin/pixeltool*"]},
+	"qdbus": {"module": "qttools", "sources": ["qttools/src/qdbus/*", "*/bin/qdbus*"], "files": ["bin/qdbus*"]},
+	"qdoc": {"module": "qttools", "sources": ["qttools/src/qdoc/*", "*/bin/qdoc"], "files": ["bin/qdoc*"]},
+	"qev": {"module": "qttools", "sources": ["qttools/src/qev/*", "*/bin/qev"], "files": ["bin/qev*"]},
+	"qtattributionsscanner": {"module": "qttools", "sources": ["qttools/src/qtattributionsscanner/*", "*/qtattributionsscanner"],
+		"files": ["libexec/qtattributionsscanner*", "bin/qtattributionsscanner*"]},
+	"qtdiag": {"module": "qttools", "sources": ["qttools/src/qtdiag/*", "*/bin/qtdiag"], "files": ["bin/qtdiag*"]},
+	"qtplugininfo": {"module": "qttools", "sources": ["qttools/src/qtplugininfo/*", "*/bin/qtplugininfo"], "files": ["bin/qtplugininfo*"]},
+	"qml-debug": {"module": "qtdeclarative", "sources": ["qtdeclarative/src/qmldebug/*", "qtdeclarative/src/plugins/qmltooling/*"],
+		"libraries": ["QmlDebug"], "files": ["plugins/qmltooling/*"]},
+	"qml-profiler": {"module": "qtdeclarative", "sources": ["qtdeclarative/tools/qmlprofiler/*", "*/bin/qmlprofiler"], "files": ["bin/qmlprofiler*"]},
+	"qml-preview": {"module": "qtdeclarative", "sources": ["qtdeclarative/tools/qmlpreview/*", "*/bin/qmlpreview"], "files": ["bin/qmlpreview*"]},
+	"qml-jit": {"module": "qtdeclarative", "sources": ["qtdeclarative/src/3rdparty/masm/*"], "files": []},
+	"sql": {"module": "qtbase", "sources": ["qtbase/src/sql/*", "qtbase/src/plugins/sqldrivers/*"], "libraries": ["Sql"],
+		"files": ["plugins/sqldrivers/*"]},
+}
+
+# Install files of each module that can be skipped, for size estimates
+MODULE_FILES = {
+	"qtsvg": {"libraries": ["Svg", "SvgWidgets"], "files": ["plugins/imageformats/*qsvg*", "plugins/iconengines/*qsvgicon*"]},
+	"qtwayland": {"libraries": ["WaylandClient", "WaylandCompositor", "WaylandEglClientHwIntegration", "WlShellIntegration"],
+		"files": ["plugins/wayland-*", "plugins/platforms/*wayland*", "bin/qtwaylandscanner*", "libexec/qtwaylandscanner*"]},
+	"qtimageformats": {"files": ["plugins/imageformats/*qtiff*", "plugins/imageformats/*qwebp*", "plugins/imageformats/*qicns*",
+		"plugins/imageformats/*qtga*", "plugins/imageformats/*qwbmp*", "plugins/imageformats/*qmng*", "plugins/imageformats/*qjp2*"]},
+	"qtdeclarative": {"libraries": ["Qml", "Quick", "QmlModels", "QmlWorkerScript", "QmlCore", "QmlMeta", "QuickWidgets", "QuickControls2",
+		"QuickTemplates2", "QuickDialogs2", "QuickLayouts", "QuickShapes", "QuickTest", "LabsSettings", "QmlCompiler", "QmlDom",
+		"QmlLS", "QmlToolingSettings", "QmlDebug"], "files": ["qml/*", "bin/qml*", "libexec/qml*", "plugins/qmltooling/*", "plugins/qmllint/*"]},
+	"qttools": {"libraries": ["Designer", "DesignerComponents", "UiPlugin", "UiTools", "Help", "Linguist"],
+		"files": [pattern for feature in TRIMMABLE_FEATURES.values() if feature["module"] == "qttools" for pattern in feature["files"]]},
+	"qttranslations": {"files": ["translations/*"]},
+	"qtlanguageserver": {"libraries": ["LanguageServer", "JsonRpc"], "files": []},
+	"qtshadertools": {"libraries": ["ShaderTools"], "files": ["bin/qsb*"]},
+}
+
+# What each part of the build needs from Qt, as module names and names of TRIMMABLE_FEATURES
+PYSIDE_MODULE_REQUIREMENTS = {
+	"Svg": ["qtsvg"], "SvgWidgets": ["qtsvg"], "Qml": ["qtdeclarative"], "Quick": ["qtdeclarative"],
+	"QuickWidgets": ["qtdeclarative"], "QuickControls2": ["qtdeclarative"], "UiTools": ["qttools", "designer"],
+	"Designer": ["qttools", "designer"], "Help": ["qttools"], "Sql": ["sql"], "WaylandCompositor": ["qtwayland"],
+}
+PLUGIN_TYPE_REQUIREMENTS = {
+	"imageformats": ["qtimageformats", "qtsvg"],
+	"iconengines": ["qtsvg"],
+	"sqldrivers": ["sql"],
+	"wayland-decoration-client": ["qtwayland"],
+	"wayland-graphics-integration-client": ["qtwayland"],
+	"wayland-shell-integration": ["qtwayland"],
+}
+MODULE_REQUIREMENTS = {
+	"qttranslations": ["qttools", "linguist"],
+	"qtdeclarative": ["qtshadertools"],
+	"assistant": ["sql"],
+}
+
+
+def profile_needs(profile, qt_modules):
+	"""Return (modules, features) kept by `profile`, None meaning everything."""
+	if profile is None:
+		return set(qt_modules), set(TRIMMABLE_FEATURES)
+	return set(profile["modules"]), set(profile["features"])
+
+
+def trimmed(profile, qt_modules):
+	"""Modules and optional features `profile` drops, modules first."""
+	modules, features = profile_needs(profile, qt_modules)
+	return [m for m in qt_modules if m not in modules] + sorted(f for f in TRIMMABLE_FEATURES if f not in features)
+
+
+def configure_flags(profile, qt_modules):
+	"""Return the configure options implementing `profile`."""
+	modules, features = profile_needs(profile, qt_modules)
+	flags = []
+	for module in qt_modules:
+		if module not in modules:
+			flags += ["-skip", module]
+	for feature in sorted(TRIMMABLE_FEATURES):
+		# Features of skipped modules go away with the module
+		if feature not in features and TRIMMABLE_FEATURES[feature]["module"] in modules:
+			flags.append(f"-no-feature-{feature}")
+	return flags
+
+
+def check_profile(profile, qt_modules, pyside_modules, plugin_types):
+	"""Return the problems that would keep a build with `profile` from shipping, an empty list
+	when pyside_modules, the bundled plugin types and the kept modules all have what they need."""
+	modules, features = profile_needs(profile, qt_modules)
+	kept = modules | features
+	problems = []
+	unknown = sorted((modules - set(qt_modules)) | (features - set(TRIMMABLE_FEATURES)))
+	if unknown:
+		problems.append(f"unknown modules or features: {', '.join(unknown)}")
+	if "qtbase" not in modules:
+		problems.append("qtbase cannot be skipped")
+
+	def require(who, needs):
+		for need in needs:
+			if need not in kept:
+				problems.append(f"{who} needs {need}")
+
+	for module in pyside_modules:
+		require(f"PySide6.Qt{module}", PYSIDE_MODULE_REQUIREMENTS.get(module, []))
+	for plugin_type in plugin_types:
+		require(f"{plugin_type} plugins", PLUGIN_TYPE_REQUIREMENTS.get(plugin_type, []))
+	for name in sorted(kept):
+		# Features of skipped modules are not built and need nothing
+		module = TRIMMABLE_FEATURES[name]["module"] if name in TRIMMABLE_FEATURES else name
+		if module in modules:
+			require(name, MODULE_REQUIREMENTS.get(name, []))
+	return problems
+
+
+def _library_patterns(names):
+	patterns = []
+	for name in names:
+		patterns += [f"lib/libQt6{name}.so*", f"lib/Qt{name}.framework/*", f"bin/Qt6{name}.dll", f"lib/Qt6{name}.lib"]
+	return patterns
+
+
+def verify_install(install_path, pyside_modules, plugin_types):
+	"""Return what pyside_modules and the bundled plugin types need but the Qt install lacks."""
+	install_path = Path(install_path)
+	missing = []
+	for module in pyside_modules:
+		if not any(any(install_path.glob(p)) for p in _library_patterns([module])):
+			missing.append(f"Qt{module} library")
+	for plugin_type in plugin_types:
+		if not any((install_path / "plugins" / plugin_type).glob("*")):
+			missing.append(f"{plugin_type} plugins")
+	return missing
+
+
+def _install_files(install_path):
+	files = {}
+	for root, _, names in os.walk(install_path):
+		for name in names:
+			path = os.path.join(root, name)
+			if not os.path.islink(path):
+				files[os.path.relpath(path, install_path).replace(os.sep, "/")] = os.path.getsize(path)
+	return files
+
+
+def _cost(patterns, file_patterns, edges, files):
+	matching = [e for e in edges if any(fnmatch.fnmatch(e["output"], p) for p in patterns)]
+	sizes = [size for path, size in files.items() if any(fnmatch.fnmatch(path, p) for p in file_patterns)]
+	return {
+		"edges": len(matching),
+		"build_ms": sum(e["duration"] for e in matching),
+		"files": len(sizes),
+		"bytes": sum(sizes),
+	}
+
+
+def feature_costs(build_dir, install_path, qt_modules):
+	"""Estimate the build time (summed ninja edge durations) and install size of each module
+	other than qtbase and of each optional feature in this build. A trimmed entry costs nothing,
+	so comparing against an earlier build shows what trimming it saved."""
+	log = Path(build_dir) / ".ninja_log"
+	edges = ninja_log.parse_ninja_log(log) if log.exists() else []
+	files = _install_files(install_path)
+	costs = {}
+	for module in qt_modules:
+		if module in MODULE_FILES:
+			entry = MODULE_FILES[module]
+			costs[module] = _cost([f"{module}/*"] + [f"*libQt6{n}.so*" for n in entry.get("libraries", [])],
+				_library_patterns(entry.get("libraries", [])) + entry["files"], edges, files)
+	for feature, entry in TRIMMABLE_FEATURES.items():
+		if entry["module"] in qt_modules:
+			costs[feature] = _cost(entry["sources"], _library_patterns(entry.get("libraries", [])) + entry["files"], edges, files)
+	return {
+		"build_ms": sum(e["duration"] for e in edges),
+		"install_bytes": sum(files.values()),
+		"costs": costs,
+	}
+
+
+def compare_costs(old, new):
+	"""Print the build time and install size saved by `new` over `old`, per module and feature,
+	for reports written by write_report()."""
+	print(f"\n{'Saved by trimming':28} {'Build':>10} {'Install':>12}")
+	for name, new_cost in sorted(new["costs"].items()):
+		old_cost = old["costs"].get(name)
+		if old_cost is None:
+			continue
+		saved_ms = old_cost["build_ms"] - new_cost["build_ms"]
+		saved_bytes = old_cost["bytes"] - new_cost["bytes"]
+		if saved_ms or saved_bytes:
+			print(f"{name:28} {saved_ms / 1000:>9.1f}s {saved_bytes / (1024 * 1024):>10.1f}MB")
+	saved_ms = old["build_ms"] - new["build_ms"]
+	saved_bytes = old["install_bytes"] - new["install_bytes"]
+	print(f"{'Whole build':28} {saved_ms / 1000:>9.1f}s {saved_bytes / (1024 * 1024):>10.1f}MB")
+	return saved_ms, saved_bytes
+
+
+def write_report(path, profile_name, profile, qt_modules, costs):
+	report = {
+		"profile": profile_name,
+		"trimmed": trimmed(profile, qt_modules),
+		"configure_flags": configure_flags(profile, qt_modules),
+		**costs,
+	}
+	path = Path(path)
+	path.parent.mkdir(parents=True, exist_ok=True)
+	with path.open("w", encoding="utf-8") as f:
+		json.dump(report, f, indent=2)
+		f.write("\n")
+	return report
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Qt feature trimming profiles")
+	subparsers = parser.add_subparsers(dest="command", required=True)
+	show_parser = subparsers.add_parser("show", help="print the configure options of a profile and check it")
+	show_parser.add_argument("profile", help="profile name from target_qt6_version.qt_feature_profiles")
+	compare_parser = subparsers.add_parser("compare", help="print what a trimmed build saved over an earlier build")
+	compare_parser.add_argument("old", help="qt-feature-costs.json of the earlier build")
+	compare_parser.add_argument("new", help="qt-feature-costs.json of the trimmed build")
+	args = parser.parse_args(argv)
+
+	if args.command == "compare":
+		with open(args.old, "r", encoding="utf-8") as f:
+			old = json.load(f)
+		with open(args.new, "r", encoding="utf-8") as f:
+			new = json.load(f)
+		compare_costs(old, new)
+		return 0
+
+	from target_qt6_version import qt_modules, pyside_modules, qt_feature_profiles
+	from build_pipeline import LINUX_PLUGIN_TYPES
+	if args.profile not in qt_feature_profiles:
+		parser.error(f"unknown profile {args.profile}, expected one of {', '.join(qt_feature_profiles)}")
+	profile = qt_feature_profiles[args.profile]
+	print(" ".join(configure_flags(profile, qt_modules)))
+	problems = check_profile(profile, qt_modules, pyside_modules, LINUX_PLUGIN_TYPES)
+	for problem in problems:
+		print(f"Problem: {problem}")
+	return 1 if problems else 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
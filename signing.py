@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+# Code signing for build_pipeline.sign_tree(). A signer is one signing tool. It signs a batch of
+# files with each invocation, so jsign pays JVM startup and codesign its keychain lookup once per
+# batch instead of once per file. Batches run concurrently up to a limit. A batch that fails is
+# retried, then moved to the next timestamp server, so one flaky server costs a retry of that
+# batch instead of the whole step.
+#
+# LocalSigner and FakeTimestampServer stand in for the real tools, so the batching, concurrency
+# and failover can be exercised and benchmarked on any host (benchmarks/signing_benchmark.py):
+#
+#   python signing.py timestamp-server --port 8766 --latency 0.05
+#   python signing.py local-sign --tsa http://127.0.0.1:8766/ --signature-dir /tmp/signatures <files>
+
+import argparse
+import concurrent.futures
+import hashlib
+import hmac
+import http.client
+import http.server
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+from pathlib import Path
+
+from file_hash import file_digest
+
+
+WINDOWS_TIMESTAMP_SERVERS = ("http://timestamp.digicert.com", "http://timestamp.comodoca.com/rfc3161")
+LOCAL_SIGNING_KEY_ENV = "LOCAL_SIGNING_KEY"
+LOCAL_TIMESTAMP_SERVERS_ENV = "LOCAL_TIMESTAMP_SERVERS"
+DEFAULT_RETRIES = 1
+DEFAULT_RETRY_DELAY = 2.0
+
+
+def keychain_unlocker():
+	keychain_unlocker = os.environ["HOME"] + "/unlock-keychain"
+	if os.path.exists(keychain_unlocker):
+		return subprocess.call([keychain_unlocker]) == 0
+	return True
+
+
+class Signer:
+	"""A signing tool. `command()` returns the command signing `files` against one of
+	`timestamp_servers`, where None means the tool's default."""
+	name = None
+	batch_size = 50
+	# Longest command line the tool can be started with, None for no limit
+	max_command_length = None
+	jobs = 4
+	timestamp_servers = (None,)
+
+	def prepare(self):
+		return True
+
+	def command(self, files, timestamp_server):
+		raise NotImplementedError
+
+	def environment(self):
+		return None
+
+
+class CodesignSigner(Signer):
+	name = "codesign"
+	batch_size = 100
+	jobs = os.cpu_count() or 4
+
+	def __init__(self, identity="Developer ID"):
+		self.identity = identity
+
+	def prepare(self):
+		return keychain_unlocker()
+
+	def command(self, files, timestamp_server):
+		timestamp = f"--timestamp={timestamp_server}" if timestamp_server else "--timestamp"
+		return ["codesign", "-f", "--options", "runtime", timestamp, "-s", self.identity] + list(files)
+
+
+class JsignSigner(Signer):
+	name = "jsign"
+	batch_size = 200
+	# CreateProcess takes at most 32,767 characters, and 200 deep paths can be more than that
+	max_command_length = 32000
+	# The key lives on a PIV token, which serves one session at a time
+	jobs = 1
+	timestamp_servers = WINDOWS_TIMESTAMP_SERVERS
+
+	def __init__(self, jar="C:\\jenkins\\jsign.jar", certfile="C:\\jenkins\\yubi-1-user.crt"):
+		self.jar = jar
+		self.certfile = certfile
+
+	def command(self, files, timestamp_server):
+		return [
+			"java", "-jar", self.jar,
+			"--name", "Binary Ninja",
+			"--url", "https://binary.ninja/",
+			"--storetype", "PIV",
+			"--storepass", os.environ['YUBIKEY_PIN'],
+			"--tsaurl", timestamp_server,
+			"--tsmode", "RFC3161",
+			"--alias", "AUTHENTICATION",
+			"--certfile", self.certfile,
+			# A retried batch signs some files a second time, replace instead of nesting
+			"--replace",
+		] + list(files)
+
+
+class LocalSigner(Signer):
+	"""Stand-in signer: a fresh interpreter per batch that timestamps the digest of each file
+	and writes an HMAC signature to `signature_dir`. The files themselves are not modified.
+	`startup_delay` adds the per-invocation cost of a real tool, like a JVM starting."""
+	name = "local"
+
+	def __init__(self, signature_dir, timestamp_servers, key="local-signing-key", startup_delay=0.0, batch_size=50, jobs=4):
+		self.signature_dir = str(signature_dir)
+		self.timestamp_servers = tuple(timestamp_servers)
+		self.key = key
+		self.startup_delay = startup_delay
+		self.batch_size = batch_size
+		self.jobs = jobs
+
+	def command(self, files, timestamp_server):
+		return [sys.executable, "-S", str(Path(__file__).resolve()), "local-sign", "--tsa", timestamp_server,
+			"--signature-dir", self.signature_dir, "--startup-delay", str(self.startup_delay)] + list(files)
+
+	def environment(self):
+		return {**os.environ, LOCAL_SIGNING_KEY_ENV: self.key}
+
+
+def make_batches(signer, files):
+	"""Split `files` into batches of at most `signer.batch_size` files whose command lines,
+	quoted like on Windows, fit in `signer.max_command_length`."""
+	if signer.max_command_length is None:
+		return [files[i:i + signer.batch_size] for i in range(0, len(files), signer.batch_size)]
+	base_length = max(len(subprocess.list2cmdline(signer.command([], server))) for server in signer.timestamp_servers)
+	batches = []
+	batch = []
+	length = base_length
+	for path in files:
+		path_length = len(subprocess.list2cmdline([str(path)])) + 1
+		if batch and (len(batch) >= signer.batch_size or length + path_length > signer.max_command_length):
+			batches.append(batch)
+			batch = []
+			length = base_length
+		batch.append(path)
+		length += path_length
+	if batch:
+		batches.append(batch)
+	return batches
+
+
+def _sign_batch(signer, batch, retries, retry_delay):
+	attempts = []
+	for server in signer.timestamp_servers:
+		for attempt in range(retries + 1):
+			start = time.monotonic()
+			proc = subprocess.run(signer.command(batch, server), env=signer.environment(),
+				stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+			attempts.append({"server": server, "returncode": proc.returncode, "seconds": round(time.monotonic() - start, 3)})
+			if proc.returncode == 0:
+				return attempts
+			output = proc.stdout.decode("utf-8", "replace").strip()
+			print(f"Signing {len(batch)} files with timestamp server {server or 'default'} failed "
+				f"(attempt {attempt + 1} of {retries + 1}): {output[-2000:]}")
+			if attempt < retries:
+				time.sleep(retry_delay * (attempt + 1))
+	return attempts
+
+
+def sign_files(signer, groups, jobs=None, retries=DEFAULT_RETRIES, retry_delay=DEFAULT_RETRY_DELAY):
+	"""Sign `groups`, lists of paths, one group after the other, so the contents of a bundle
+	can be signed before the bundle. The batches of a group run up to `jobs` at a time.
+	Returns a report, whose "failed" list holds the files that could not be signed."""
+	start = time.monotonic()
+	report = {"signer": signer.name, "files": 0, "batches": 0, "invocations": 0, "failovers": 0, "failed": []}
+	if not signer.prepare():
+		report["failed"] = [f for group in groups for f in group]
+		return report
+	with concurrent.futures.ThreadPoolExecutor(max_workers=jobs or signer.jobs) as executor:
+		for group in groups:
+			batches = make_batches(signer, group)
+			for batch, attempts in zip(batches, executor.map(lambda b: _sign_batch(signer, b, retries, retry_delay), batches)):
+				report["batches"] += 1
+				report["invocations"] += len(attempts)
+				if attempts[-1]["returncode"] != 0:
+					report["failed"] += batch
+					continue
+				report["files"] += len(batch)
+				if attempts[-1]["server"] != signer.timestamp_servers[0]:
+					report["failovers"] += 1
+	report["seconds"] = round(time.monotonic() - start, 3)
+	return report
+
+
+def signature_path(signature_dir, path):
+	return Path(signature_dir) / (hashlib.sha256(os.path.abspath(path).encode("utf-8")).hexdigest()[:32] + ".json")
+
+
+def local_sign(files, signature_dir, tsa_url, key):
+	"""What LocalSigner runs: one timestamp request per file over a kept-alive connection."""
+	url = urllib.parse.urlsplit(tsa_url)
+	conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+	Path(signature_dir).mkdir(parents=True, exist_ok=True)
+	try:
+		for path in files:
+			digest = file_digest(path)
+			conn.request("POST", url.path or "/", body=digest.encode("ascii"), headers={"Content-Type": "text/plain"})
+			response = conn.getresponse()
+			body = response.read()
+			if response.status != 200:
+				raise RuntimeError(f"timestamp server answered {response.status} for {path}")
+			token = json.loads(body)
+			signature = hmac.new(key.encode("utf-8"), f"{digest}:{token['serial']}".encode("ascii"), hashlib.sha256).hexdigest()
+			with open(signature_path(signature_dir, path), "w", encoding="utf-8") as f:
+				json.dump({"path": os.path.abspath(path), "sha256": digest, "timestamp": token, "signature": signature}, f)
+	finally:
+		conn.close()
+
+
+def verify_local_signature(path, signature_dir, key):
+	try:
+		with open(signature_path(signature_dir, path), "r", encoding="utf-8") as f:
+			record = json.load(f)
+	except (OSError, ValueError):
+		return False
+	digest = file_digest(path)
+	expected = hmac.new(key.encode("utf-8"), f"{digest}:{record['timestamp']['serial']}".encode("ascii"), hashlib.sha256).hexdigest()
+	return record["sha256"] == digest and record["timestamp"]["digest"] == digest and hmac.compare_digest(record["signature"], expected)
+
+
+class _TimestampRequestHandler(http.server.BaseHTTPRequestHandler):
+	# Keep-alive, so a signer invocation pays for one connection like with a real TSA
+	protocol_version = "HTTP/1.1"
+	server_state = None
+
+	def do_POST(self):
+		digest = self.rfile.read(int(self.headers.get("Content-Length", "0"))).decode("ascii", "replace")
+		state = self.server_state
+		with state.lock:
+			state.requests += 1
+			fail = state.requests <= state.fail_first or state.random.random() < state.failure_rate
+			if fail:
+				state.failures += 1
+			serial = state.requests
+		time.sleep(state.latency)
+		if fail:
+			self.send_error(503, "Timestamp service unavailable")
+			return
+		body = json.dumps({"digest": digest, "serial": serial, "time": time.time()}).encode("utf-8")
+		self.send_response(200)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, format, *args):
+		pass
+
+
+class FakeTimestampServer:
+	"""Answers POSTed digests with a JSON token after `latency` seconds. The first `fail_first`
+	requests and a `failure_rate` share of the rest get a 503, to exercise failover."""
+
+	def __init__(self, latency=0.0, failure_rate=0.0, fail_first=0, host="127.0.0.1", port=0, seed=None):
+		self.latency = latency
+		self.failure_rate = failure_rate
+		self.fail_first = fail_first
+		self.requests = 0
+		self.failures = 0
+		self.lock = threading.Lock()
+		self.random = random.Random(seed)
+		handler = type("TimestampRequestHandler", (_TimestampRequestHandler,), {"server_state": self})
+		self.server = http.server.ThreadingHTTPServer((host, port), handler)
+		self.server.daemon_threads = True
+		self.thread = None
+
+	@property
+	def url(self):
+		host, port = self.server.server_address[:2]
+		return f"http://{host}:{port}/"
+
+	def start(self):
+		self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+		self.thread.start()
+		return self
+
+	def stop(self):
+		self.server.shutdown()
+		self.server.server_close()
+
+	def __enter__(self):
+		return self.start()
+
+	def __exit__(self, *exc):
+		self.stop()
+
+
+SIGNERS = ("codesign", "jsign", "local")
+
+
+def default_signer_name():
+	if sys.platform == 'darwin':
+		return "codesign"
+	if sys.platform.startswith("win"):
+		return "jsign"
+	return None
+
+
+def create_signer(name, work_dir):
+	"""The signer called `name`. The local signer uses the timestamp servers listed in
+	LOCAL_TIMESTAMP_SERVERS, or starts a fake one for the lifetime of the process."""
+	if name == "codesign":
+		return CodesignSigner()
+	if name == "jsign":
+		return JsignSigner()
+	if name == "local":
+		servers = [s for s in os.environ.get(LOCAL_TIMESTAMP_SERVERS_ENV, "").split(",") if s]
+		if not servers:
+			servers = [FakeTimestampServer().start().url]
+		return LocalSigner(Path(work_dir) / "signatures", servers,
+			key=os.environ.get(LOCAL_SIGNING_KEY_ENV, "local-signing-key"))
+	raise ValueError(f"Unknown signer {name}")
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Local stand-ins for code signing")
+	subparsers = parser.add_subparsers(dest="command", required=True)
+	sign_parser = subparsers.add_parser("local-sign", help="sign files like LocalSigner does")
+	sign_parser.add_argument("--tsa", required=True, help="timestamp server URL")
+	sign_parser.add_argument("--signature-dir", required=True, help="where to write the signatures")
+	sign_parser.add_argument("--startup-delay", type=float, default=0.0, help="seconds to wait first, like a JVM starting")
+	sign_parser.add_argument("files", nargs="+")
+	verify_parser = subparsers.add_parser("verify", help="check local signatures")
+	verify_parser.add_argument("--signature-dir", required=True, help="where the signatures are")
+	verify_parser.add_argument("files", nargs="+")
+	server_parser = subparsers.add_parser("timestamp-server", help="serve fake timestamps over HTTP")
+	server_parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+	server_parser.add_argument("--port", type=int, default=8766, help="port to listen on, 0 picks a free one")
+	server_parser.add_argument("--latency", type=float, default=0.0, help="seconds before each answer")
+	server_parser.add_argument("--failure-rate", type=float, default=0.0, help="share of requests answered with 503")
+	args = parser.parse_args(argv)
+
+	key = os.environ.get(LOCAL_SIGNING_KEY_ENV, "local-signing-key")
+	if args.command == "local-sign":
+		time.sleep(args.startup_delay)
+		try:
+			local_sign(args.files, args.signature_dir, args.tsa, key)
+		except (OSError, RuntimeError, ValueError, http.client.HTTPException) as e:
+			print(f"Failed to sign: {e}")
+			return 1
+		return 0
+	if args.command == "verify":
+		bad = [f for f in args.files if not verify_local_signature(f, args.signature_dir, key)]
+		for f in bad:
+			print(f"Bad or missing signature: {f}")
+		return 1 if bad else 0
+
+	server = FakeTimestampServer(args.latency, args.failure_rate, host=args.host, port=args.port)
+	print(f"Serving fake timestamps at {server.url}")
+	try:
+		server.server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server.server_close()
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# Cache of whole build step outputs: the ICU prefix, the Qt install tree and the PySide install.
+# Entries are keyed by a hash of every input that decides what a step produces, and stored as
+# tar archives in a local directory or on an HTTP server that supports GET and PUT. The `serve`
+# command runs such a server on top of a local directory, as a stand-in for a real store.
+
+import argparse
+import hashlib
+import http.server
+import json
+import os
+import re
+import shutil
+import sys
+import tarfile
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from file_hash import file_digest
+
+
+# Bump when the layout of cached trees changes, so older entries are no longer used
+STEP_CACHE_VERSION = 1
+ENTRY_SUFFIX = ".tar.gz"
+HTTP_TIMEOUT = 60
+_CHUNK_SIZE = 1024 * 1024
+_KEY_RE = re.compile(r"^[A-Za-z0-9._-]+$")
+
+
+def patch_stack(paths):
+	"""Names and content hashes of the patches applied to a source tree, in order."""
+	return [{"name": Path(p).name, "sha256": file_digest(p)} for p in paths]
+
+
+def cache_key(step, inputs):
+	"""Return the cache key of `step` for `inputs`, any JSON serializable structure."""
+	payload = json.dumps({"cache_version": STEP_CACHE_VERSION, "step": step, "inputs": inputs}, sort_keys=True, default=str)
+	name = re.sub(r"[^a-z0-9]+", "-", step.lower()).strip("-")
+	return f"{name}-{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+class LocalDirectoryBackend:
+	def __init__(self, root):
+		self.root = Path(root).expanduser().resolve()
+
+	def _path(self, key):
+		return self.root / (key + ENTRY_SUFFIX)
+
+	def fetch(self, key, dest_file):
+		"""Copy the entry for `key` to `dest_file`. Returns False when there is none."""
+		try:
+			shutil.copyfile(self._path(key), dest_file)
+		except FileNotFoundError:
+			return False
+		return True
+
+	def store(self, key, src_file):
+		self.root.mkdir(parents=True, exist_ok=True)
+		# Readers never see partially written entries
+		fd, tmp = tempfile.mkstemp(dir=self.root, prefix=".tmp-")
+		os.close(fd)
+		try:
+			shutil.copyfile(src_file, tmp)
+			os.replace(tmp, self._path(key))
+		except BaseException:
+			os.unlink(tmp)
+			raise
+
+	def __str__(self):
+		return str(self.root)
+
+
+class HttpBackend:
+	def __init__(self, url, token=None, timeout=HTTP_TIMEOUT):
+		self.url = url.rstrip("/")
+		self.token = token
+		self.timeout = timeout
+
+	def _request(self, key, method, data=None, headers=None):
+		headers = dict(headers or {})
+		if self.token:
+			headers["Authorization"] = f"Bearer {self.token}"
+		return urllib.request.Request(f"{self.url}/{key}{ENTRY_SUFFIX}", data=data, method=method, headers=headers)
+
+	def fetch(self, key, dest_file):
+		try:
+			with urllib.request.urlopen(self._request(key, "GET"), timeout=self.timeout) as response, open(dest_file, "wb") as f:
+				shutil.copyfileobj(response, f, _CHUNK_SIZE)
+		except urllib.error.HTTPError as e:
+			if e.code == 404:
+				return False
+			raise
+		return True
+
+	def store(self, key, src_file):
+		size = os.path.getsize(src_file)
+		with open(src_file, "rb") as f:
+			request = self._request(key, "PUT", data=f, headers={
+				"Content-Length": str(size),
+				"Content-Type": "application/octet-stream",
+			})
+			with urllib.request.urlopen(request, timeout=self.timeout):
+				pass
+
+	def __str__(self):
+		return self.url
+
+
+def open_backend(spec):
+	"""Return the backend for `spec`: an http(s) URL or a local directory."""
+	if spec.startswith(("http://", "https://")):
+		return HttpBackend(spec, token=os.environ.get("STEP_CACHE_TOKEN"))
+	return LocalDirectoryBackend(spec)
+
+
+def _extract(tar, dest):
+	# The "tar" filter keeps symlinks and modes but refuses entries outside of dest
+	if hasattr(tarfile, "tar_filter"):
+		tar.extractall(dest, filter="tar")
+	else:
+		tar.extractall(dest)
+
+
+class StepCache:
+	"""Restores and stores step output trees, recording each lookup in `events`.
+
+	Cache failures never fail a build: an unreachable or broken backend is reported and
+	treated as a miss.
+	"""
+
+	def __init__(self, backend, work_dir, read_only=False):
+		self.backend = backend
+		self.work_dir = Path(work_dir)
+		self.read_only = read_only
+		self.events = []
+
+	def restore(self, name, key, dest):
+		"""Replace `dest` with the cached tree for `key`. Returns True on a cache hit."""
+		dest = Path(dest)
+		start = time.monotonic()
+		event = {"step": name, "key": key, "action": "restore", "hit": False}
+		self.work_dir.mkdir(parents=True, exist_ok=True)
+		with tempfile.TemporaryDirectory(dir=self.work_dir) as tmp:
+			archive = Path(tmp) / ("entry" + ENTRY_SUFFIX)
+			try:
+				if self.backend.fetch(key, archive):
+					staging = Path(tmp) / "tree"
+					with tarfile.open(archive, "r:gz") as tar:
+						_extract(tar, staging)
+					if dest.is_symlink() or dest.is_file():
+						dest.unlink()
+					elif dest.exists():
+						shutil.rmtree(dest)
+					dest.parent.mkdir(parents=True, exist_ok=True)
+					shutil.move(str(staging), str(dest))
+					event.update(hit=True, bytes=archive.stat().st_size)
+			except Exception as e:
+				print(f"Step cache lookup of {name} failed: {e}")
+				event["error"] = str(e)
+		event["seconds"] = round(time.monotonic() - start, 3)
+		self.events.append(event)
+		print(f"Step cache {'hit' if event['hit'] else 'miss'} for {name} ({key}) in {self.backend}")
+		return event["hit"]
+
+	def store(self, name, key, src):
+		if self.read_only:
+			return False
+		start = time.monotonic()
+		event = {"step": name, "key": key, "action": "store", "stored": False}
+		self.work_dir.mkdir(parents=True, exist_ok=True)
+		with tempfile.TemporaryDirectory(dir=self.work_dir) as tmp:
+			archive = Path(tmp) / ("entry" + ENTRY_SUFFIX)
+			try:
+				# Fast compression, the trees are large and mostly stored once per configuration
+				with tarfile.open(archive, "w:gz", compresslevel=1) as tar:
+					tar.add(str(src), arcname=".")
+				self.backend.store(key, archive)
+				event.update(stored=True, bytes=archive.stat().st_size)
+			except Exception as e:
+				print(f"Storing {name} in the step cache failed: {e}")
+				event["error"] = str(e)
+		event["seconds"] = round(time.monotonic() - start, 3)
+		self.events.append(event)
+		if event["stored"]:
+			print(f"Stored {name} ({event['bytes'] / (1024 * 1024):.1f} MB) in the step cache in {event['seconds']:.1f}s")
+		return event["stored"]
+
+
+class _CacheRequestHandler(http.server.BaseHTTPRequestHandler):
+	backend = None
+
+	def _entry_path(self):
+		name = self.path.lstrip("/")
+		if not name.endswith(ENTRY_SUFFIX) or not _KEY_RE.match(name[:-len(ENTRY_SUFFIX)]):
+			self.send_error(400, "Invalid cache key")
+			return None
+		return self.backend._path(name[:-len(ENTRY_SUFFIX)])
+
+	def _send_entry(self, with_body):
+		path = self._entry_path()
+		if path is None:
+			return
+		try:
+			f = open(path, "rb")
+		except FileNotFoundError:
+			self.send_error(404)
+			return
+		with f:
+			self.send_response(200)
+			self.send_header("Content-Type", "application/octet-stream")
+			self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+			self.end_headers()
+			if with_body:
+				shutil.copyfileobj(f, self.wfile, _CHUNK_SIZE)
+
+	def do_GET(self):
+		self._send_entry(True)
+
+	def do_HEAD(self):
+		self._send_entry(False)
+
+	def do_PUT(self):
+		path = self._entry_path()
+		if path is None:
+			return
+		remaining = int(self.headers.get("Content-Length", "0"))
+		with tempfile.NamedTemporaryFile(dir=self.backend.root, prefix=".upload-", delete=False) as f:
+			while remaining > 0:
+				chunk = self.rfile.read(min(remaining, _CHUNK_SIZE))
+				if not chunk:
+					break
+				f.write(chunk)
+				remaining -= len(chunk)
+		if remaining:
+			os.unlink(f.name)
+			self.send_error(400, "Incomplete upload")
+			return
+		os.replace(f.name, path)
+		self.send_response(201)
+		self.send_header("Content-Length", "0")
+		self.end_headers()
+
+
+def serve(root, host="127.0.0.1", port=8765):
+	backend = LocalDirectoryBackend(root)
+	backend.root.mkdir(parents=True, exist_ok=True)
+	handler = type("CacheRequestHandler", (_CacheRequestHandler,), {"backend": backend})
+	server = http.server.ThreadingHTTPServer((host, port), handler)
+	print(f"Serving step cache {backend.root} at http://{host}:{server.server_address[1]}/")
+	return server
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Build step output cache")
+	subparsers = parser.add_subparsers(dest="command", required=True)
+	serve_parser = subparsers.add_parser("serve", help="serve a cache directory over HTTP, as a stand-in for a remote store")
+	serve_parser.add_argument("--root", required=True, help="directory holding the cache entries")
+	serve_parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+	serve_parser.add_argument("--port", type=int, default=8765, help="port to listen on, 0 picks a free one")
+	args = parser.parse_args(argv)
+
+	server = serve(args.root, args.host, args.port)
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server_close()
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -6,3 +6,36 @@ vs_version = "2022"
 min_macos = "13.0"
 qt_modules = ["qtbase", "qtsvg", "qtwayland", "qtimageformats", "qtdeclarative", "qttools", "qttranslations", "qtlanguageserver", "qtshadertools"]
 pyside_modules = ["Core", "Gui", "Widgets", "Svg", "DBus", "PrintSupport"]
+
+# Role of each packaged file, used to split the Qt archive into runtime, development and tools
+# archives. Patterns are fnmatch patterns ("*" also matches "/") on the path relative to the
+# install directory. The first role with a matching pattern wins, other files are runtime files.
+artifact_role_rules = [
+	("runtime", ["bin/*.dll"]),
+	("development", [
+		"include/*", "mkspecs/*", "modules/*", "metatypes/*", "sbom/*", "doc/*",
+		"lib/cmake/*", "lib/pkgconfig/*", "lib/metatypes/*", "lib/objects-*",
+		"lib/*.a", "lib/*.lib", "lib/*.prl", "lib/*.la", "lib/lib*.so",
+		"lib/*.framework/Headers", "lib/*.framework/Headers/*", "lib/*.framework/Versions/*/Headers/*",
+		"pyside/site-packages/PySide6/include/*", "pyside/site-packages/PySide6/typesystems/*",
+		"pyside/site-packages/PySide6/glue/*",
+	]),
+	("tools", ["bin/*", "libexec/*", "pyside/site-packages/shiboken6_generator/*"]),
+]
+
+# Feature trimming profiles for --profile, see qt_profiles.py. A profile lists the qt_modules and
+# the optional features (qt_profiles.TRIMMABLE_FEATURES) it needs; other modules are skipped and
+# other optional features are disabled. A profile without lists keeps the Qt defaults.
+qt_feature_profiles = {
+	"full": None,
+	# Every module, without the developer applications and QML debugging services
+	"no-dev-tools": {
+		"modules": qt_modules,
+		"features": ["linguist", "qtplugininfo", "qdbus", "qml-jit", "sql"],
+	},
+	# What pyside_modules, the bundled plugins and the translations need
+	"shipped": {
+		"modules": ["qtbase", "qtsvg", "qtwayland", "qtimageformats", "qttools", "qttranslations"],
+		"features": ["linguist", "qdbus"],
+	},
+}
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# Step logs of build_log.py, with a background thread writing while the main thread moves on
+# to other steps.
+#
+# Usage: python -m pytest tests   (or python -m unittest discover tests)
+
+import io
+import json
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import build_log
+
+
+class BackgroundStepTest(unittest.TestCase):
+	def setUp(self):
+		self.tmp = Path(tempfile.mkdtemp())
+		self.addCleanup(shutil.rmtree, self.tmp)
+		self.log = build_log.BuildLog()
+		self.log.console = io.StringIO()
+		self.log.attach(self.tmp / "logs", self.tmp / "events.jsonl")
+
+	def step_log(self, name):
+		[path] = (self.tmp / "logs").glob(f"*-{name}.log.gz")
+		return build_log.read_tail(path)
+
+	def events(self):
+		with open(self.tmp / "events.jsonl", encoding="utf-8") as f:
+			return [json.loads(line) for line in f]
+
+	def test_background_output_stays_in_its_own_log(self):
+		self.log.start_step("configure")
+		started = threading.Event()
+		release = threading.Event()
+
+		def post_process():
+			with self.log.background_step("post-process"):
+				self.log.write("background before\n")
+				self.log.run([sys.executable, "-c", "print('background command')"])
+				started.set()
+				release.wait()
+				self.log.write("background after\n")
+
+		thread = threading.Thread(target=post_process)
+		thread.start()
+		started.wait()
+		self.log.write("configure output\n")
+		self.log.start_step("build")
+		self.log.write("build output\n")
+		release.set()
+		thread.join()
+		self.log.end_step()
+		self.log.close()
+
+		self.assertEqual(self.step_log("configure"), ["configure output"])
+		self.assertEqual(self.step_log("build"), ["build output"])
+		self.assertEqual(self.step_log("post-process"), ["background before", "background command", "background after"])
+		ends = {e["step"]: e for e in self.events() if e["event"] == "step_end"}
+		self.assertTrue(ends["post-process"]["background"])
+		self.assertNotIn("background", ends["build"])
+		self.assertEqual(self.events()[-1]["status"], "ok")
+
+	def test_failure_shows_the_background_tail(self):
+		self.log.start_step("build")
+		self.log.write("build output\n")
+
+		def post_process():
+			with self.log.background_step("post-process"):
+				self.log.write("strip failed\n")
+				self.log.show_failure("Failed to strip debug info")
+
+		thread = threading.Thread(target=post_process)
+		thread.start()
+		thread.join()
+		console = self.log.console.getvalue()
+		self.assertIn("step 'post-process'", console)
+		self.assertIn("strip failed", console)
+		self.assertNotIn("build output", console)
+		# The main thread's step is still running
+		self.assertEqual(self.log.step_name, "build")
+		self.log.close()
+		failure = [e for e in self.events() if e["event"] == "failure"][0]
+		self.assertEqual(failure["step"], "post-process")
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# elf_deps.py on truncated and corrupt files, which must read as not-ELF instead of failing
+# the bundling step.
+#
+# Usage: python -m pytest tests   (or python -m unittest discover tests)
+
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import elf_deps
+
+
+def host_elf():
+	"""A dynamically linked ELF object of this host, or None."""
+	for path in (sys.executable, shutil.which("sh")):
+		if path and elf_deps.read_elf(os.path.realpath(path)) is not None:
+			return os.path.realpath(path)
+	return None
+
+
+class TruncatedElfTest(unittest.TestCase):
+	def setUp(self):
+		self.tmp = Path(tempfile.mkdtemp())
+		self.addCleanup(shutil.rmtree, self.tmp)
+
+	def write(self, name, data):
+		path = self.tmp / name
+		path.write_bytes(data)
+		return path
+
+	def test_magic_only(self):
+		self.assertIsNone(elf_deps.read_elf(self.write("libmagic.so", elf_deps.ELF_MAGIC)))
+		self.assertIsNone(elf_deps.read_elf(self.write("libshort.so", elf_deps.ELF_MAGIC + b"\x02\x01\x01" + b"\0" * 20)))
+
+	def test_program_headers_past_the_end(self):
+		header = bytearray(64)
+		header[:7] = elf_deps.ELF_MAGIC + b"\x02\x01\x01"
+		struct.pack_into("<Q", header, 32, 1 << 20)
+		struct.pack_into("<HH", header, 54, 56, 8)
+		self.assertIsNone(elf_deps.read_elf(self.write("libheaders.so", bytes(header))))
+
+	def test_truncated_host_binary(self):
+		source = host_elf()
+		if source is None:
+			self.skipTest("no ELF binary on this host")
+		data = Path(source).read_bytes()
+		sizes = list(range(4, 256, 5)) + list(range(256, len(data), max(1, len(data) // 200)))
+		for size in sizes:
+			path = self.write("libtruncated.so", data[:size])
+			# Parses or reads as not-ELF, but never raises
+			elf_deps.read_elf(path)
+
+	def test_bundling_skips_corrupt_files(self):
+		lib = self.tmp / "lib"
+		lib.mkdir()
+		(lib / "libbroken.so.1").write_bytes(elf_deps.ELF_MAGIC + b"\x02\x01\x01" + b"\xff" * 100)
+		source = host_elf()
+		if source is not None:
+			shutil.copyfile(source, lib / "tool")
+			(lib / "libtruncated.so").write_bytes(Path(source).read_bytes()[:1000])
+		graph = elf_deps.DependencyGraph([self.tmp])
+		self.assertNotIn(str((lib / "libbroken.so.1").resolve()), graph.objects)
+		self.assertIsInstance(graph.libraries_to_bundle(), dict)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# ninja_log.py on appended and recompacted .ninja_log files.
+#
+# Usage: python -m pytest tests   (or python -m unittest discover tests)
+
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import ninja_log
+
+
+def build_entries(count, jobs=4, duration=1000, offset=0):
+	"""(start, end, output, hash) of a build of `count` objects and a link, in completion order."""
+	entries = []
+	for i in range(count):
+		start = offset + (i // jobs) * duration
+		entries.append((start, start + duration - i % jobs, f"obj/{offset}/{i}.o", f"{offset:x}{i:08x}"))
+	link_start = max(end for _, end, _, _ in entries)
+	entries.append((link_start, link_start + 5000, "lib/libQt6Core.so.6.8.0", f"{offset:x}link"))
+	entries.append((link_start, link_start + 5000, "lib/libQt6Core.so", f"{offset:x}link"))
+	return sorted(entries, key=lambda e: e[1])
+
+
+class ParseNinjaLogTest(unittest.TestCase):
+	def setUp(self):
+		self.tmp = Path(tempfile.mkdtemp())
+		self.addCleanup(shutil.rmtree, self.tmp)
+
+	def write_log(self, entries):
+		path = self.tmp / ".ninja_log"
+		with open(path, "w", encoding="utf-8") as f:
+			f.write("# ninja log v5\n")
+			for start, end, output, command_hash in entries:
+				f.write(f"{start}\t{end}\t0\t{output}\t{command_hash}\n")
+		return path
+
+	def test_single_run(self):
+		edges = ninja_log.parse_ninja_log(self.write_log(build_entries(40)))
+		self.assertEqual(len(edges), 41)
+		link = [e for e in edges if e["kind"] == "link"][0]
+		self.assertEqual(link["output"], "lib/libQt6Core.so")
+		self.assertEqual(link["duration"], 5000)
+
+	def test_last_of_appended_runs(self):
+		edges = ninja_log.parse_ninja_log(self.write_log(build_entries(40) + build_entries(8, offset=300)))
+		self.assertEqual(len(edges), 9)
+		self.assertTrue(all(e["output"].startswith("obj/300/") for e in edges if e["kind"] == "compile"))
+
+	def test_recompacted_log(self):
+		# Recompaction rewrites the entries of earlier builds in hash order, then the next
+		# invocation appends its own run
+		rng = random.Random(27)
+		recompacted = build_entries(300) + build_entries(200, jobs=8, offset=150)
+		rng.shuffle(recompacted)
+		last = build_entries(60, offset=100)
+		# Ends after everything of the last run, so no entry of the recompacted part joins it
+		recompacted.append((50000, 90000, "obj/stale.o", "stale"))
+		edges = ninja_log.parse_ninja_log(self.write_log(recompacted + last))
+		self.assertEqual(len(edges), 61)
+		self.assertEqual(min(e["start"] for e in edges), 100)
+		self.assertEqual(max(e["end"] for e in edges), max(end for _, end, _, _ in last))
+
+	def test_recompacted_log_keeps_wall_time(self):
+		rng = random.Random(2)
+		entries = build_entries(500)
+		rng.shuffle(entries)
+		entries += build_entries(500)
+		report, _ = ninja_log.analyze(self.write_log(entries).parent)
+		self.assertEqual(report["edge_count"], 501)
+		self.assertEqual(report["wall_ms"], max(end for _, end, _, _ in entries))
+
+
+if __name__ == "__main__":
+	unittest.main()
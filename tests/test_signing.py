@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# Batching of signing.py, which has to keep jsign command lines under the Windows limit.
+#
+# Usage: python -m pytest tests   (or python -m unittest discover tests)
+
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import signing
+
+
+class BatchTest(unittest.TestCase):
+	def setUp(self):
+		patcher = mock.patch.dict(signing.os.environ, {"YUBIKEY_PIN": "123456"})
+		patcher.start()
+		self.addCleanup(patcher.stop)
+		self.signer = signing.JsignSigner()
+
+	def longest_command(self, batches):
+		return max(len(subprocess.list2cmdline(self.signer.command(batch, server)))
+			for batch in batches for server in self.signer.timestamp_servers)
+
+	def test_long_paths_fit_the_command_line(self):
+		directory = "C:\\jenkins\\workspace\\qt-build-windows\\build\\install\\" + "plugins\\" * 10
+		files = [f"{directory}qt6plugin_with_a_long_name_{i:04}.dll" for i in range(signing.JsignSigner.batch_size)]
+		batches = signing.make_batches(self.signer, files)
+		self.assertGreater(len(batches), 1)
+		self.assertLessEqual(self.longest_command(batches), signing.JsignSigner.max_command_length)
+		self.assertEqual([f for batch in batches for f in batch], files)
+
+	def test_short_paths_fill_the_batch_size(self):
+		files = [f"C:\\qt\\bin\\{i}.dll" for i in range(450)]
+		batches = signing.make_batches(self.signer, files)
+		self.assertEqual([len(batch) for batch in batches], [200, 200, 50])
+
+	def test_path_longer_than_the_limit_is_signed_alone(self):
+		files = ["C:\\a.dll", "C:\\" + "x" * 40000 + ".dll", "C:\\b.dll"]
+		self.assertEqual(signing.make_batches(self.signer, files), [[files[0]], [files[1]], [files[2]]])
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# Round trips of step_cache.py against its own HTTP server on localhost.
+#
+# Usage: python -m pytest tests   (or python -m unittest discover tests)
+
+import contextlib
+import io
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import step_cache
+
+
+class StepCacheServerTest(unittest.TestCase):
+	def setUp(self):
+		self.tmp = Path(tempfile.mkdtemp())
+		self.addCleanup(shutil.rmtree, self.tmp)
+		with contextlib.redirect_stdout(io.StringIO()):
+			self.server = step_cache.serve(self.tmp / "store", port=0)
+		thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+		thread.start()
+		self.addCleanup(self.server.server_close)
+		self.addCleanup(self.server.shutdown)
+		self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+		self.cache = step_cache.StepCache(step_cache.HttpBackend(self.url, timeout=10), self.tmp / "work")
+
+	def quietly(self, function, *args):
+		with contextlib.redirect_stdout(io.StringIO()):
+			return function(*args)
+
+	def make_tree(self, root):
+		(root / "bin").mkdir(parents=True)
+		(root / "lib").mkdir()
+		(root / "bin" / "tool").write_text("#!/bin/sh\n")
+		os.chmod(root / "bin" / "tool", 0o755)
+		(root / "lib" / "libQt6Core.so.6.8.0").write_bytes(b"\x7fELF" + os.urandom(1024))
+		os.chmod(root / "lib" / "libQt6Core.so.6.8.0", 0o644)
+		os.symlink("libQt6Core.so.6.8.0", root / "lib" / "libQt6Core.so.6")
+		os.symlink("lib", root / "lib64")
+
+	def test_miss(self):
+		dest = self.tmp / "dest"
+		self.assertFalse(self.quietly(self.cache.restore, "Qt", "qt-missing", dest))
+		self.assertFalse(dest.exists())
+		self.assertEqual(self.cache.events[-1]["hit"], False)
+		self.assertNotIn("error", self.cache.events[-1])
+
+	def test_store_then_hit_keeps_symlinks_and_modes(self):
+		src = self.tmp / "src"
+		self.make_tree(src)
+		self.assertTrue(self.quietly(self.cache.store, "Qt", "qt-key", src))
+		self.assertTrue((self.tmp / "store" / "qt-key.tar.gz").is_file())
+
+		dest = self.tmp / "dest"
+		self.assertTrue(self.quietly(self.cache.restore, "Qt", "qt-key", dest))
+		self.assertEqual((dest / "bin" / "tool").read_text(), "#!/bin/sh\n")
+		self.assertEqual(stat.S_IMODE((dest / "bin" / "tool").stat().st_mode), 0o755)
+		library = dest / "lib" / "libQt6Core.so.6.8.0"
+		self.assertEqual(library.read_bytes(), (src / "lib" / "libQt6Core.so.6.8.0").read_bytes())
+		self.assertEqual(stat.S_IMODE(library.stat().st_mode), 0o644)
+		self.assertTrue((dest / "lib" / "libQt6Core.so.6").is_symlink())
+		self.assertEqual(os.readlink(dest / "lib" / "libQt6Core.so.6"), "libQt6Core.so.6.8.0")
+		self.assertTrue((dest / "lib64").is_symlink())
+		self.assertEqual(os.readlink(dest / "lib64"), "lib")
+
+	def test_restore_replaces_existing_tree(self):
+		src = self.tmp / "src"
+		self.make_tree(src)
+		self.quietly(self.cache.store, "Qt", "qt-key", src)
+		dest = self.tmp / "dest"
+		dest.mkdir()
+		(dest / "stale").write_text("old")
+		self.assertTrue(self.quietly(self.cache.restore, "Qt", "qt-key", dest))
+		self.assertFalse((dest / "stale").exists())
+
+	def test_corrupt_entry_is_a_miss(self):
+		(self.tmp / "store" / "qt-key.tar.gz").write_bytes(b"not a tar archive")
+		dest = self.tmp / "dest"
+		self.assertFalse(self.quietly(self.cache.restore, "Qt", "qt-key", dest))
+		self.assertFalse(dest.exists())
+		self.assertIn("error", self.cache.events[-1])
+
+	def test_rejected_put_is_not_stored(self):
+		src = self.tmp / "src"
+		self.make_tree(src)
+		self.assertFalse(self.quietly(self.cache.store, "Qt", "bad-key$", src))
+		self.assertIn("error", self.cache.events[-1])
+		self.assertEqual(list((self.tmp / "store").iterdir()), [])
+
+	def test_unreachable_server_is_a_miss(self):
+		self.server.shutdown()
+		self.server.server_close()
+		src = self.tmp / "src"
+		self.make_tree(src)
+		self.assertFalse(self.quietly(self.cache.store, "Qt", "qt-key", src))
+		self.assertFalse(self.quietly(self.cache.restore, "Qt", "qt-key", self.tmp / "dest"))
+		self.assertIn("error", self.cache.events[-1])
+
+	def test_read_only_cache_does_not_store(self):
+		src = self.tmp / "src"
+		self.make_tree(src)
+		self.cache.read_only = True
+		self.assertFalse(self.quietly(self.cache.store, "Qt", "qt-key", src))
+		self.assertFalse((self.tmp / "store" / "qt-key.tar.gz").exists())
+
+
+class CacheKeyTest(unittest.TestCase):
+	def test_key_follows_patch_contents(self):
+		with tempfile.TemporaryDirectory() as tmp:
+			patch = Path(tmp) / "0001-fix.patch"
+			patch.write_text("--- a/x\n+++ b/x\n@@ -1 +1 @@\n-a\n+b\n")
+			inputs = {"qt_version": "6.8.0", "patches": step_cache.patch_stack([patch])}
+			key = step_cache.cache_key("Qt install", inputs)
+			self.assertEqual(key, step_cache.cache_key("Qt install", {"qt_version": "6.8.0", "patches": step_cache.patch_stack([patch])}))
+			self.assertTrue(key.startswith("qt-install-"))
+
+			patch.write_text("--- a/x\n+++ b/x\n@@ -1 +1 @@\n-a\n+c\n")
+			changed = step_cache.cache_key("Qt install", {"qt_version": "6.8.0", "patches": step_cache.patch_stack([patch])})
+			self.assertNotEqual(key, changed)
+
+	def test_key_follows_step_and_inputs(self):
+		key = step_cache.cache_key("Qt install", {"qt_version": "6.8.0"})
+		self.assertNotEqual(key, step_cache.cache_key("PySide install", {"qt_version": "6.8.0"}))
+		self.assertNotEqual(key, step_cache.cache_key("Qt install", {"qt_version": "6.8.1"}))
+
+
+if __name__ == "__main__":
+	unittest.main()